@@ -1,5 +1,14 @@
+CUSTOMER = 'Customer'
+KITCHEN_STAFF = 'KitchenStaff'
+KITCHEN_MANAGER = 'KitchenManager'
+STAFF_ROLES = (KITCHEN_STAFF, KITCHEN_MANAGER)
+
+
 class Account:
-    def __init__(self, email_address):
+    __slots__ = ('is_locked', 'email_address', 'activation_code', 'password', 'is_banned',
+                 'address', 'first_name', 'last_name', 'home_address', 'payment_method', 'role', 'account_id')
+
+    def __init__(self, email_address, role=CUSTOMER):
         self.is_locked = True
         self.email_address = email_address
         self.activation_code = None
@@ -9,3 +18,24 @@ class Account:
         self.first_name = None
         self.last_name = None
         self.home_address = None
+        self.payment_method = None
+        self.role = role
+        # set by AccountManager when the account is stored, never changes
+        self.account_id = None
+
+
+# everything but the plain text password, used for snapshots and journal records;
+# records written before account_id existed are shorter and load without one
+RECORD_FIELDS = ('email_address', 'is_locked', 'activation_code', 'is_banned', 'address',
+                 'first_name', 'last_name', 'home_address', 'payment_method', 'role', 'account_id')
+
+
+def account_to_record(account):
+    return tuple(getattr(account, field) for field in RECORD_FIELDS)
+
+
+def account_from_record(record):
+    account = Account(record[0])
+    for field, value in zip(RECORD_FIELDS, record):
+        setattr(account, field, value)
+    return account
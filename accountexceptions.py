@@ -9,3 +9,6 @@ class AccountLockedException(Exception):
 
 class AccountBannedException(Exception):
     pass
+
+class AccountRateLimitedException(Exception):
+    pass
@@ -1,5 +1,146 @@
+import bisect
+import heapq
+import itertools
+import secrets
+import threading
+
+import validators
+from account import KITCHEN_MANAGER, STAFF_ROLES, Account, account_from_record, account_to_record
+from accountexceptions import AccountBannedException, AccountDoesNotExistException, AccountIncorrectPasswordException, AccountLockedException, AccountRateLimitedException
+from auditlog import ADMIN_CREATE_ACCOUNT, BAN_ACCOUNT, CHANGE_PERSONAL_INFORMATION
+from emailoutbox import EmailMessage, EmailOutbox
+from journal import Journaled
+from passwordhasher import PasswordHasher
+from ratelimiter import LoginRateLimiter
+from searchindex import NAME_FIELDS, AccountSearchIndex
+from sortedkeys import SortedKeyList
+from stripedlock import NoLock, StripedLock
+from tokenstore import TokenStore
+
+VERIFICATION_LINK = 'https://example.com/verify?code=%s'
+PASSWORD_RESET_LINK = 'https://example.com/reset-password?code=%s'
+DEFAULT_PAGE_SIZE = 50
+ACTIVATION_CODE_TTL = 7 * 24 * 60 * 60
+PASSWORD_RESET_CODE_TTL = 60 * 60
+
+
+def normalize_email(email_address):
+    return email_address.strip().lower()
+
+
+def select_partitions(partitions, account_role, is_banned, is_locked=None):
+    return [partition for (partition_role, partition_banned, partition_locked), partition in partitions.items()
+            if (account_role == None or partition_role == account_role)
+            and (is_banned == None or partition_banned == is_banned)
+            and (is_locked == None or partition_locked == is_locked)]
+
+
+# accounts in email order; lookup turns a key into its account. With a search
+# index, name_prefix reads only the matching accounts; without one (a snapshot)
+# the selected partitions are scanned
+def iterate_accounts(partitions, lookup, cursor, account_role=None, is_banned=None, is_locked=None,
+                     name_prefix=None, email_prefix=None, search_index=None):
+    if name_prefix != None and search_index != None:
+        return iterate_name_matches(search_index, lookup, cursor, account_role, is_banned, is_locked, name_prefix,
+                                    email_prefix)
+    return merge_partitions(select_partitions(partitions, account_role, is_banned, is_locked), lookup, cursor,
+                            name_prefix, email_prefix)
+
+
+def merge_partitions(partitions, lookup, cursor, name_prefix, email_prefix):
+    if email_prefix != None:
+        keys = [partition.prefix(normalize_email(email_prefix), cursor) for partition in partitions]
+    else:
+        keys = [partition.irange(cursor, inclusive=False) if cursor != None else iter(partition)
+                for partition in partitions]
+    if name_prefix != None:
+        name_prefix = name_prefix.lower()
+
+    for key in heapq.merge(*keys):
+        account = lookup(key)
+        if name_prefix != None and not any(name and name.lower().startswith(name_prefix)
+                                           for name in (account.first_name, account.last_name)):
+            continue
+        yield account
+
+
+def iterate_name_matches(search_index, lookup, cursor, account_role, is_banned, is_locked, name_prefix, email_prefix):
+    keys = sorted(search_index.keys_with_prefix(name_prefix, NAME_FIELDS))
+    if cursor != None:
+        keys = keys[bisect.bisect_right(keys, cursor):]
+    if email_prefix != None:
+        email_prefix = normalize_email(email_prefix)
+    for key in keys:
+        if email_prefix != None and not key.startswith(email_prefix):
+            continue
+        # the keys were copied, an account may have been renamed since
+        try:
+            account = lookup(key)
+        except KeyError:
+            continue
+        if ((account_role == None or account.role == account_role)
+                and (is_banned == None or bool(account.is_banned) == is_banned)
+                and (is_locked == None or bool(account.is_locked) == is_locked)):
+            yield account
+
+
+# lazy result of view_all_accounts, accounts are only looked up while iterating
+class AccountView:
+
+    def __init__(self, manager, filters):
+        self.manager = manager
+        self.filters = filters
+
+    def __iter__(self):
+        return self.manager._iterate_accounts(None, **self.filters)
+
+    def __len__(self):
+        return self.manager._count_accounts(**self.filters)
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        for account in itertools.islice(self, position, None):
+            return account
+        raise IndexError('account view index out of range')
+
+
 # represents an in-memory database of accounts
-class AccountManager:
+class AccountManager(Journaled):
+
+    # thread_safe adds per-account lock striping for use from many threads;
+    # readers never take a lock either way
+    def __init__(self, password_hasher=None, outbox=None, journal=None, login_rate_limiter=None,
+                 thread_safe=False, audit_log=None):
+        # primary index, normalized email -> Account
+        self.accounts = {}
+        # secondary indexes
+        self.accounts_by_id = {}
+        self.activation_codes = TokenStore(ACTIVATION_CODE_TTL)
+        self.banned_emails = set()
+        # (role, is_banned) -> sorted normalized emails
+        self.partitions = {}
+        self.search_index = AccountSearchIndex()
+        # normalized email -> salted password hash
+        self.password_hashes = {}
+        self.password_hasher = password_hasher if password_hasher != None else PasswordHasher()
+        self.password_reset_codes = TokenStore(PASSWORD_RESET_CODE_TTL)
+        self.outbox = outbox if outbox != None else EmailOutbox()
+        self.login_rate_limiter = login_rate_limiter if login_rate_limiter != None else LoginRateLimiter()
+        # key_locks serialize changes to one account, index_lock guards the
+        # structures shared by all accounts and is only held briefly
+        self.key_locks = StripedLock() if thread_safe else NoLock()
+        self.index_lock = threading.RLock() if thread_safe else NoLock()
+        # called with a normalized email whenever that account is added or changes
+        self.listeners = []
+        # open AccountSnapshots, given the old state of an account before it changes
+        self.snapshots = []
+        self.audit_log = None
+        self.journal = journal
+        if journal != None:
+            self.recover()
+        # set after recovery so replayed operations are not audited twice
+        self.audit_log = audit_log
 
     # 4.1.1 Required account information
     def verify_account(self, first_name, last_name, email_address, home_address, password):
@@ -8,48 +149,387 @@ class AccountManager:
 
         return self.verify_email_address(email_address) and self.verify_password(password) and self.verify_email_does_not_exist_in_system(email_address)
 
+    # 4.1.1.1 Email validation
     def verify_email_address(self, email_address):
-        return None
+        return validators.is_valid_email(email_address)
 
+    # 4.1.1.3 Password validation
     def verify_password(self, password):
-        return None
+        return validators.is_valid_password(password)
 
+    # validates rows of (first_name, last_name, email_address, home_address, password)
+    # in one pass, returning a result code per row instead of raising; with
+    # require_password False a missing password is accepted
+    def verify_accounts_batch(self, rows, require_password=True):
+        match_email = validators.EMAIL_PATTERN.fullmatch
+        search_upper_case = validators.UPPER_CASE_PATTERN.search
+        search_digit = validators.DIGIT_PATTERN.search
+        accounts = self.accounts
+        seen = set()
+        results = []
+        append = results.append
+        for first_name, last_name, email_address, home_address, password in rows:
+            if first_name == None or last_name == None or home_address == None:
+                append(validators.MISSING_INFORMATION)
+            elif type(email_address) is not str or match_email(email_address) is None:
+                append(validators.INVALID_EMAIL)
+            elif (password == None and require_password) or (password != None and (
+                    type(password) is not str or search_upper_case(password) is None
+                    or search_digit(password) is None)):
+                append(validators.INVALID_PASSWORD)
+            else:
+                key = email_address.strip().lower()
+                if key in accounts or key in seen:
+                    append(validators.EMAIL_EXISTS)
+                else:
+                    seen.add(key)
+                    append(validators.VALID)
+        return results
+
+    # 4.1.1.2 Existing accounts
     def verify_email_does_not_exist_in_system(self, email_address):
-        return None
+        return normalize_email(email_address) not in self.accounts
+
+    def find_account(self, email_address):
+        return self.accounts.get(normalize_email(email_address))
+
+    def find_account_by_id(self, account_id):
+        return self.accounts_by_id.get(account_id)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _preserve(self, key, account):
+        for snapshot in self.snapshots:
+            snapshot.preserve(key, account)
 
+    def _notify(self, *keys):
+        for listener in self.listeners:
+            for key in keys:
+                listener(key)
+
+    def _partition(self, account):
+        name = (account.role, bool(account.is_banned), bool(account.is_locked))
+        partition = self.partitions.get(name)
+        if partition == None:
+            partition = self.partitions[name] = SortedKeyList()
+        return partition
+
+    def _index_account(self, key, account, password_hash):
+        if account.account_id == None:
+            # random rather than counted, so ids from different shards never collide
+            account.account_id = secrets.randbits(63)
+        self.accounts[key] = account
+        self.accounts_by_id[account.account_id] = account
+        self._partition(account).add(key)
+        self.search_index.add(key, account)
+        if account.activation_code != None:
+            self.activation_codes.issue(account, account.activation_code)
+        if account.is_banned:
+            self.banned_emails.add(key)
+        if password_hash != None:
+            self.password_hashes[key] = password_hash
+
+    # atomic check-and-insert, the password is hashed before any lock is taken
     def add_account(self, account):
-        return None
+        key = normalize_email(account.email_address)
+        if key in self.accounts:
+            return False
+
+        password_hash = self.password_hasher.hash(account.password) if account.password != None else None
+        return self._insert_account(key, account, password_hash)
 
+    def _insert_account(self, key, account, password_hash):
+        with self.key_locks(key):
+            if key in self.accounts:
+                return False
+            with self.index_lock:
+                self._index_account(key, account, password_hash)
+                self._record('add_account', account_to_record(account), password_hash)
+            self._notify(key)
+        return True
+
+    # 4.1.3.4 Account activation
     def unlock_account(self, activation_code):
-        return None
+        with self.index_lock:
+            account = self.activation_codes.redeem(activation_code)
+            if account == None:
+                return False
+
+            key = normalize_email(account.email_address)
+            self._preserve(key, account)
+            # an activated account moves to the unlocked partition
+            indexed = account.is_locked and self.accounts.get(key) is account
+            if indexed:
+                self._partition(account).remove(key)
+            account.is_locked = False
+            if indexed:
+                self._partition(account).add(key)
+            account.activation_code = None
+            self._record('unlock_account', activation_code)
+        return True
 
+    # 4.2.1.2 Password reset email
     def send_password_reset_email(self, email):
-        return None
+        account = self.find_account(email)
+        if account == None:
+            return False
+
+        with self.index_lock:
+            code = self.password_reset_codes.issue(account)
+        link = PASSWORD_RESET_LINK % code
+        return self.outbox.send(EmailMessage(email, 'Reset your password',
+                                             'Reset your password here: %s' % link, link))
 
+    # 4.1.3.1 Password verification link
     def send_email_verification_email(self, account):
-        return None
+        if not self.get_account(account):
+            return None
+
+        with self.key_locks(normalize_email(account.email_address)), self.index_lock:
+            # an expired code is replaced, resending it would only give a dead link
+            if account.activation_code == None or account.activation_code not in self.activation_codes:
+                self._preserve(normalize_email(account.email_address), account)
+                account.activation_code = self.activation_codes.issue(account)
+                self._record('set_activation_code', normalize_email(account.email_address), account.activation_code)
+        link = VERIFICATION_LINK % account.activation_code
+        email_details = EmailMessage(account.email_address, 'Verify your email',
+                                     'Activate your account here: %s' % link, link)
+        self.outbox.send(email_details)
+        return email_details
+
+    # 4.3 Login, checks everything that does not need the password hash first
+    def _login_password_hash(self, email, client_id):
+        key = normalize_email(email)
+        if not self.login_rate_limiter.allow(key, client_id):
+            raise AccountRateLimitedException(email)
+        account = self.accounts.get(key)
+        if account == None:
+            raise AccountDoesNotExistException(email)
+        if key in self.banned_emails:
+            raise AccountBannedException(email)
+        if account.is_locked:
+            raise AccountLockedException(email)
+
+        password_hash = self.password_hashes.get(key)
+        if password_hash == None:
+            raise AccountIncorrectPasswordException(email)
+        return password_hash
 
     # actual implementation is expected to throw Exceptions
-    def login(self, email, password):
-        return None
+    def login(self, email, password, client_id=None):
+        if not self.password_hasher.verify(password, self._login_password_hash(email, client_id)):
+            raise AccountIncorrectPasswordException(email)
+        return True
 
+    async def login_async(self, email, password, client_id=None):
+        if not await self.password_hasher.verify_async(password, self._login_password_hash(email, client_id)):
+            raise AccountIncorrectPasswordException(email)
+        return True
+
+    # 4.7.1 Personal Account Information
     def get_account(self, account):
-        return None
+        return self.find_account(account.email_address) is account
+
+    # 4.2 Password Reset
+    def _can_change_password(self, account, new_password):
+        return self.get_account(account) and self.verify_password(new_password)
 
     def change_password(self, account, new_password):
-        return None
+        if not self._can_change_password(account, new_password):
+            return False
+
+        self._set_password_hash(normalize_email(account.email_address), self.password_hasher.hash(new_password))
+        return True
 
-    def view_all_accounts(self, role):
-        return None
+    async def change_password_async(self, account, new_password):
+        if not self._can_change_password(account, new_password):
+            return False
 
+        password_hash = await self.password_hasher.hash_async(new_password)
+        self._set_password_hash(normalize_email(account.email_address), password_hash)
+        return True
+
+    # 4.2 Password Reset, using the code from the reset email
+    def reset_password(self, code, new_password):
+        if not self.verify_password(new_password):
+            return False
+        with self.index_lock:
+            account = self.password_reset_codes.redeem(code)
+        return account != None and self.change_password(account, new_password)
+
+    def _set_password_hash(self, key, password_hash):
+        with self.key_locks(key), self.index_lock:
+            self.password_hashes[key] = password_hash
+            self._record('change_password', key, password_hash)
+            self._notify(key)
+
+    # 4.8.1 Account view access, filters narrow the partitions that are read
+    def view_all_accounts(self, role, account_role=None, is_banned=None, is_locked=None,
+                          name_prefix=None, email_prefix=None):
+        if role not in STAFF_ROLES:
+            return []
+        return AccountView(self, {'account_role': account_role, 'is_banned': is_banned, 'is_locked': is_locked,
+                                  'name_prefix': name_prefix, 'email_prefix': email_prefix})
+
+    # returns (accounts, cursor) ordered by email; pass the cursor back for the next page
+    def view_accounts_page(self, role, cursor=None, limit=DEFAULT_PAGE_SIZE, **filters):
+        if role not in STAFF_ROLES:
+            return [], None
+        page = list(itertools.islice(self._iterate_accounts(cursor, **filters), limit + 1))
+        if len(page) <= limit:
+            return page, None
+        return page[:limit], normalize_email(page[limit - 1].email_address)
+
+    def _iterate_accounts(self, cursor, account_role=None, is_banned=None, is_locked=None,
+                          name_prefix=None, email_prefix=None):
+        return iterate_accounts(self.partitions, self.accounts.__getitem__, cursor, account_role, is_banned,
+                                is_locked, name_prefix, email_prefix, self.search_index)
+
+    def _count_accounts(self, account_role=None, is_banned=None, is_locked=None,
+                        name_prefix=None, email_prefix=None):
+        if name_prefix == None and email_prefix == None:
+            return sum(len(partition) for partition in select_partitions(self.partitions, account_role, is_banned,
+                                                                           is_locked))
+        return sum(1 for _ in self._iterate_accounts(None, account_role, is_banned, is_locked,
+                                                     name_prefix, email_prefix))
+
+    # 4.8.2 Account banning
     def ban_account(self, account, state):
-        return None
+        banned = self._ban_account(account, state)
+        if self.audit_log != None:
+            self.audit_log.record(BAN_ACCOUNT, account.email_address, banned, state=state, target_role=account.role)
+        return banned
+
+    def _ban_account(self, account, state):
+        key = normalize_email(account.email_address)
+        with self.key_locks(key):
+            if self.accounts.get(key) is not account:
+                return False
+
+            with self.index_lock:
+                self._preserve(key, account)
+                moved = bool(account.is_banned) != bool(state)
+                if moved:
+                    self._partition(account).remove(key)
+                account.is_banned = state
+                if moved:
+                    self._partition(account).add(key)
+                if state:
+                    self.banned_emails.add(key)
+                else:
+                    self.banned_emails.discard(key)
+                self._record('ban_account', key, state)
+            self._notify(key)
+        return True
 
     def is_account_banned(self, account):
-        return None
+        return normalize_email(account.email_address) in self.banned_emails
 
+    # 4.9.1 Management Account Creation
     def admin_create_account(self, creator_role, email, role):
-        return None
+        created = self._admin_create_account(creator_role, email, role)
+        if self.audit_log != None:
+            self.audit_log.record(ADMIN_CREATE_ACCOUNT, email, created, actor_role=creator_role, target_role=role)
+        return created
 
+    def _admin_create_account(self, creator_role, email, role):
+        if creator_role != KITCHEN_MANAGER or role not in STAFF_ROLES:
+            return False
+        if not self.verify_email_address(email):
+            return False
+        return self.add_account(Account(email, role))
+
+    # staff lookup by the start of an email address, first name or last name
+    def search_accounts(self, prefix, limit=10):
+        return [self.accounts[key] for key in self.search_index.search(prefix, limit)]
+
+    # 4.7.2.1 Modifiable Information
     def change_personal_information(self, account, first_name, last_name, email_address, address):
-        return None
+        old_email_address = account.email_address
+        changed = self._change_account_information(account, first_name, last_name, email_address, address)
+        if self.audit_log != None:
+            self.audit_log.record(CHANGE_PERSONAL_INFORMATION, old_email_address, changed, target_role=account.role,
+                                  detail=email_address if type(email_address) is str else None)
+        return changed
+
+    def _change_account_information(self, account, first_name, last_name, email_address, address):
+        if not self.get_account(account) or not self.verify_email_address(email_address):
+            return False
+
+        old_key = normalize_email(account.email_address)
+        new_key = normalize_email(email_address)
+        with self.key_locks(old_key, new_key):
+            if self.accounts.get(old_key) is not account:
+                return False
+            if new_key != old_key and new_key in self.accounts:
+                return False
+
+            with self.index_lock:
+                self._change_personal_information(account, old_key, new_key, first_name, last_name,
+                                                  email_address, address)
+            self._notify(old_key, new_key)
+        return True
+
+    def _change_personal_information(self, account, old_key, new_key, first_name, last_name, email_address, address):
+        self._preserve(old_key, account)
+        self.search_index.remove(old_key, account)
+        if new_key != old_key:
+            partition = self._partition(account)
+            partition.remove(old_key)
+            partition.add(new_key)
+            self.accounts[new_key] = self.accounts.pop(old_key)
+            if old_key in self.password_hashes:
+                self.password_hashes[new_key] = self.password_hashes.pop(old_key)
+            if old_key in self.banned_emails:
+                self.banned_emails.remove(old_key)
+                self.banned_emails.add(new_key)
+
+        account.first_name = first_name
+        account.last_name = last_name
+        account.email_address = email_address
+        account.address = address
+        self.search_index.add(new_key, account)
+        self._record('change_personal_information', old_key, first_name, last_name, email_address, address)
+
+    # sends the mail still queued and closes the journal
+    def close(self):
+        self.outbox.close()
+        super().close()
+
+    def snapshot_state(self):
+        with self.index_lock:
+            return {
+                'accounts': [account_to_record(account) for account in self.accounts.values()],
+                'password_hashes': dict(self.password_hashes),
+            }
+
+    def load_state(self, state):
+        for record in state['accounts']:
+            account = account_from_record(record)
+            self._index_account(normalize_email(account.email_address), account, None)
+        self.password_hashes.update(state['password_hashes'])
+
+    def _apply_add_account(self, record, password_hash):
+        account = account_from_record(record)
+        self._index_account(normalize_email(account.email_address), account, password_hash)
+
+    def _apply_unlock_account(self, activation_code):
+        self.unlock_account(activation_code)
+
+    def _apply_set_activation_code(self, key, activation_code):
+        account = self.accounts[key]
+        account.activation_code = self.activation_codes.issue(account, activation_code)
+
+    def _apply_change_password(self, key, password_hash):
+        self._set_password_hash(key, password_hash)
+
+    def _apply_ban_account(self, key, state):
+        self.ban_account(self.accounts[key], state)
+
+    def _apply_change_personal_information(self, key, first_name, last_name, email_address, address):
+        self.change_personal_information(self.accounts[key], first_name, last_name, email_address, address)
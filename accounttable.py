@@ -0,0 +1,46 @@
+from account import Account
+
+TEXT_COLUMNS = ('email_address', 'activation_code', 'password', 'address', 'first_name',
+                'last_name', 'home_address', 'payment_method', 'role')
+FLAG_COLUMNS = ('is_locked', 'is_banned')
+
+
+# struct-of-arrays view over many accounts, one list per attribute
+# instead of one object per account
+class AccountTable:
+
+    def __init__(self):
+        self.columns = {name: [] for name in TEXT_COLUMNS}
+        for name in FLAG_COLUMNS:
+            self.columns[name] = bytearray()
+
+    @classmethod
+    def from_accounts(cls, accounts):
+        table = cls()
+        for account in accounts:
+            table.append(account)
+        return table
+
+    def __len__(self):
+        return len(self.columns['email_address'])
+
+    def append(self, account):
+        for name in TEXT_COLUMNS:
+            self.columns[name].append(getattr(account, name))
+        for name in FLAG_COLUMNS:
+            self.columns[name].append(1 if getattr(account, name) else 0)
+
+    def column(self, name):
+        return self.columns[name]
+
+    def row(self, index):
+        account = Account(self.columns['email_address'][index])
+        for name in TEXT_COLUMNS:
+            setattr(account, name, self.columns[name][index])
+        for name in FLAG_COLUMNS:
+            setattr(account, name, self.columns[name][index] == 1)
+        return account
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.row(index)
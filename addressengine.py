@@ -0,0 +1,106 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# abbreviation -> full word, applied to tokens before matching
+STREET_TYPES = {
+    'street': 'street', 'st': 'street', 'avenue': 'avenue', 'ave': 'avenue', 'av': 'avenue',
+    'road': 'road', 'rd': 'road', 'drive': 'drive', 'dr': 'drive', 'lane': 'lane', 'ln': 'lane',
+    'boulevard': 'boulevard', 'blvd': 'boulevard', 'court': 'court', 'ct': 'court',
+    'crescent': 'crescent', 'cres': 'crescent', 'way': 'way', 'place': 'place', 'pl': 'place',
+    'terrace': 'terrace', 'terr': 'terrace', 'circle': 'circle', 'cir': 'circle',
+}
+DIRECTIONS = {
+    'n': 'north', 's': 'south', 'e': 'east', 'w': 'west',
+    'ne': 'northeast', 'nw': 'northwest', 'se': 'southeast', 'sw': 'southwest',
+    'north': 'north', 'south': 'south', 'east': 'east', 'west': 'west',
+    'northeast': 'northeast', 'northwest': 'northwest', 'southeast': 'southeast', 'southwest': 'southwest',
+}
+TOKEN_PATTERN = re.compile(r'[^\s,.]+')
+HOUSE_NUMBER_PATTERN = re.compile(r'[0-9]+[a-z]?')
+WORD_PATTERN = re.compile(r"[a-z][a-z'-]*")
+
+
+# house number, street name words, street type and an optional direction:
+# '10 Valid Dr. N' -> '10 valid drive north'; None when it is not an address
+def normalize_address(address):
+    if type(address) is not str:
+        return None
+    tokens = TOKEN_PATTERN.findall(address.lower())
+    direction = []
+    if len(tokens) > 3 and tokens[-1] in DIRECTIONS:
+        direction.append(DIRECTIONS[tokens.pop()])
+    if len(tokens) < 3 or HOUSE_NUMBER_PATTERN.fullmatch(tokens[0]) == None:
+        return None
+    street_type = STREET_TYPES.get(tokens[-1])
+    if street_type == None:
+        return None
+
+    name = []
+    for token in tokens[1:-1]:
+        if WORD_PATTERN.fullmatch(token) == None:
+            return None
+        name.append(DIRECTIONS.get(token, token))
+    return ' '.join([tokens[0]] + name + [street_type] + direction)
+
+
+# 4.5.1.3 and 4.5.1.4 address validation with an LRU cache in front of the
+# normalizer; repeat customers send the same addresses on every checkout.
+# Entries are keyed on the lower cased, whitespace collapsed input and
+# also expire after ttl seconds so rule table changes are picked up.
+class AddressEngine:
+
+    def __init__(self, max_entries=10000, ttl=3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        # key -> (normalized address or None, expires_at)
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def normalize(self, address):
+        if type(address) is not str:
+            return None
+        key = ' '.join(address.lower().split())
+        now = self.clock()
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry != None and entry[1] > now:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        normalized = normalize_address(key)
+        with self.lock:
+            self.cache[key] = (normalized, now + self.ttl)
+            self.cache.move_to_end(key)
+            if len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+        return normalized
+
+    def is_valid(self, address):
+        return self.normalize(address) != None
+
+    # bulk import: each distinct address in the batch is normalized once
+    def normalize_batch(self, addresses):
+        normalized = {}
+        results = []
+        for address in addresses:
+            if address not in normalized:
+                normalized[address] = self.normalize(address)
+            results.append(normalized[address])
+        return results
+
+    def validate_batch(self, addresses):
+        return [normalized != None for normalized in self.normalize_batch(addresses)]
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def metrics(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate(), 'entries': len(self.cache)}
@@ -0,0 +1,132 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from accountmanager import normalize_email
+
+
+# runs in-memory work inline on the event loop. With a journal, writes go to a
+# single persistence thread, which keeps them in order and off the loop, and
+# reads follow them there so they never see an index halfway through a write
+class AsyncFacade:
+
+    def __init__(self, manager):
+        self.manager = manager
+        self._persistence = None
+        if getattr(manager, 'journal', None) != None:
+            self._persistence = ThreadPoolExecutor(1, thread_name_prefix='persistence')
+
+    async def _write(self, function, *arguments, **keywords):
+        if self._persistence == None:
+            return function(*arguments, **keywords)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._persistence, functools.partial(function, *arguments, **keywords))
+
+    _read = _write
+
+    def close(self):
+        if self._persistence != None:
+            self._persistence.shutdown()
+            self._persistence = None
+
+
+class AsyncAccountManager(AsyncFacade):
+
+    # max_hashing bounds how many password hashes are in flight at once
+    def __init__(self, manager, max_hashing=8):
+        super().__init__(manager)
+        self._hashing = asyncio.Semaphore(max_hashing)
+
+    async def _hash(self, password):
+        async with self._hashing:
+            return await self.manager.password_hasher.hash_async(password)
+
+    async def add_account(self, account):
+        key = normalize_email(account.email_address)
+        if key in self.manager.accounts:
+            return False
+        password_hash = await self._hash(account.password) if account.password != None else None
+        return await self._write(self.manager._insert_account, key, account, password_hash)
+
+    async def login(self, email, password, client_id=None):
+        async with self._hashing:
+            return await self.manager.login_async(email, password, client_id)
+
+    async def change_password(self, account, new_password):
+        if not self.manager._can_change_password(account, new_password):
+            return False
+        password_hash = await self._hash(new_password)
+        await self._write(self.manager._set_password_hash, normalize_email(account.email_address), password_hash)
+        return True
+
+    async def unlock_account(self, activation_code):
+        return await self._write(self.manager.unlock_account, activation_code)
+
+    async def ban_account(self, account, state):
+        return await self._write(self.manager.ban_account, account, state)
+
+    async def admin_create_account(self, creator_role, email, role):
+        return await self._write(self.manager.admin_create_account, creator_role, email, role)
+
+    async def change_personal_information(self, account, first_name, last_name, email_address, address):
+        return await self._write(self.manager.change_personal_information, account, first_name, last_name,
+                                 email_address, address)
+
+    async def send_email_verification_email(self, account):
+        return await self._write(self.manager.send_email_verification_email, account)
+
+    async def send_password_reset_email(self, email):
+        return await self._write(self.manager.send_password_reset_email, email)
+
+    async def get_account(self, account):
+        return await self._read(self.manager.get_account, account)
+
+    async def is_account_banned(self, account):
+        return await self._read(self.manager.is_account_banned, account)
+
+    async def view_accounts_page(self, role, cursor=None, limit=50, **filters):
+        return await self._read(self.manager.view_accounts_page, role, cursor, limit, **filters)
+
+
+class AsyncOrderManager(AsyncFacade):
+
+    async def add_order(self, order):
+        return await self._write(self.manager.add_order, order)
+
+    async def view_orders_page(self, account, cursor=None, limit=50, start_date=None, end_date=None):
+        return await self._read(self.manager.view_orders_page, account, cursor, limit, start_date, end_date)
+
+    async def sales_totals(self, start_date=None, end_date=None, payment_method=None, received_by=None):
+        return await self._read(self.manager.sales_totals, start_date, end_date, payment_method, received_by)
+
+
+class AsyncReceiptManager(AsyncFacade):
+
+    async def add_receipt(self, receipt):
+        return await self._write(self.manager.add_receipt, receipt)
+
+    async def get_receipt_information(self, receipt):
+        return await self._read(self.manager.get_receipt_information, receipt)
+
+    async def get_all_receipts(self, account):
+        return await self._read(self.manager.get_all_receipts, account)
+
+
+# sending only queues the message on the outbox, SMTP happens on its worker thread
+class AsyncEmailUtils:
+
+    def __init__(self, email_utils):
+        self.email_utils = email_utils
+
+    async def account_exist(self, email_address):
+        return self.email_utils.account_exist(email_address)
+
+    async def send_receipt(self, email_address, receipt):
+        return self.email_utils.send_receipt(email_address, receipt)
+
+    async def validate_receipt_content(self, receipt):
+        return self.email_utils.validate_receipt_content(receipt)
+
+    async def flush(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.email_utils.outbox.flush)
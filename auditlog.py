@@ -0,0 +1,264 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+from account import CUSTOMER, KITCHEN_MANAGER, KITCHEN_STAFF
+
+# timestamp, target id, sequence, operation, flags, actor role, target role,
+# target email, detail; 128 bytes per record, longer text is cut to TEXT_SIZE
+TEXT_SIZE = 50
+AUDIT_RECORD = struct.Struct('<dQQBBBB%ds%ds' % (TEXT_SIZE, TEXT_SIZE))
+SEGMENT_SUFFIX = '.seg'
+
+BAN_ACCOUNT = 1
+ADMIN_CREATE_ACCOUNT = 2
+CHANGE_PERSONAL_INFORMATION = 3
+OPERATIONS = {BAN_ACCOUNT: 'ban_account', ADMIN_CREATE_ACCOUNT: 'admin_create_account',
+              CHANGE_PERSONAL_INFORMATION: 'change_personal_information'}
+
+ROLE_CODES = {None: 0, CUSTOMER: 1, KITCHEN_STAFF: 2, KITCHEN_MANAGER: 3}
+ROLES = {code: role for role, code in ROLE_CODES.items()}
+
+# flag bits
+STATE = 1
+SUCCEEDED = 2
+
+
+# normalized like the AccountManager keys
+def audit_key(email_address):
+    return email_address.strip().lower() if type(email_address) is str else ''
+
+
+def target_id(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+
+
+def fixed_text(text):
+    return (text or '').encode()[:TEXT_SIZE]
+
+
+class AuditRecord:
+    __slots__ = ('timestamp', 'sequence', 'operation', 'target_email', 'detail', 'state', 'succeeded',
+                 'actor_role', 'target_role')
+
+    def __init__(self, fields):
+        timestamp, _, sequence, operation, flags, actor_role, target_role, target_email, detail = fields
+        self.timestamp = timestamp
+        self.sequence = sequence
+        self.operation = OPERATIONS[operation]
+        self.target_email = target_email.rstrip(b'\0').decode(errors='replace')
+        self.detail = detail.rstrip(b'\0').decode(errors='replace') or None
+        self.state = bool(flags & STATE)
+        self.succeeded = bool(flags & SUCCEEDED)
+        self.actor_role = ROLES.get(actor_role)
+        self.target_role = ROLES.get(target_role)
+
+
+# append-only audit of admin operations in fixed size binary records. Admin
+# calls only append the record to a deque, a worker thread writes them in batches.
+# Segments hold segment_records records each and only the newest
+# max_segments are kept, so the log is bounded on disk and in memory.
+class AuditLog:
+
+    def __init__(self, directory, segment_records=65536, max_segments=16, batch_size=256):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.batch_size = batch_size
+        # segment number -> target id -> record numbers in that segment
+        self.index = {}
+        self.sequence = 0
+        self.written_count = 0
+        self.failed_count = 0
+        # the last write error, raised from the next flush()
+        self.error = None
+        self._segment = None
+        self._segment_length = 0
+        self._file = None
+        # records of the batch being written that reached the segment
+        self._batch_written = 0
+        # records, and Events that flush() waits on
+        self._pending = deque()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, segment):
+        return os.path.join(self.directory, 'audit-%08d%s' % (segment, SEGMENT_SUFFIX))
+
+    def _segments(self):
+        return sorted(int(file_name[len('audit-'):-len(SEGMENT_SUFFIX)]) for file_name in os.listdir(self.directory)
+                      if file_name.startswith('audit-') and file_name.endswith(SEGMENT_SUFFIX))
+
+    # rebuilds the index from the segments, dropping a torn last record
+    def _load(self):
+        for segment in self._segments():
+            path = self._path(segment)
+            with open(path, 'rb') as source:
+                data = source.read()
+            length = len(data) // AUDIT_RECORD.size
+            if length * AUDIT_RECORD.size != len(data):
+                os.truncate(path, length * AUDIT_RECORD.size)
+            index = self.index[segment] = {}
+            for number, fields in enumerate(AUDIT_RECORD.iter_unpack(data[:length * AUDIT_RECORD.size])):
+                index.setdefault(fields[1], []).append(number)
+                self.sequence = max(self.sequence, fields[2])
+            self._segment = segment
+            self._segment_length = length
+
+    def record(self, operation, target_email, succeeded, state=False, actor_role=None, target_role=None,
+               detail=None):
+        flags = (STATE if state else 0) | (SUCCEEDED if succeeded else 0)
+        self._pending.append((time.time(), operation, audit_key(target_email), flags, ROLE_CODES.get(actor_role, 0),
+                              ROLE_CODES.get(target_role, 0), detail))
+        if self._worker == None:
+            self._start_worker()
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+    # blocks until every record appended before the call is written, and
+    # raises the error of a write that failed since the last flush
+    def flush(self):
+        self._wait()
+        error, self.error = self.error, None
+        if error != None:
+            raise error
+
+    def _wait(self):
+        if self._worker == None:
+            return
+        written = threading.Event()
+        self._pending.append(written)
+        self._wakeup.set()
+        written.wait()
+
+    def _start_worker(self):
+        with self._lock:
+            if self._worker == None:
+                self._worker = threading.Thread(target=self._run, name='audit-log', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        pending = self._pending
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            batch = []
+            while pending:
+                item = pending.popleft()
+                if isinstance(item, threading.Event):
+                    self._write_batch(batch)
+                    batch = []
+                    item.set()
+                    continue
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._write_batch(batch)
+                    batch = []
+            self._write_batch(batch)
+
+    # a failed batch is dropped and counted; the worker carries on so flush()
+    # never waits on a dead thread
+    def _write_batch(self, batch):
+        try:
+            self._write(batch)
+        except Exception as error:
+            self.failed_count += len(batch) - self._batch_written
+            self.error = error
+            self._drop_torn_tail()
+        self._batch_written = 0
+
+    # cuts whatever part of a failed write reached the segment
+    def _drop_torn_tail(self):
+        if self._file == None:
+            return
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._file = None
+        try:
+            os.truncate(self._path(self._segment), self._segment_length * AUDIT_RECORD.size)
+        except OSError:
+            pass
+
+    def _open_segment(self):
+        if self._file != None:
+            self._file.close()
+        if self._segment == None or self._segment_length >= self.segment_records:
+            self._segment = (self._segment or 0) + 1
+            self._segment_length = 0
+            with self._lock:
+                self.index[self._segment] = {}
+                for segment in sorted(self.index)[:-self.max_segments]:
+                    del self.index[segment]
+                    os.remove(self._path(segment))
+        self._file = open(self._path(self._segment), 'ab')
+
+    # sequence and segment length only move once the records are written
+    def _write(self, batch):
+        data = []
+        entries = []
+        for timestamp, operation, key, flags, actor_role, target_role, detail in batch:
+            if self._file == None or self._segment_length + len(data) >= self.segment_records:
+                self._file_write(data, entries)
+                data, entries = [], []
+                self._open_segment()
+            identifier = target_id(key)
+            data.append(AUDIT_RECORD.pack(timestamp, identifier, self.sequence + len(data) + 1, operation, flags,
+                                          actor_role, target_role, fixed_text(key), fixed_text(detail)))
+            entries.append((identifier, self._segment_length + len(entries)))
+        self._file_write(data, entries)
+
+    def _file_write(self, data, entries):
+        if not data:
+            return
+        self._file.write(b''.join(data))
+        self._file.flush()
+        with self._lock:
+            index = self.index[self._segment]
+            for identifier, number in entries:
+                index.setdefault(identifier, []).append(number)
+        self.sequence += len(data)
+        self._segment_length += len(data)
+        self._batch_written += len(data)
+        self.written_count += len(data)
+
+    # oldest first; only the newest limit records when limit is given
+    def history(self, email_address, limit=None):
+        self._wait()
+        key = audit_key(email_address)
+        identifier = target_id(key)
+        with self._lock:
+            locations = [(segment, list(self.index[segment].get(identifier, ()))) for segment in sorted(self.index)]
+
+        records = []
+        for segment, numbers in locations:
+            if not numbers:
+                continue
+            try:
+                source = open(self._path(segment), 'rb')
+            except FileNotFoundError:
+                # rotated out while this query ran
+                continue
+            with source:
+                for number in numbers:
+                    source.seek(number * AUDIT_RECORD.size)
+                    fields = AUDIT_RECORD.unpack(source.read(AUDIT_RECORD.size))
+                    # the id is a hash, the stored email settles collisions
+                    if fields[7].rstrip(b'\0') == fixed_text(key):
+                        records.append(AuditRecord(fields))
+        return records[-limit:] if limit != None else records
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._file != None:
+                self._file.close()
+                self._file = None
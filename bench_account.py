@@ -0,0 +1,50 @@
+# Memory benchmark for Account representations.
+# Run with: python bench_account.py
+import tracemalloc
+
+from account import Account
+from accounttable import AccountTable
+
+COUNT = 100000
+
+
+# the Account layout before __slots__, kept here for comparison
+class DictAccount:
+    def __init__(self, email_address):
+        self.is_locked = True
+        self.email_address = email_address
+        self.activation_code = None
+        self.password = None
+        self.is_banned = False
+        self.address = None
+        self.first_name = None
+        self.last_name = None
+        self.home_address = None
+        self.payment_method = None
+
+
+def bytes_per_account(build):
+    emails = ['customer%d@example.com' % i for i in range(COUNT)]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    rows = build(emails)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del rows
+    return size / COUNT
+
+
+def bench_memory():
+    results = [
+        ('dict Account', bytes_per_account(lambda emails: [DictAccount(e) for e in emails])),
+        ('slotted Account', bytes_per_account(lambda emails: [Account(e) for e in emails])),
+        ('AccountTable', bytes_per_account(
+            lambda emails: AccountTable.from_accounts(Account(e) for e in emails))),
+    ]
+    for name, size in results:
+        print('%-16s %8.1f bytes/account' % (name, size))
+
+
+if __name__ == '__main__':
+    bench_memory()
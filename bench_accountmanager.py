@@ -0,0 +1,72 @@
+# Benchmarks for the AccountManager in-memory store.
+# Run with: python bench_accountmanager.py
+import random
+import time
+
+from account import Account
+from accountmanager import AccountManager
+
+SIZES = [1000, 10000, 100000, 1000000]
+LOOKUPS = 100000
+PAGES = 1000
+
+
+def build_manager(size):
+    manager = AccountManager()
+    for i in range(size):
+        account = Account('customer%d@example.com' % i)
+        account.first_name = 'First%d' % i
+        # a single account has a rare last name, for the name prefix page
+        account.last_name = 'Rare' if i == size // 3 else 'Smith'
+        account.activation_code = 'code%d' % i
+        account.is_locked = i % 10 == 0
+        account.is_banned = i % 100 == 0
+        manager.add_account(account)
+    return manager
+
+
+def time_per_call(function, arguments):
+    start = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return (time.perf_counter() - start) / len(arguments) * 1e9
+
+
+def bench_lookups():
+    print('%10s %14s %14s %14s' % ('accounts', 'exists ns/op', 'get ns/op', 'banned ns/op'))
+    for size in SIZES:
+        manager = build_manager(size)
+        rng = random.Random(size)
+        indexes = [rng.randrange(size) for _ in range(LOOKUPS)]
+        emails = ['Customer%d@Example.com' % i for i in indexes]
+        accounts = [manager.find_account(email) for email in emails]
+
+        exists = time_per_call(manager.verify_email_does_not_exist_in_system, emails)
+        get = time_per_call(manager.get_account, accounts)
+        banned = time_per_call(manager.is_account_banned, accounts)
+        print('%10d %14.0f %14.0f %14.0f' % (size, exists, get, banned))
+
+
+def bench_pages():
+    size = SIZES[-1]
+    manager = build_manager(size)
+    _, middle = manager.view_accounts_page('KitchenManager', limit=size // 2)
+    queries = [
+        ('first page', {}),
+        ('middle page', {'cursor': middle}),
+        ('banned only', {'is_banned': True}),
+        ('email prefix', {'email_prefix': 'customer12345'}),
+        ('locked only', {'is_locked': True}),
+        ('name prefix', {'name_prefix': 'rare'}),
+    ]
+    print('page latency at %d accounts' % size)
+    for name, filters in queries:
+        start = time.perf_counter()
+        for _ in range(PAGES):
+            manager.view_accounts_page('KitchenManager', **filters)
+        print('%-14s %10.1f us/page' % (name, (time.perf_counter() - start) / PAGES * 1e6))
+
+
+if __name__ == '__main__':
+    bench_lookups()
+    bench_pages()
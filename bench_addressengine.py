@@ -0,0 +1,37 @@
+# Address validation latency with and without the cache, plus its hit rate
+# for a checkout stream where repeat customers reuse their addresses.
+# Run with: python bench_addressengine.py
+import random
+import time
+
+from addressengine import AddressEngine, normalize_address
+
+CALLS = 200000
+DISTINCT = 5000
+
+
+def addresses(seed=1):
+    rng = random.Random(seed)
+    names = ['maple', 'oak', 'king', 'queen', 'main', 'valid', 'church', 'park']
+    types = ['st', 'street', 'ave', 'dr.', 'Drive', 'rd', 'lane']
+    pool = ['%d %s %s' % (rng.randint(1, 9999), rng.choice(names), rng.choice(types)) for _ in range(DISTINCT)]
+    # a few addresses are used far more often than the rest
+    return [pool[min(int(rng.paretovariate(1.2)) - 1, DISTINCT - 1)] for _ in range(CALLS)]
+
+
+def time_calls(function, stream):
+    start = time.perf_counter()
+    for address in stream:
+        function(address)
+    return (time.perf_counter() - start) / len(stream) * 1e6
+
+
+if __name__ == '__main__':
+    stream = addresses()
+    engine = AddressEngine()
+    print('uncached:             %8.2f us/call' % time_calls(normalize_address, stream))
+    print('cached:               %8.2f us/call' % time_calls(engine.is_valid, stream))
+    print('hit rate:             %8.1f %%' % (engine.hit_rate() * 100))
+    start = time.perf_counter()
+    AddressEngine().validate_batch(stream)
+    print('batch:                %8.2f us/address' % ((time.perf_counter() - start) / len(stream) * 1e6))
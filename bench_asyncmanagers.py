@@ -0,0 +1,61 @@
+# Drives the 4.4 checkout-and-receipt flow with thousands of concurrent tasks.
+# Run with: python bench_asyncmanagers.py
+import asyncio
+import statistics
+import time
+from datetime import datetime
+
+from account import Account
+from accountmanager import AccountManager
+from asyncmanagers import AsyncAccountManager, AsyncEmailUtils, AsyncOrderManager, AsyncReceiptManager
+from emailoutbox import EmailOutbox, MemoryTransport
+from emailutils import EmailUtils
+from order import Order
+from ordermanager import OrderManager
+from receipt import Receipt
+from receiptmanager import ReceiptManager
+
+TASKS = 5000
+REGISTERED = 1000
+
+
+async def checkout(services, i, staff, latencies):
+    accounts, orders, receipts, email_utils = services
+    start = time.perf_counter()
+    email_address = 'customer%d@example.com' % i
+    customer = accounts.manager.find_account(email_address)
+    if not await email_utils.account_exist(email_address):
+        customer = Account(email_address)
+    order = Order(customer, staff)
+    order.order_date = datetime(2020, 12, 1 + i % 28)
+    order.payment_method = 'visa'
+    order.total_cost = 20 + i % 30
+    await orders.add_order(order)
+    receipt = Receipt(order)
+    await email_utils.send_receipt(email_address, receipt)
+    await receipts.add_receipt(receipt)
+    latencies.append(time.perf_counter() - start)
+
+
+async def run(services, staff):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(checkout(services, i, staff, latencies) for i in range(TASKS)))
+    await services[3].flush()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return TASKS / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+
+if __name__ == '__main__':
+    account_manager = AccountManager()
+    for i in range(REGISTERED):
+        account_manager.add_account(Account('customer%d@example.com' % (i * 2)))
+    staff = Account('staff@example.com')
+    outbox = EmailOutbox(MemoryTransport())
+    services = (AsyncAccountManager(account_manager), AsyncOrderManager(OrderManager()),
+                AsyncReceiptManager(ReceiptManager()), AsyncEmailUtils(EmailUtils(outbox, account_manager)))
+
+    throughput, p50, p99 = asyncio.run(run(services, staff))
+    print('checkouts: %d tasks, %.0f/s, p50 %.2f ms, p99 %.2f ms' % (TASKS, throughput, p50 * 1000, p99 * 1000))
+    print('outbox: %s' % outbox.metrics())
@@ -0,0 +1,51 @@
+# ban_account latency with and without the audit log, audit write rate, and
+# history query latency for one account in a large log.
+# Run with: python bench_auditlog.py
+import tempfile
+import time
+
+from account import Account
+from accountmanager import AccountManager
+from auditlog import AuditLog
+
+ACCOUNTS = 10000
+CALLS = 200000
+QUERIES = 1000
+
+
+def build(audit_log):
+    manager = AccountManager(audit_log=audit_log)
+    accounts = []
+    for i in range(ACCOUNTS):
+        account = Account('customer%d@example.com' % i)
+        manager._insert_account('customer%d@example.com' % i, account, None)
+        accounts.append(account)
+    return manager, accounts
+
+
+def time_bans(manager, accounts):
+    start = time.perf_counter()
+    for i in range(CALLS):
+        manager.ban_account(accounts[i % ACCOUNTS], i % 2 == 0)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    manager, accounts = build(None)
+    print('ban, no audit:        %8.2f us/call' % (time_bans(manager, accounts) / CALLS * 1e6))
+
+    with tempfile.TemporaryDirectory() as directory:
+        audit_log = AuditLog(directory)
+        manager, accounts = build(audit_log)
+        elapsed = time_bans(manager, accounts)
+        print('ban, audited:         %8.2f us/call' % (elapsed / CALLS * 1e6))
+        start = time.perf_counter()
+        audit_log.flush()
+        print('audit writes:         %8.0f records/s' % (CALLS / (elapsed + time.perf_counter() - start)))
+
+        start = time.perf_counter()
+        for i in range(QUERIES):
+            audit_log.history('customer%d@example.com' % (i * 7 % ACCOUNTS))
+        print('history query:        %8.1f us (%d records each)' % (
+            (time.perf_counter() - start) / QUERIES * 1e6, CALLS // ACCOUNTS))
+        audit_log.close()
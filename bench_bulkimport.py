@@ -0,0 +1,44 @@
+# Import throughput and peak memory for a large account file.
+# Run with: python bench_bulkimport.py [rows]
+import csv
+import io
+import resource
+import sys
+import tempfile
+
+from account import CUSTOMER
+from accountmanager import AccountManager
+from bulkimport import ACCOUNT_COLUMNS, BulkLoader, export_accounts
+from passwordhasher import PasswordHasher, hash_password
+
+ROWS = 1000000
+
+
+def write_accounts(destination, rows):
+    # every row shares one pre-hashed password, as migrated data would
+    password_hash = hash_password('Password1', 1000, 'sha256', b'0' * 16)
+    writer = csv.writer(destination)
+    writer.writerow(ACCOUNT_COLUMNS)
+    for i in range(rows):
+        writer.writerow(('user%d@example.com' % i, 'first', 'last', '%d valid drive' % i, '', CUSTOMER,
+                         'false', 'false', '', password_hash))
+
+
+def peak_memory_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    with tempfile.TemporaryFile('w+', newline='') as source:
+        write_accounts(source, rows)
+        source.seek(0)
+        print('peak memory before:   %8.1f MB' % peak_memory_mb())
+        manager = AccountManager(PasswordHasher(iterations=1000))
+        report = BulkLoader(manager).import_accounts(source)
+    # the numbers only mean something when every row went in
+    assert report.imported == rows, 'rejected rows: %s' % report.rejected
+    print('imported:             %8d rows' % report.imported)
+    print('import:               %8.0f rows/s' % report.rows_per_second)
+    print('peak memory after:    %8.1f MB' % peak_memory_mb())
+    export_accounts(manager, io.StringIO())
@@ -0,0 +1,187 @@
+# End-to-end benchmark of the 4.1 - 4.8 workflows on seeded synthetic data.
+# Each size runs in its own process so peak RSS is per size. Prints one JSON
+# object per size, or writes them all to --output, for comparing versions.
+# Run with: python bench_checkout.py [--sizes 1000 100000 1000000] [--output results.json]
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from account import CUSTOMER, KITCHEN_MANAGER, KITCHEN_STAFF, Account
+from accountmanager import AccountManager
+from emailoutbox import EmailOutbox, MemoryTransport
+from emailutils import EmailUtils
+from order import Order
+from ordermanager import OrderManager
+from passwordhasher import PasswordHasher
+from ratelimiter import LoginRateLimiter
+from receipt import Receipt
+from receiptmanager import ReceiptManager
+
+SIZES = [1000, 100000, 1000000]
+# timed calls per workflow, the population itself is loaded untimed
+OPERATIONS = 2000
+STAFF = 50
+PASSWORD = 'Password1'
+START_DATE = datetime(2020, 1, 1)
+
+
+class Store:
+
+    def __init__(self, size, seed, iterations):
+        self.rng = random.Random(seed)
+        self.hasher = PasswordHasher(iterations=iterations)
+        self.outbox = EmailOutbox(MemoryTransport())
+        # limits sized for a benchmark client, not for abuse protection
+        limiter = LoginRateLimiter(email_burst=OPERATIONS, client_burst=OPERATIONS)
+        self.accounts = AccountManager(self.hasher, self.outbox, login_rate_limiter=limiter)
+        self.orders = OrderManager(account_manager=self.accounts)
+        self.receipts = ReceiptManager(account_manager=self.accounts)
+        self.email_utils = EmailUtils(self.outbox, self.accounts)
+        self.staff = []
+        self.customers = []
+        self.populate(size)
+
+    # every customer shares one hash so loading 1M accounts stays cheap
+    def populate(self, size):
+        password_hash = self.hasher.hash(PASSWORD)
+        for i in range(STAFF):
+            self.staff.append(self.insert('staff%d@example.com' % i, KITCHEN_STAFF, password_hash))
+        for i in range(size):
+            self.customers.append(self.insert('customer%d@example.com' % i, CUSTOMER, password_hash))
+        for i in range(size):
+            self.checkout(self.rng.choice(self.customers), i)
+
+    def insert(self, email, role, password_hash):
+        account = Account(email, role)
+        account.first_name = 'first'
+        account.last_name = 'last'
+        account.home_address = '10 valid drive'
+        account.is_locked = False
+        self.accounts._insert_account(email, account, password_hash)
+        return account
+
+    def checkout(self, customer, number, send_email=False):
+        order = Order(customer, self.staff[number % len(self.staff)])
+        order.order_date = START_DATE + timedelta(minutes=number)
+        order.payment_method = 'visa'
+        order.billing_address = '10 valid drive'
+        order.total_cost = self.rng.randint(5, 100)
+        self.orders.add_order(order)
+        receipt = Receipt(order)
+        self.receipts.add_receipt(receipt)
+        if send_email:
+            self.email_utils.send_receipt(customer.email_address, receipt)
+
+
+def measure(name, function, arguments):
+    latencies = []
+    started = time.perf_counter()
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'workflow': name,
+        'operations': len(latencies),
+        'ops_per_second': len(latencies) / elapsed if elapsed > 0 else 0,
+        'p50_us': latencies[len(latencies) // 2] * 1e6,
+        'p99_us': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6,
+    }
+
+
+def run(size, seed, iterations):
+    started = time.perf_counter()
+    store = Store(size, seed, iterations)
+    load_seconds = time.perf_counter() - started
+    rng = store.rng
+    accounts = store.accounts
+
+    # 4.1 Registration followed by 4.1.3.4 Account activation
+    def register(number):
+        account = Account('new%d@example.com' % number)
+        account.password = PASSWORD
+        accounts.add_account(account)
+        accounts.send_email_verification_email(account)
+        accounts.unlock_account(account.activation_code)
+
+    # 4.3 Login
+    def login(customer):
+        accounts.login(customer.email_address, PASSWORD)
+
+    # 4.5 Email Receipt after Order
+    def checkout(customer):
+        store.checkout(customer, rng.randrange(size), send_email=True)
+
+    # 4.7.3 and 4.8 staff views
+    def view_accounts(number):
+        accounts.view_accounts_page(KITCHEN_MANAGER, limit=50)
+
+    def view_orders(staff):
+        store.orders.view_orders_received_by(staff)[:50]
+
+    def view_receipts(staff):
+        [receipt.total_cost for receipt in store.receipts.get_all_receipts(staff)[:50]]
+
+    # 4.8.2 Account banning
+    def ban_and_unban(customer):
+        accounts.ban_account(customer, True)
+        accounts.ban_account(customer, False)
+
+    customers = rng.sample(store.customers, min(OPERATIONS, len(store.customers)))
+    staff = [rng.choice(store.staff) for _ in range(OPERATIONS)]
+    workflows = [
+        measure('register_and_activate', register, range(OPERATIONS)),
+        measure('login', login, customers),
+        measure('checkout_with_receipt', checkout, customers),
+        measure('staff_view_accounts', view_accounts, range(OPERATIONS)),
+        measure('staff_view_orders', view_orders, staff),
+        measure('staff_view_receipts', view_receipts, staff),
+        measure('ban_and_unban', ban_and_unban, customers),
+    ]
+    store.outbox.flush()
+    return {
+        'size': size,
+        'seed': seed,
+        'password_iterations': iterations,
+        'load_seconds': load_seconds,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'workflows': workflows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--seed', type=int, default=1)
+    # the production cost would dominate every workflow that hashes
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--output')
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.size != None:
+        print(json.dumps(run(arguments.size, arguments.seed, arguments.iterations)))
+        return
+
+    results = []
+    for size in arguments.sizes:
+        output = subprocess.run([sys.executable, __file__, '--size', str(size), '--seed', str(arguments.seed),
+                                 '--iterations', str(arguments.iterations)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output)
+        results.append(result)
+        print(json.dumps(result))
+    if arguments.output != None:
+        with open(arguments.output, 'w') as destination:
+            json.dump(results, destination, indent=2)
+
+
+if __name__ == '__main__':
+    main()
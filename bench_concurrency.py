@@ -0,0 +1,68 @@
+# Multi-threaded registration stress test for a thread-safe AccountManager.
+# Run with: python bench_concurrency.py
+import threading
+import time
+
+from account import Account
+from accountmanager import AccountManager
+from passwordhasher import PasswordHasher
+
+THREADS = [1, 2, 4, 8, 16]
+ACCOUNTS = 20000
+RACE_ACCOUNTS = 2000
+ITERATIONS = 1000
+
+
+def register(manager, emails, results):
+    created = 0
+    for email in emails:
+        account = Account(email)
+        account.password = 'Password1'
+        if manager.add_account(account):
+            created += 1
+        manager.is_account_banned(account)
+    results.append(created)
+
+
+def run(manager, email_lists):
+    results = []
+    workers = [threading.Thread(target=register, args=(manager, emails, results)) for emails in email_lists]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results, time.perf_counter() - start
+
+
+def check(manager, results, accounts):
+    assert sum(results) == accounts, 'duplicate or missing registrations'
+    assert len(manager.accounts) == accounts
+    assert sum(len(partition) for partition in manager.partitions.values()) == accounts
+
+
+# each thread registers its own emails, so every attempt creates an account
+def bench(threads):
+    manager = AccountManager(PasswordHasher(iterations=ITERATIONS), thread_safe=True)
+    emails = ['customer%d@example.com' % i for i in range(ACCOUNTS)]
+    results, elapsed = run(manager, [emails[n::threads] for n in range(threads)])
+    check(manager, results, ACCOUNTS)
+    return ACCOUNTS / elapsed
+
+
+# every thread tries to register every email, in a different order; exactly
+# one registration per email may succeed
+def race(threads):
+    manager = AccountManager(PasswordHasher(iterations=ITERATIONS), thread_safe=True)
+    emails = ['customer%d@example.com' % i for i in range(RACE_ACCOUNTS)]
+    results, _ = run(manager, [emails if n % 2 == 0 else emails[::-1] for n in range(threads)])
+    check(manager, results, RACE_ACCOUNTS)
+
+
+if __name__ == '__main__':
+    print('%8s %16s' % ('threads', 'registrations/s'))
+    for threads in THREADS:
+        print('%8d %16.0f' % (threads, bench(threads)))
+    for threads in THREADS[1:]:
+        race(threads)
+    print('duplicate race: no duplicate or missing registrations')
@@ -0,0 +1,47 @@
+# account_exist latency with and without the customer cache, and the hit
+# rate for a receipt stream mixing repeat customers and guests.
+# Run with: python bench_customercache.py
+import random
+import time
+
+from account import Account
+from accountmanager import AccountManager
+from customercache import CustomerCache
+from emailutils import EmailUtils
+
+ACCOUNTS = 100000
+CALLS = 200000
+
+
+# the manager lookup stands in for a round trip to the account store
+class SlowAccountManager(AccountManager):
+
+    def find_account(self, email_address):
+        time.sleep(0)
+        return super().find_account(email_address)
+
+
+def emails(seed=1):
+    rng = random.Random(seed)
+    # one receipt in five goes to one of a smaller set of guests
+    return ['guest%d@example.com' % rng.randint(0, 1000) if rng.random() < 0.2
+            else 'user%d@example.com' % min(int(rng.paretovariate(1.1)), ACCOUNTS - 1) for _ in range(CALLS)]
+
+
+def time_calls(function, stream):
+    start = time.perf_counter()
+    for email in stream:
+        function(email)
+    return (time.perf_counter() - start) / len(stream) * 1e6
+
+
+if __name__ == '__main__':
+    manager = SlowAccountManager()
+    for i in range(ACCOUNTS):
+        manager._insert_account('user%d@example.com' % i, Account('user%d@example.com' % i), None)
+    stream = emails()
+    uncached = EmailUtils(account_manager=manager, customer_cache=CustomerCache(manager, max_entries=0))
+    cached = EmailUtils(account_manager=manager)
+    print('uncached:             %8.2f us/call' % time_calls(uncached.account_exist, stream))
+    print('cached:               %8.2f us/call' % time_calls(cached.account_exist, stream))
+    print('metrics:              %s' % cached.customer_cache.metrics())
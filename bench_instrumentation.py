@@ -0,0 +1,46 @@
+# Cost of instrumentation on OrderManager.add_order: detached, attached but
+# disabled, enabled, and enabled with sampled profiling.
+# Run with: python bench_instrumentation.py
+import time
+
+from account import Account
+from instrumentation import Instrumentation
+from order import Order
+from ordermanager import OrderManager
+
+CALLS = 100000
+
+
+def time_add_order(setup):
+    manager = OrderManager()
+    instrumentation = Instrumentation()
+    setup(manager, instrumentation)
+    customer = Account('customer@example.com')
+    orders = [Order(customer, None) for _ in range(CALLS)]
+    start = time.perf_counter()
+    for order in orders:
+        manager.add_order(order)
+    elapsed = (time.perf_counter() - start) / CALLS * 1e9
+    instrumentation.stop_profiling()
+    return elapsed
+
+
+def attached(manager, instrumentation):
+    instrumentation.attach('order_manager', manager)
+
+
+def enabled(manager, instrumentation):
+    attached(manager, instrumentation)
+    instrumentation.enable()
+
+
+def profiled(manager, instrumentation):
+    enabled(manager, instrumentation)
+    instrumentation.start_profiling(every=100)
+
+
+if __name__ == '__main__':
+    print('no instrumentation:   %8.0f ns/call' % time_add_order(lambda manager, instrumentation: None))
+    print('attached, disabled:   %8.0f ns/call' % time_add_order(attached))
+    print('enabled:              %8.0f ns/call' % time_add_order(enabled))
+    print('sampled profiling:    %8.0f ns/call' % time_add_order(profiled))
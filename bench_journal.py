@@ -0,0 +1,54 @@
+# Journal write throughput at several group-commit intervals, and restart time.
+# Run with: python bench_journal.py
+import tempfile
+import time
+
+from account import Account
+from accountmanager import AccountManager
+from journal import Journal
+from order import Order
+from ordermanager import OrderManager
+
+INTERVALS = [0, 0.001, 0.01, 0.1]
+WRITES = 20000
+RESTART_RECORDS = 1000000
+
+
+def bench_writes(interval):
+    with tempfile.TemporaryDirectory() as directory:
+        manager = OrderManager(Journal(directory, 'orders', interval))
+        customer = Account('customer@example.com')
+        start = time.perf_counter()
+        for i in range(WRITES):
+            order = Order(customer, None)
+            order.total_cost = i
+            manager.add_order(order)
+        manager.journal.close()
+        return WRITES / (time.perf_counter() - start)
+
+
+def timed_open(directory):
+    start = time.perf_counter()
+    manager = AccountManager(journal=Journal(directory, 'accounts', 1))
+    return manager, time.perf_counter() - start
+
+
+def bench_restart():
+    with tempfile.TemporaryDirectory() as directory:
+        manager = AccountManager(journal=Journal(directory, 'accounts', 1, snapshot_interval=RESTART_RECORDS + 1))
+        for i in range(RESTART_RECORDS):
+            manager.add_account(Account('customer%d@example.com' % i))
+        manager.journal.close()
+
+        manager, log_replay = timed_open(directory)
+        manager.checkpoint()
+        manager, snapshot_load = timed_open(directory)
+        assert len(manager.accounts) == RESTART_RECORDS
+        return log_replay, snapshot_load
+
+
+if __name__ == '__main__':
+    for interval in INTERVALS:
+        print('group commit %6.3fs: %10.0f writes/s' % (interval, bench_writes(interval)))
+    log_replay, snapshot_load = bench_restart()
+    print('restart with %d records: log replay %.2fs, snapshot %.2fs' % (RESTART_RECORDS, log_replay, snapshot_load))
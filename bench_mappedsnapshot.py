@@ -0,0 +1,45 @@
+# Startup time and memory of a mapped snapshot versus rebuilding a manager.
+# Run with: python bench_mappedsnapshot.py
+import os
+import tempfile
+import time
+import tracemalloc
+
+from account import Account
+from accountmanager import AccountManager
+from mappedsnapshot import MappedSnapshot, write_mapped_snapshot
+
+SIZES = [10000, 100000, 1000000]
+LOOKUPS = 10000
+
+
+def bench_size(directory, size):
+    manager = AccountManager()
+    for i in range(size):
+        manager.add_account(Account('customer%d@example.com' % i))
+    path = os.path.join(directory, 'accounts-%d.snapshot' % size)
+    write_mapped_snapshot(path, manager)
+    del manager
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    snapshot = MappedSnapshot(path)
+    open_time = time.perf_counter() - start
+    open_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for i in range(LOOKUPS):
+        snapshot.find_account('customer%d@example.com' % (i * 7919 % size))
+    lookup_time = (time.perf_counter() - start) / LOOKUPS
+    snapshot.close()
+    return open_time, open_memory, lookup_time, os.path.getsize(path)
+
+
+if __name__ == '__main__':
+    print('%10s %12s %14s %12s %12s' % ('accounts', 'open ms', 'open bytes', 'lookup us', 'file MB'))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            open_time, open_memory, lookup_time, file_size = bench_size(directory, size)
+            print('%10d %12.3f %14d %12.2f %12.1f' % (size, open_time * 1000, open_memory,
+                                                      lookup_time * 1e6, file_size / 1e6))
@@ -0,0 +1,39 @@
+# First-page latency for a customer with many orders.
+# Run with: python bench_ordermanager.py
+import time
+from datetime import datetime, timedelta
+
+from account import Account
+from order import Order
+from ordermanager import OrderManager
+
+ORDERS = 100000
+REPEAT = 1000
+
+
+def build_manager(customer):
+    manager = OrderManager()
+    staff = Account('staff@example.com')
+    start = datetime(2020, 1, 1)
+    for i in range(ORDERS):
+        order = Order(customer, staff)
+        order.order_date = start + timedelta(minutes=i)
+        manager.add_order(order)
+    return manager
+
+
+def time_call(function):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function()
+    return (time.perf_counter() - start) / REPEAT * 1e6
+
+
+if __name__ == '__main__':
+    customer = Account('loyal@example.com')
+    manager = build_manager(customer)
+    week = (datetime(2020, 2, 1), datetime(2020, 2, 8))
+    print('first page:           %8.1f us' % time_call(lambda: manager.view_orders_page(customer)))
+    print('first page in range:  %8.1f us' % time_call(lambda: manager.view_orders_page(customer, None, 50, *week)))
+    print('view first order:     %8.1f us' % time_call(lambda: manager.view_all_orders(customer)[0]))
+    print('materialized list:    %8.1f us' % time_call(lambda: list(manager.view_all_orders(customer))[:50]))
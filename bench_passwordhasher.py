@@ -0,0 +1,48 @@
+# Concurrent login benchmark at several PBKDF2 cost settings.
+# Run with: python bench_passwordhasher.py
+import asyncio
+import statistics
+import time
+
+from account import Account
+from accountmanager import AccountManager
+from passwordhasher import PasswordHasher
+
+ITERATIONS = [1000, 10000, 100000]
+ACCOUNTS = 50
+LOGINS = 200
+WORKERS = 4
+
+
+def build_manager(iterations):
+    manager = AccountManager(PasswordHasher(iterations=iterations, max_workers=WORKERS))
+    for i in range(ACCOUNTS):
+        account = Account('customer%d@example.com' % i)
+        account.password = 'Password%d' % i
+        account.is_locked = False
+        manager.add_account(account)
+    return manager
+
+
+async def timed_login(manager, i, latencies):
+    start = time.perf_counter()
+    await manager.login_async('customer%d@example.com' % (i % ACCOUNTS), 'Password%d' % (i % ACCOUNTS))
+    latencies.append(time.perf_counter() - start)
+
+
+async def bench_logins(manager):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(timed_login(manager, i, latencies) for i in range(LOGINS)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return LOGINS / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+
+if __name__ == '__main__':
+    print('%10s %12s %10s %10s' % ('iterations', 'logins/s', 'p50 ms', 'p99 ms'))
+    for iterations in ITERATIONS:
+        manager = build_manager(iterations)
+        throughput, p50, p99 = asyncio.run(bench_logins(manager))
+        manager.password_hasher.shutdown()
+        print('%10d %12.0f %10.2f %10.2f' % (iterations, throughput, p50 * 1000, p99 * 1000))
@@ -0,0 +1,38 @@
+# Concurrent rate limiter throughput by thread count and shard count.
+# Run with: python bench_ratelimiter.py
+import threading
+import time
+
+from ratelimiter import RateLimiter
+
+CHECKS_PER_THREAD = 100000
+THREADS = [1, 2, 4, 8]
+SHARDS = [1, 16]
+KEYS = 10000
+
+
+def worker(limiter, offset):
+    allow = limiter.allow
+    for i in range(CHECKS_PER_THREAD):
+        allow('customer%d@example.com' % ((i + offset) % KEYS))
+
+
+def bench(threads, shards):
+    limiter = RateLimiter(rate=1, burst=5, shards=shards)
+    workers = [threading.Thread(target=worker, args=(limiter, n * 7919)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    assert limiter.allowed_count + limiter.rejected_count == threads * CHECKS_PER_THREAD
+    return threads * CHECKS_PER_THREAD / elapsed, limiter.rejected_count
+
+
+if __name__ == '__main__':
+    print('%8s %8s %14s %12s' % ('threads', 'shards', 'checks/s', 'rejected'))
+    for shards in SHARDS:
+        for threads in THREADS:
+            throughput, rejected = bench(threads, shards)
+            print('%8d %8d %14.0f %12d' % (threads, shards, throughput, rejected))
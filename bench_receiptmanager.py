@@ -0,0 +1,48 @@
+# Memory per stored receipt and latency of listing a staff member's receipts.
+# Run with: python bench_receiptmanager.py
+import time
+import tracemalloc
+
+from account import Account
+from order import Order
+from receipt import Receipt
+from receiptmanager import ReceiptManager
+from receiptrenderer import ReceiptRenderer
+
+RECEIPTS = 100000
+REPEAT = 100
+
+
+def build_manager(staff, with_content):
+    renderer = ReceiptRenderer()
+    customers = [Account('customer%d@example.com' % i) for i in range(1000)]
+    orders = [Order(customers[i % len(customers)], staff) for i in range(RECEIPTS)]
+    tracemalloc.start()
+    manager = ReceiptManager(renderer=renderer)
+    for order in orders:
+        receipt = Receipt(order)
+        if with_content:
+            receipt.content = renderer.render(receipt, False)
+        manager.add_receipt(receipt)
+    # rendered strings are freed once compressed, so only what is kept counts
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return manager, size
+
+
+def time_call(function):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function()
+    return (time.perf_counter() - start) / REPEAT * 1e3
+
+
+if __name__ == '__main__':
+    staff = Account('staff@example.com')
+    for with_content in (False, True):
+        manager, size = build_manager(staff, with_content)
+        label = 'compressed content' if with_content else 'lazy content'
+        print('%-20s %8.1f bytes/receipt' % (label + ':', size / RECEIPTS))
+    print('list metadata:       %8.2f ms' % time_call(lambda: [info.total_cost for info in manager.get_all_receipts(staff)]))
+    print('first page:          %8.4f ms' % time_call(lambda: manager.get_all_receipts(staff)[:50]))
+    print('read hot content:    %8.4f ms' % time_call(lambda: manager.get_receipt_content(0)))
@@ -0,0 +1,41 @@
+# Receipt rendering throughput for guest and existing-account receipts.
+# Run with: python bench_receiptrenderer.py
+import time
+
+from account import Account
+from order import Order
+from receipt import Receipt
+from receiptrenderer import ReceiptRenderer
+
+COUNT = 100000
+
+
+def make_receipts(count):
+    staff = Account('staff@example.com')
+    receipts = []
+    for i in range(count):
+        customer = Account('customer%d@example.com' % i)
+        customer.first_name = 'Customer'
+        customer.last_name = str(i)
+        order = Order(customer, staff)
+        order.payment_method = 'visa'
+        order.billing_address = '%d valid drive' % i
+        order.shipping_cost = 5
+        order.tax_cost = 2.6
+        order.total_cost = 27.6
+        receipts.append(Receipt(order))
+    return receipts
+
+
+def bench_render(renderer, receipts, is_guest):
+    start = time.perf_counter()
+    for receipt in receipts:
+        renderer.render(receipt, is_guest)
+    return len(receipts) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    renderer = ReceiptRenderer()
+    receipts = make_receipts(COUNT)
+    print('guest:    %10.0f receipts/s' % bench_render(renderer, receipts, True))
+    print('existing: %10.0f receipts/s' % bench_render(renderer, receipts, False))
@@ -0,0 +1,75 @@
+# Writer throughput (add_account + add_order) while long staff reports run:
+# no reports, reports on a snapshot, and reports holding the index lock.
+# Run with: python bench_reportsnapshot.py
+import threading
+import time
+
+from account import KITCHEN_MANAGER, Account
+from accountmanager import AccountManager
+from order import Order
+from ordermanager import OrderManager
+from reportsnapshot import ReportSnapshot
+
+ACCOUNTS = 100000
+DURATION = 3
+REPORTERS = 2
+
+
+def build():
+    accounts = AccountManager(thread_safe=True)
+    orders = OrderManager()
+    for i in range(ACCOUNTS):
+        account = Account('customer%d@example.com' % i)
+        accounts._insert_account('customer%d@example.com' % i, account, None)
+        orders.add_order(Order(account, None))
+    return accounts, orders
+
+
+def snapshot_report(accounts, orders):
+    with ReportSnapshot(accounts, orders) as report:
+        for account in report.accounts.view_all_accounts(KITCHEN_MANAGER):
+            pass
+        for order in report.orders.all_orders():
+            pass
+
+
+# what a report would need without snapshots to get a consistent view
+def locked_report(accounts, orders):
+    with accounts.index_lock:
+        for account in accounts.view_all_accounts(KITCHEN_MANAGER):
+            pass
+        for order in list(orders.orders.orders):
+            pass
+
+
+def bench(report):
+    accounts, orders = build()
+    stop = threading.Event()
+    reports = []
+
+    def reporter():
+        while not stop.is_set():
+            report(accounts, orders)
+            reports.append(1)
+
+    readers = [threading.Thread(target=reporter) for _ in range(REPORTERS if report != None else 0)]
+    for reader in readers:
+        reader.start()
+    writes = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        account = Account('new%d@example.com' % writes)
+        accounts.add_account(account)
+        orders.add_order(Order(account, None))
+        writes += 1
+    stop.set()
+    for reader in readers:
+        reader.join()
+    return writes / DURATION, len(reports)
+
+
+if __name__ == '__main__':
+    print('%-18s %12s %10s' % ('reports', 'writes/s', 'reports'))
+    for name, report in (('none', None), ('snapshot', snapshot_report), ('index lock', locked_report)):
+        writes, reports = bench(report)
+        print('%-18s %12.0f %10d' % (name, writes, reports))
@@ -0,0 +1,47 @@
+# Prefix search over names and emails against a naive linear scan.
+# Run with: python bench_searchindex.py
+import random
+import time
+
+from account import Account
+from accountmanager import AccountManager
+
+SIZE = 1000000
+QUERIES = 200
+FIRST_NAMES = ['Greg', 'Bob', 'John', 'Joe', 'Alice', 'Maria', 'Wei', 'Priya', 'Omar', 'Zoe']
+
+
+def build_manager(size, rng):
+    manager = AccountManager()
+    for i in range(size):
+        account = Account('customer%d@example.com' % i)
+        account.first_name = rng.choice(FIRST_NAMES)
+        account.last_name = 'Surname%d' % rng.randrange(size)
+        manager.add_account(account)
+    return manager
+
+
+def linear_scan(manager, prefix, limit):
+    found = []
+    for account in manager.accounts.values():
+        if any(value and value.lower().startswith(prefix)
+               for value in (account.email_address, account.first_name, account.last_name)):
+            found.append(account)
+            if len(found) == limit:
+                break
+    return found
+
+
+def time_queries(function, prefixes):
+    start = time.perf_counter()
+    for prefix in prefixes:
+        function(prefix)
+    return (time.perf_counter() - start) / len(prefixes) * 1000
+
+
+if __name__ == '__main__':
+    rng = random.Random(12)
+    manager = build_manager(SIZE, rng)
+    prefixes = ['surname%d' % rng.randrange(SIZE) for _ in range(QUERIES)]
+    print('index top-10:       %10.3f ms/query' % time_queries(lambda p: manager.search_accounts(p, 10), prefixes))
+    print('linear scan top-10: %10.3f ms/query' % time_queries(lambda p: linear_scan(manager, p, 10), prefixes[:10]))
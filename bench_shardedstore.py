@@ -0,0 +1,58 @@
+# Login and checkout throughput of the sharded store from 1 to N worker
+# processes. Client threads block on their shard's pipe without holding the
+# GIL, so throughput scales with shards up to the number of cores.
+# Run with: python bench_shardedstore.py
+import os
+import threading
+import time
+
+from account import Account
+from order import Order
+from passwordhasher import PasswordHasher
+from shardedstore import ShardedStore
+
+ACCOUNTS = 2000
+OPERATIONS = 4000
+CLIENTS_PER_SHARD = 2
+ITERATIONS = 10000
+
+
+def populate(store):
+    for i in range(ACCOUNTS):
+        account = Account('customer%d@example.com' % i)
+        account.password = 'Password1'
+        store.account_manager.add_account(account)
+        store.account_manager.send_email_verification_email(account)
+        store.account_manager.unlock_account(account.activation_code)
+
+
+def client(store, numbers):
+    for number in numbers:
+        email = 'customer%d@example.com' % (number % ACCOUNTS)
+        store.account_manager.login(email, 'Password1')
+        store.order_manager.add_order(Order(Account(email), None))
+
+
+def bench(shards):
+    store = ShardedStore(shards, PasswordHasher(iterations=ITERATIONS))
+    populate(store)
+    clients = shards * CLIENTS_PER_SHARD
+    workers = [threading.Thread(target=client, args=(store, range(n, OPERATIONS, clients))) for n in range(clients)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    store.close()
+    return OPERATIONS / elapsed
+
+
+if __name__ == '__main__':
+    cores = os.cpu_count()
+    print('%d cores' % cores)
+    print('%8s %16s' % ('shards', 'checkouts/s'))
+    shards = 1
+    while shards <= max(cores, 2):
+        print('%8d %16.0f' % (shards, bench(shards)))
+        shards *= 2
@@ -0,0 +1,67 @@
+# Issue, redeem and expire throughput of the token store, and its memory.
+# Run with: python bench_tokenstore.py
+import sys
+import time
+import tracemalloc
+
+from tokenstore import TokenStore
+
+TOKENS = 1000000
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def rate(count, start):
+    return count / (time.perf_counter() - start)
+
+
+def fill(store, clock):
+    codes = []
+    for i in range(TOKENS):
+        # spread issue times over an hour so tokens land in many buckets
+        clock.now = i * 3600 / TOKENS
+        codes.append(store.issue(i))
+    return codes
+
+
+def steady_state_memory():
+    clock = FakeClock()
+    tracemalloc.start()
+    store = TokenStore(ttl=3600, clock=clock)
+    codes = fill(store, clock)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the codes themselves are shared with the store, only the list is extra
+    return memory - sys.getsizeof(codes)
+
+
+if __name__ == '__main__':
+    clock = FakeClock()
+    store = TokenStore(ttl=3600, clock=clock)
+
+    start = time.perf_counter()
+    codes = fill(store, clock)
+    issue_rate = rate(TOKENS, start)
+
+    start = time.perf_counter()
+    for code in codes[:TOKENS // 2]:
+        store.redeem(code)
+    redeem_rate = rate(TOKENS // 2, start)
+
+    clock.now += 7200
+    start = time.perf_counter()
+    store.expire()
+    expire_rate = rate(TOKENS - TOKENS // 2, start)
+
+    print('issue:  %12.0f tokens/s' % issue_rate)
+    print('redeem: %12.0f tokens/s' % redeem_rate)
+    print('expire: %12.0f tokens/s' % expire_rate)
+    assert len(store) == 0
+    print('memory: %12.1f bytes/token with %d outstanding' % (steady_state_memory() / TOKENS, TOKENS))
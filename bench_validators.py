@@ -0,0 +1,36 @@
+# Throughput benchmark for signup validation.
+# Run with: python bench_validators.py
+import time
+
+from accountmanager import AccountManager
+
+COUNT = 200000
+
+
+def make_rows(count):
+    rows = []
+    for i in range(count):
+        email = 'customer%d@example.com' % i if i % 10 else 'customer%dexample.com' % i
+        password = 'Password%d' % i if i % 7 else 'password'
+        rows.append(('Greg', 'Gregton', email, '46 Greg Ave', password))
+    return rows
+
+
+def bench_single(manager, rows):
+    start = time.perf_counter()
+    for row in rows:
+        manager.verify_account(*row)
+    return len(rows) / (time.perf_counter() - start)
+
+
+def bench_batch(manager, rows):
+    start = time.perf_counter()
+    manager.verify_accounts_batch(rows)
+    return len(rows) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    manager = AccountManager()
+    rows = make_rows(COUNT)
+    print('single: %12.0f validations/s' % bench_single(manager, rows))
+    print('batch:  %12.0f validations/s' % bench_batch(manager, rows))
@@ -0,0 +1,282 @@
+import csv
+import itertools
+import json
+import os
+import time
+from datetime import date as date_type, datetime
+
+import validators
+from addressengine import AddressEngine
+from account import CUSTOMER, STAFF_ROLES, Account
+from accountmanager import normalize_email
+from journal import AccountResolver
+from order import Order
+from passwordhasher import hash_password, parse_hash
+from receipt import Receipt
+
+DEFAULT_CHUNK_SIZE = 10000
+ACCOUNT_COLUMNS = ('email_address', 'first_name', 'last_name', 'home_address', 'address', 'role',
+                   'is_locked', 'is_banned', 'password', 'password_hash')
+ORDER_COLUMNS = ('customer_email', 'staff_email', 'order_date', 'payment_method', 'billing_address',
+                 'shipping_cost', 'tax_cost', 'total_cost')
+RECEIPT_COLUMNS = ORDER_COLUMNS + ('content',)
+
+# rejection codes for cells that do not convert
+INVALID_NUMBER = 'invalid_number'
+INVALID_DATE = 'invalid_date'
+INVALID_PASSWORD_HASH = 'invalid_password_hash'
+INVALID_ROLE = 'invalid_role'
+
+
+def read_rows(source, format='csv'):
+    if format == 'csv':
+        yield from csv.DictReader(source)
+    elif format == 'jsonl':
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError('unknown format %s' % format)
+
+
+class RowWriter:
+
+    def __init__(self, destination, columns, format='csv'):
+        if format not in ('csv', 'jsonl'):
+            raise ValueError('unknown format %s' % format)
+        self.destination = destination
+        self.columns = columns
+        self.format = format
+        if format == 'csv':
+            self.writer = csv.writer(destination)
+            self.writer.writerow(columns)
+
+    def write(self, values):
+        if self.format == 'csv':
+            self.writer.writerow(['' if value == None else value for value in values])
+        else:
+            self.destination.write(json.dumps(dict(zip(self.columns, values)), default=str) + '\n')
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# CSV gives every value as a string, JSON Lines keeps its own types; number
+# and date raise ValueError on a cell that does not convert
+def text(row, column):
+    value = row.get(column)
+    return None if value == '' else value
+
+
+def flag(row, column, default):
+    value = row.get(column)
+    if value == None or value == '':
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+def number(row, column):
+    value = row.get(column)
+    if value == None or value == '':
+        return None
+    if isinstance(value, str):
+        return float(value) if '.' in value else int(value)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError('%s is not a number' % column)
+    return value
+
+
+def date(row, column):
+    value = row.get(column)
+    if value == None or value == '':
+        return None
+    if isinstance(value, str):
+        # a date-only cell stays a date, as export writes date orders
+        try:
+            return date_type.fromisoformat(value)
+        except ValueError:
+            return datetime.fromisoformat(value)
+    if not isinstance(value, date_type):
+        raise ValueError('%s is not a date' % column)
+    return value
+
+
+class ImportReport:
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        # result code -> rejected rows
+        self.rejected = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def reject(self, code):
+        self.rejected[code] = self.rejected.get(code, 0) + 1
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        return self
+
+    @property
+    def rows_per_second(self):
+        elapsed = (self.finished if self.finished != None else time.perf_counter()) - self.started
+        return self.rows / elapsed if elapsed > 0 else 0
+
+
+# streams rows in chunks, validates each chunk in one batch and inserts the
+# accepted rows straight into the manager indexes; memory is bounded by the chunk
+class BulkLoader:
+
+    def __init__(self, account_manager, order_manager=None, receipt_manager=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 address_engine=None):
+        self.account_manager = account_manager
+        self.order_manager = order_manager
+        self.receipt_manager = receipt_manager
+        self.chunk_size = chunk_size
+        self.address_engine = address_engine if address_engine != None else AddressEngine()
+        self._resolve_account = AccountResolver(account_manager)
+
+    def _hash_passwords(self, passwords):
+        # plain text passwords of a chunk are hashed together on the hasher's pool
+        hasher = self.account_manager.password_hasher
+        if not passwords:
+            return []
+        salts = [os.urandom(hasher.salt_size) for _ in passwords]
+        return list(hasher.executor.map(hash_password, passwords, itertools.repeat(hasher.iterations),
+                                        itertools.repeat(hasher.hash_name), salts))
+
+    def import_accounts(self, source, format='csv'):
+        report = ImportReport()
+        manager = self.account_manager
+        for chunk in chunked(read_rows(source, format), self.chunk_size):
+            results = manager.verify_accounts_batch(
+                [(text(row, 'first_name'), text(row, 'last_name'), text(row, 'email_address'),
+                  text(row, 'home_address'), text(row, 'password')) for row in chunk],
+                require_password=False)
+
+            addresses = self.address_engine.validate_batch([text(row, 'home_address') for row in chunk])
+
+            accepted = []
+            for row, result, valid_address in zip(chunk, results, addresses):
+                report.rows += 1
+                if result == validators.VALID and not valid_address:
+                    result = validators.INVALID_ADDRESS
+                # a hash that does not parse would lock the account out for good
+                password_hash = text(row, 'password_hash')
+                if result == validators.VALID and password_hash != None and parse_hash(password_hash) == None:
+                    result = INVALID_PASSWORD_HASH
+                role = text(row, 'role')
+                if result == validators.VALID and role != None and role != CUSTOMER and role not in STAFF_ROLES:
+                    result = INVALID_ROLE
+                if result != validators.VALID:
+                    report.reject(result)
+                else:
+                    accepted.append(row)
+
+            plain = [row for row in accepted if text(row, 'password_hash') == None and text(row, 'password') != None]
+            hashes = dict(zip(map(id, plain), self._hash_passwords([text(row, 'password') for row in plain])))
+            for row in accepted:
+                account = Account(text(row, 'email_address'), text(row, 'role') or CUSTOMER)
+                account.first_name = text(row, 'first_name')
+                account.last_name = text(row, 'last_name')
+                account.home_address = text(row, 'home_address')
+                account.address = text(row, 'address')
+                account.is_locked = flag(row, 'is_locked', True)
+                account.is_banned = flag(row, 'is_banned', False)
+                password_hash = hashes.get(id(row), text(row, 'password_hash'))
+                if manager._insert_account(normalize_email(account.email_address), account, password_hash):
+                    report.imported += 1
+                else:
+                    report.reject(validators.EMAIL_EXISTS)
+        return report.finish()
+
+    def _orders(self, chunk, report):
+        addresses = self.address_engine.validate_batch([text(row, 'billing_address') for row in chunk])
+        for row, valid_address in zip(chunk, addresses):
+            report.rows += 1
+            customer_email = text(row, 'customer_email')
+            billing_address = text(row, 'billing_address')
+            if customer_email == None:
+                report.reject(validators.MISSING_INFORMATION)
+            elif not validators.is_valid_email(customer_email):
+                report.reject(validators.INVALID_EMAIL)
+            elif billing_address != None and not valid_address:
+                report.reject(validators.INVALID_ADDRESS)
+            else:
+                # converted before resolving the accounts, a bad row leaves no stand-ins behind
+                try:
+                    order_date = date(row, 'order_date')
+                except ValueError:
+                    report.reject(INVALID_DATE)
+                    continue
+                try:
+                    costs = [number(row, column) for column in ('shipping_cost', 'tax_cost', 'total_cost')]
+                except ValueError:
+                    report.reject(INVALID_NUMBER)
+                    continue
+                order = Order(self._resolve_account(customer_email), self._resolve_account(text(row, 'staff_email')))
+                order.order_date = order_date
+                order.payment_method = text(row, 'payment_method')
+                order.billing_address = billing_address
+                order.shipping_cost, order.tax_cost, order.total_cost = costs
+                yield row, order
+
+    def import_orders(self, source, format='csv'):
+        report = ImportReport()
+        for chunk in chunked(read_rows(source, format), self.chunk_size):
+            for row, order in self._orders(chunk, report):
+                # a date among datetimes, or the other way round, does not sort
+                try:
+                    self.order_manager.add_order(order)
+                except TypeError:
+                    report.reject(INVALID_DATE)
+                    continue
+                report.imported += 1
+        return report.finish()
+
+    def import_receipts(self, source, format='csv'):
+        report = ImportReport()
+        for chunk in chunked(read_rows(source, format), self.chunk_size):
+            for row, order in self._orders(chunk, report):
+                receipt = Receipt(order)
+                receipt.content = text(row, 'content')
+                self.receipt_manager.add_receipt(receipt)
+                report.imported += 1
+        return report.finish()
+
+
+def order_values(order):
+    return (order.customer.email_address if order.customer != None else None,
+            order.received_by.email_address if order.received_by != None else None,
+            order.order_date.isoformat() if order.order_date != None else None,
+            order.payment_method, order.billing_address, order.shipping_cost, order.tax_cost, order.total_cost)
+
+
+# exporters write one row at a time and never build the full output in memory
+def export_accounts(account_manager, destination, format='csv'):
+    writer = RowWriter(destination, ACCOUNT_COLUMNS, format)
+    for key, account in account_manager.accounts.items():
+        writer.write((account.email_address, account.first_name, account.last_name, account.home_address,
+                      account.address, account.role, account.is_locked, account.is_banned, None,
+                      account_manager.password_hashes.get(key)))
+
+
+def export_orders(order_manager, destination, format='csv'):
+    writer = RowWriter(destination, ORDER_COLUMNS, format)
+    for order in order_manager.orders.orders:
+        writer.write(order_values(order))
+
+
+def export_receipts(receipt_manager, destination, format='csv'):
+    writer = RowWriter(destination, RECEIPT_COLUMNS, format)
+    for receipt_id, order in enumerate(receipt_manager.orders):
+        writer.write(order_values(order) + (receipt_manager.stored_content(receipt_id),))
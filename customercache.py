@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+
+from accountmanager import normalize_email
+
+DEFAULT_MAX_ENTRIES = 10000
+# cached answer for an email with no account, guests are looked up as often as customers
+MISSING = object()
+
+
+# read-through LRU cache of AccountManager.find_account keyed by normalized
+# email; the manager invalidates a key whenever that account changes
+class CustomerCache:
+
+    def __init__(self, account_manager, max_entries=DEFAULT_MAX_ENTRIES):
+        self.account_manager = account_manager
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        # key -> Account or MISSING
+        self.entries = OrderedDict()
+        # bumped by every invalidation so a lookup racing one is not cached
+        self.generation = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        account_manager.add_listener(self.invalidate)
+
+    def get(self, email_address):
+        key = normalize_email(email_address)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry != None:
+                self.entries.move_to_end(key)
+                if entry is MISSING:
+                    self.negative_hits += 1
+                    return None
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self.generation
+
+        account = self.account_manager.find_account(key)
+        with self.lock:
+            if generation == self.generation:
+                self.entries[key] = account if account != None else MISSING
+                if len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return account
+
+    def invalidate(self, key):
+        with self.lock:
+            self.generation += 1
+            self.invalidations += 1
+            self.entries.pop(key, None)
+
+    # stops following the account manager, the cache can not be used after
+    def close(self):
+        self.account_manager.remove_listener(self.invalidate)
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def metrics(self):
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.negative_hits) / lookups if lookups else 0,
+            'invalidations': self.invalidations,
+            'entries': len(self.entries),
+        }
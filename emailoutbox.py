@@ -0,0 +1,232 @@
+import email.message
+import queue
+import smtplib
+import threading
+import time
+
+# queued by close(), the worker stops once it reaches it
+CLOSE = object()
+
+class EmailMessage:
+    __slots__ = ('recipient', 'subject', 'body', 'link', 'queued_at')
+
+    def __init__(self, recipient, subject, body, link=None):
+        self.recipient = recipient
+        self.subject = subject
+        self.body = body
+        self.link = link
+        self.queued_at = None
+
+    # 4.1.3.1 Password verification link
+    def contains_correct_link(self):
+        return self.link != None and self.link in self.body
+
+
+# raised by a transport that got through only the first `delivered` messages of
+# a batch; `refused` are the ones among them the server refused for good
+class DeliveryError(Exception):
+
+    def __init__(self, delivered, error, refused=()):
+        super().__init__('delivered %d messages before: %s' % (delivered, error))
+        self.delivered = delivered
+        self.error = error
+        self.refused = refused
+
+
+# a 5xx reply will not change on a retry
+def is_permanent(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+# the default transport: drops every message and only counts them, so an
+# outbox without a configured mail server holds on to nothing
+class DiscardTransport:
+
+    def __init__(self):
+        self.discarded_count = 0
+
+    def send_batch(self, messages):
+        self.discarded_count += len(messages)
+
+
+# keeps every delivered message, used by tests
+class MemoryTransport:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_batch(self, messages):
+        self.sent.extend(messages)
+
+
+# delivers batches over a small pool of reused SMTP connections
+class SmtpTransport:
+
+    def __init__(self, host, port=25, sender='no-reply@localhost', pool_size=2,
+                 username=None, password=None, use_tls=False, timeout=10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._connections = queue.LifoQueue(pool_size)
+
+    def _connect(self):
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            connection.starttls()
+        if self.username != None:
+            connection.login(self.username, self.password)
+        return connection
+
+    def _acquire(self):
+        try:
+            return self._connections.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, connection):
+        try:
+            self._connections.put_nowait(connection)
+        except queue.Full:
+            connection.quit()
+
+    def send_batch(self, messages):
+        connection = self._acquire()
+        delivered = 0
+        refused = []
+        try:
+            for message in messages:
+                mail = email.message.EmailMessage()
+                mail['From'] = self.sender
+                mail['To'] = message.recipient
+                mail['Subject'] = message.subject
+                mail.set_content(message.body)
+                try:
+                    connection.send_message(mail)
+                except smtplib.SMTPException as error:
+                    # a permanent refusal fails this message only, the session carries on
+                    if not is_permanent(error):
+                        raise
+                    refused.append(message)
+                delivered += 1
+        except Exception as error:
+            # drop the connection, the outbox retries the rest on a fresh one;
+            # any error counts, a socket or encoding error leaves it just as unusable
+            connection.close()
+            raise DeliveryError(delivered, error, refused) from error
+        self._release(connection)
+        return refused
+
+
+# accepts messages immediately and delivers them in batches from a background thread
+class EmailOutbox:
+
+    def __init__(self, transport=None, batch_size=50, max_retries=5, retry_backoff=0.1):
+        self.transport = transport if transport != None else DiscardTransport()
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.sent_count = 0
+        self.failed_count = 0
+        self.retry_count = 0
+        self.last_flush_latency = None
+        self.max_flush_latency = 0.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def metrics(self):
+        return {
+            'queue_depth': self.queue_depth,
+            'sent': self.sent_count,
+            'failed': self.failed_count,
+            'retries': self.retry_count,
+            'last_flush_latency': self.last_flush_latency,
+            'max_flush_latency': self.max_flush_latency,
+        }
+
+    def send(self, message):
+        message.queued_at = time.perf_counter()
+        self._queue.put(message)
+        if self._worker == None:
+            self._start_worker()
+        return True
+
+    # blocks until every queued message has been delivered or given up on
+    def flush(self):
+        self._queue.join()
+
+    # delivers every queued message, then stops the worker; a later send starts a new one
+    def close(self):
+        with self._lock:
+            worker = self._worker
+            if worker == None:
+                return
+            self._queue.put(CLOSE)
+            worker.join()
+            self._worker = None
+
+    def _start_worker(self):
+        with self._lock:
+            if self._worker == None:
+                self._worker = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        closing = False
+        while not closing:
+            message = self._queue.get()
+            if message is CLOSE:
+                self._queue.task_done()
+                return
+            batch = [message]
+            while len(batch) < self.batch_size:
+                try:
+                    message = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if message is CLOSE:
+                    closing = True
+                    break
+                batch.append(message)
+
+            self._deliver(batch)
+            for _ in batch:
+                self._queue.task_done()
+        self._queue.task_done()
+
+    # send_batch may return the messages refused for good, they are failed
+    # without a retry
+    def _deliver(self, batch):
+        queued_at = batch[0].queued_at
+        for attempt in range(self.max_retries + 1):
+            try:
+                refused = self.transport.send_batch(batch) or ()
+            except Exception as error:
+                # only the messages the transport did not get to are sent again
+                if isinstance(error, DeliveryError):
+                    self.sent_count += error.delivered - len(error.refused)
+                    self.failed_count += len(error.refused)
+                    batch = batch[error.delivered:]
+                if attempt == self.max_retries:
+                    self.failed_count += len(batch)
+                    return
+                self.retry_count += 1
+                time.sleep(self.retry_backoff * 2 ** attempt)
+            else:
+                break
+
+        self.failed_count += len(refused)
+        self.sent_count += len(batch) - len(refused)
+        latency = time.perf_counter() - queued_at
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
@@ -1,23 +1,68 @@
+from addressengine import AddressEngine
+from customercache import CustomerCache
+from emailoutbox import EmailMessage, EmailOutbox
+from receipt import Receipt
+from receiptrenderer import ReceiptRenderer, receipt_model
+
+
 class EmailUtils:
 
+    def __init__(self, outbox=None, account_manager=None, renderer=None, address_engine=None, customer_cache=None):
+        self.outbox = outbox if outbox != None else EmailOutbox()
+        self.account_manager = account_manager
+        if customer_cache == None and account_manager != None:
+            customer_cache = CustomerCache(account_manager)
+        self.customer_cache = customer_cache
+        self.renderer = renderer if renderer != None else ReceiptRenderer()
+        self.address_engine = address_engine if address_engine != None else AddressEngine()
+
     # Requirement 4.4: Existing and Guest User Receipt
     def account_exist(self, email_address):
-        return None
+        return self.find_customer(email_address) != None
 
+    # 4.5 Email Receipt after Order
     def send_receipt(self, email_address, receipt):
-        return None
+        if not isinstance(receipt, Receipt):
+            return False
+
+        if receipt.content == None:
+            receipt.content = self.renderer.render(receipt, not self.account_exist(email_address))
+        return self.outbox.send(EmailMessage(email_address, 'Your receipt', receipt.content))
 
+    # 4.5.1.1 Email is not found and 4.5.1.2 Email is found
     def get_customer_information(self, email_address):
-        return None
+        return self.find_customer(email_address) != None
 
+    # the customer's account, or None for a guest
+    def find_customer(self, email_address):
+        if self.customer_cache == None or type(email_address) is not str:
+            return None
+        return self.customer_cache.get(email_address)
+
+    # 4.5.1.3 Shipping Address Validation
     def validate_shipping_address(self, address):
-        return None
+        return self.address_engine.is_valid(address)
 
+    # 4.5.1.4 Payment Address Validation
     def validate_payment_address(self, address):
-        return None
+        return self.address_engine.is_valid(address)
 
+    # 4.4.1.1 Guest Account Creation, checks the model the receipt is rendered from
     def validate_receipt_content(self, receipt):
-        return None
+        if type(receipt) is str:
+            return len(receipt) > 0
+        if not isinstance(receipt, Receipt) or receipt.order == None or receipt.order.customer == None:
+            return False
+
+        model = receipt_model(receipt, not self.account_exist(receipt.order.customer.email_address))
+        if not model['email_address']:
+            return False
+        return not model['is_guest'] or model['account_creation_link'] != None
 
     def save_order(self, order):
         return None
+
+    def close(self):
+        self.outbox.close()
+        if self.customer_cache != None:
+            self.customer_cache.close()
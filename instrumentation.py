@@ -0,0 +1,180 @@
+import bisect
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+# upper bounds in seconds, the last bucket takes everything slower
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, float('inf'))
+# the methods worth watching on each manager
+HOT_PATHS = {
+    'account_manager': ('add_account', 'login', 'change_password', 'ban_account', 'change_personal_information'),
+    'email_utils': ('send_receipt', 'account_exist', 'find_customer'),
+    'order_manager': ('add_order', 'view_all_orders', 'view_orders_page'),
+    'receipt_manager': ('add_receipt', 'get_all_receipts'),
+}
+
+
+class MethodMetrics:
+    __slots__ = ('lock', 'calls', 'total_seconds', 'buckets', 'errors')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        # exception class name -> count
+        self.errors = {}
+
+    def observe(self, seconds, error=None):
+        with self.lock:
+            self.calls += 1
+            self.total_seconds += seconds
+            self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            if error != None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return {'calls': self.calls, 'total_seconds': self.total_seconds, 'buckets': list(self.buckets),
+                    'errors': dict(self.errors)}
+
+
+# wraps selected methods of attached managers while enabled; disabled, the
+# wrappers are removed from the instances so calls go straight to the class
+class Instrumentation:
+
+    def __init__(self):
+        # (name, target, methods)
+        self.targets = []
+        # 'account_manager.login' -> MethodMetrics
+        self.metrics = {}
+        self.enabled = False
+        self.profiler = None
+        self.profile_every = 0
+        self._profile_calls = 0
+        # held while a sampled call runs under the profiler, nested and
+        # concurrent calls run unprofiled instead of waiting
+        self._profile_lock = threading.Lock()
+
+    def attach(self, name, target, methods=None):
+        methods = methods if methods != None else HOT_PATHS[name]
+        self.targets.append((name, target, methods))
+        if self.enabled:
+            self._wrap_all(name, target, methods)
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            for name, target, methods in self.targets:
+                self._wrap_all(name, target, methods)
+
+    def disable(self):
+        if self.enabled:
+            self.enabled = False
+            for name, target, methods in self.targets:
+                for method in methods:
+                    vars(target).pop(method, None)
+
+    def _wrap_all(self, name, target, methods):
+        for method in methods:
+            metrics = self.metrics.get(name + '.' + method)
+            if metrics == None:
+                metrics = self.metrics[name + '.' + method] = MethodMetrics()
+            setattr(target, method, self._wrap(getattr(type(target), method).__get__(target), metrics))
+
+    def _wrap(self, function, metrics):
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                if self.profiler != None:
+                    result = self._sample(function, args, kwargs)
+                else:
+                    result = function(*args, **kwargs)
+            except Exception as error:
+                metrics.observe(clock() - start, type(error).__name__)
+                raise
+            metrics.observe(clock() - start)
+            return result
+        return wrapper
+
+    def _sample(self, function, args, kwargs):
+        profiler = self.profiler
+        self._profile_calls += 1
+        if self._profile_calls % self.profile_every != 0 or not self._profile_lock.acquire(blocking=False):
+            return function(*args, **kwargs)
+        try:
+            return profiler.runcall(function, *args, **kwargs)
+        finally:
+            self._profile_lock.release()
+
+    # profiles one in every `every` instrumented calls until stop_profiling
+    def start_profiling(self, every=100):
+        self.profile_every = every
+        self.profiler = cProfile.Profile()
+
+    def stop_profiling(self, path=None):
+        profiler = self.profiler
+        self.profiler = None
+        if profiler == None:
+            return None
+        with self._profile_lock:
+            if path != None:
+                profiler.dump_stats(path)
+            return pstats.Stats(profiler)
+
+    def start_tracemalloc(self, frames=10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    # returns the top allocation sites as (location, size in bytes, count)
+    def stop_tracemalloc(self, limit=10):
+        if not tracemalloc.is_tracing():
+            return []
+        statistics = tracemalloc.take_snapshot().statistics('lineno')[:limit]
+        tracemalloc.stop()
+        return [(str(statistic.traceback), statistic.size, statistic.count) for statistic in statistics]
+
+    def snapshot(self):
+        return {name: metrics.snapshot() for name, metrics in self.metrics.items()}
+
+
+def prometheus_text(instrumentation):
+    lines = ['# TYPE manager_calls_total counter']
+    snapshot = sorted(instrumentation.snapshot().items())
+    for name, metrics in snapshot:
+        lines.append('manager_calls_total{method="%s"} %d' % (name, metrics['calls']))
+    lines.append('# TYPE manager_errors_total counter')
+    for name, metrics in snapshot:
+        for exception, count in sorted(metrics['errors'].items()):
+            lines.append('manager_errors_total{method="%s",exception="%s"} %d' % (name, exception, count))
+    lines.append('# TYPE manager_latency_seconds histogram')
+    for name, metrics in snapshot:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, metrics['buckets']):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append('manager_latency_seconds_bucket{method="%s",le="%s"} %d' % (name, le, cumulative))
+        lines.append('manager_latency_seconds_sum{method="%s"} %r' % (name, metrics['total_seconds']))
+        lines.append('manager_latency_seconds_count{method="%s"} %d' % (name, metrics['calls']))
+    return '\n'.join(lines) + '\n'
+
+
+# format is 'json' or 'prometheus'; the file is replaced in one step so a
+# scraper never reads half of it
+def export_metrics(instrumentation, path, format='json'):
+    if format == 'json':
+        text = json.dumps({'buckets': [repr(bound) for bound in LATENCY_BUCKETS],
+                           'methods': instrumentation.snapshot()}, indent=2)
+    elif format == 'prometheus':
+        text = prometheus_text(instrumentation)
+    else:
+        raise ValueError('unknown format %s' % format)
+    with open(path + '.tmp', 'w') as destination:
+        destination.write(text)
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,239 @@
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+from account import Account
+
+# every log record is framed as (payload length, crc32 of payload) + pickled payload
+RECORD_HEADER = struct.Struct('<II')
+LOG_SUFFIX = '.log'
+SNAPSHOT_SUFFIX = '.snapshot'
+
+
+def read_records(path):
+    records = []
+    valid_length = 0
+    with open(path, 'rb') as log:
+        data = log.read()
+
+    while valid_length + RECORD_HEADER.size <= len(data):
+        length, checksum = RECORD_HEADER.unpack_from(data, valid_length)
+        start = valid_length + RECORD_HEADER.size
+        payload = data[start:start + length]
+        # a torn or corrupt tail means the process died mid-write, stop there
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            break
+        records.append(pickle.loads(payload))
+        valid_length = start + length
+    return records, valid_length
+
+
+# append-only log of mutations with group commit and periodic snapshots;
+# generation N's snapshot covers everything up to and including log N. A
+# flusher thread makes sure every record is synced within group_commit_interval
+# even when no further appends arrive.
+class Journal:
+
+    def __init__(self, directory, name, group_commit_interval=0.01, snapshot_interval=100000):
+        self.directory = directory
+        self.name = name
+        self.group_commit_interval = group_commit_interval
+        self.snapshot_interval = snapshot_interval
+        self.records_since_snapshot = 0
+        self.generation = 1
+        self._log = None
+        self._last_sync = time.monotonic()
+        # when the oldest record that is not yet synced was appended
+        self._unsynced_since = None
+        self._lock = threading.RLock()
+        self._dirty = threading.Condition(self._lock)
+        self._flusher = None
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, generation, suffix):
+        return os.path.join(self.directory, '%s-%08d%s' % (self.name, generation, suffix))
+
+    def _generations(self, suffix):
+        prefix = self.name + '-'
+        generations = []
+        for file_name in os.listdir(self.directory):
+            if file_name.startswith(prefix) and file_name.endswith(suffix):
+                generations.append(int(file_name[len(prefix):-len(suffix)]))
+        return sorted(generations)
+
+    # returns (latest snapshot state or None, log records written after it)
+    def load(self):
+        snapshots = self._generations(SNAPSHOT_SUFFIX)
+        state = None
+        snapshot_generation = 0
+        if snapshots:
+            snapshot_generation = snapshots[-1]
+            with open(self._path(snapshot_generation, SNAPSHOT_SUFFIX), 'rb') as snapshot:
+                state = pickle.load(snapshot)
+
+        records = []
+        self.generation = snapshot_generation + 1
+        for generation in self._generations(LOG_SUFFIX):
+            if generation <= snapshot_generation:
+                continue
+            path = self._path(generation, LOG_SUFFIX)
+            log_records, valid_length = read_records(path)
+            if valid_length < os.path.getsize(path):
+                os.truncate(path, valid_length)
+            records.extend(log_records)
+            self.generation = generation
+
+        self.records_since_snapshot = len(records)
+        return state, records
+
+    def append(self, record):
+        payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if self._log == None:
+                self._log = open(self._path(self.generation, LOG_SUFFIX), 'ab')
+            self._log.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+            self._log.write(payload)
+            self.records_since_snapshot += 1
+            now = time.monotonic()
+            if now - self._last_sync >= self.group_commit_interval:
+                self._sync()
+            elif self._unsynced_since == None:
+                # arms the flusher's deadline for this group
+                self._unsynced_since = now
+                self._closed = False
+                if self._flusher == None:
+                    self._flusher = threading.Thread(target=self._run_flusher, name='journal-flusher', daemon=True)
+                    self._flusher.start()
+                self._dirty.notify()
+
+    def _run_flusher(self):
+        with self._lock:
+            while not self._closed:
+                if self._unsynced_since == None:
+                    self._dirty.wait()
+                    continue
+                remaining = self._unsynced_since + self.group_commit_interval - time.monotonic()
+                if remaining > 0:
+                    self._dirty.wait(remaining)
+                    continue
+                self._sync()
+            self._flusher = None
+
+    # makes every appended record durable
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        if self._log != None:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        self._last_sync = time.monotonic()
+        self._unsynced_since = None
+
+    def write_snapshot(self, state):
+        with self._lock:
+            self._write_snapshot(state)
+
+    def _write_snapshot(self, state):
+        self._sync()
+        path = self._path(self.generation, SNAPSHOT_SUFFIX)
+        with open(path + '.tmp', 'wb') as snapshot:
+            pickle.dump(state, snapshot, pickle.HIGHEST_PROTOCOL)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(path + '.tmp', path)
+
+        if self._log != None:
+            self._log.close()
+            self._log = None
+        for generation in self._generations(LOG_SUFFIX):
+            if generation <= self.generation:
+                os.remove(self._path(generation, LOG_SUFFIX))
+        for generation in self._generations(SNAPSHOT_SUFFIX):
+            if generation < self.generation:
+                os.remove(self._path(generation, SNAPSHOT_SUFFIX))
+        self.generation += 1
+        self.records_since_snapshot = 0
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._dirty.notify()
+            self._sync()
+            if self._log != None:
+                self._log.close()
+                self._log = None
+
+
+# maps the accounts in recovered records back to Account objects, by account id
+# first so a customer who changed email keeps their orders; guests have no
+# stored account, so each gets a single stand-in Account
+class AccountResolver:
+
+    def __init__(self, account_manager=None):
+        self.account_manager = account_manager
+        self.guests = {}
+
+    def __call__(self, email_address, account_id=None):
+        if email_address == None:
+            return None
+        account = self._known(email_address, account_id)
+        if account == None:
+            account = self.guests[email_address] = Account(email_address)
+        return account
+
+    # for lookups: an unknown email gets a throwaway stand-in that is not kept,
+    # only what is stored needs the same stand-in every time
+    def find(self, email_address, account_id=None):
+        if email_address == None:
+            return None
+        account = self._known(email_address, account_id)
+        return account if account != None else Account(email_address)
+
+    def _known(self, email_address, account_id):
+        if self.account_manager != None:
+            account = self.account_manager.find_account_by_id(account_id) if account_id != None else None
+            if account == None:
+                account = self.account_manager.find_account(email_address)
+            if account != None:
+                return account
+        return self.guests.get(email_address)
+
+
+# mixed into the managers; subclasses provide snapshot_state, load_state
+# and an _apply_<operation> method for every operation they record
+class Journaled:
+
+    journal = None
+
+    def _record(self, operation, *arguments):
+        if self.journal == None:
+            return
+        self.journal.append((operation,) + arguments)
+        if self.journal.records_since_snapshot >= self.journal.snapshot_interval:
+            self.checkpoint()
+
+    def close(self):
+        if self.journal != None:
+            self.journal.close()
+
+    def checkpoint(self):
+        self.journal.write_snapshot(self.snapshot_state())
+
+    def recover(self):
+        journal = self.journal
+        # replayed operations must not be recorded a second time
+        self.journal = None
+        try:
+            state, records = journal.load()
+            if state != None:
+                self.load_state(state)
+            for record in records:
+                getattr(self, '_apply_' + record[0])(*record[1:])
+        finally:
+            self.journal = journal
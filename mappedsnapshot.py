@@ -0,0 +1,187 @@
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+
+from account import account_from_record, account_to_record
+from accountmanager import normalize_email
+from journal import AccountResolver
+from order import order_from_record, order_to_record
+from receipt import Receipt
+
+MAGIC = b'RQ3SNAP1'
+# magic, then the offsets of the account, order and receipt sections
+FILE_HEADER = struct.Struct('<8sQQQ')
+# record count, hash table size, and where the record offsets, hash table,
+# postings and record data start
+SECTION_HEADER = struct.Struct('<QQQQQQ')
+OFFSET = struct.Struct('<Q')
+# key hash, postings offset + 1 (0 marks an empty slot)
+SLOT = struct.Struct('<QQ')
+COUNT = struct.Struct('<I')
+
+
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def table_size(count):
+    size = 8
+    while size < count * 2:
+        size *= 2
+    return size
+
+
+# one section: pickled records addressed by an offset table, plus an open
+# addressing hash table from key to the list of record numbers with that key
+def encode_section(records, keys):
+    payloads = [pickle.dumps(record, pickle.HIGHEST_PROTOCOL) for record in records]
+    postings = {}
+    for number, key in enumerate(keys):
+        if key != None:
+            postings.setdefault(key, []).append(number)
+
+    postings_data = bytearray()
+    size = table_size(len(postings))
+    table = bytearray(size * SLOT.size)
+    for key, numbers in postings.items():
+        hashed = key_hash(key)
+        slot = hashed & (size - 1)
+        while SLOT.unpack_from(table, slot * SLOT.size)[1] != 0:
+            slot = (slot + 1) & (size - 1)
+        SLOT.pack_into(table, slot * SLOT.size, hashed, len(postings_data) + 1)
+        postings_data += COUNT.pack(len(numbers))
+        postings_data += struct.pack('<%dI' % len(numbers), *numbers)
+
+    offsets = bytearray()
+    position = 0
+    for payload in payloads:
+        offsets += OFFSET.pack(position)
+        position += len(payload)
+    offsets += OFFSET.pack(position)
+
+    offsets_start = SECTION_HEADER.size
+    table_start = offsets_start + len(offsets)
+    postings_start = table_start + len(table)
+    data_start = postings_start + len(postings_data)
+    header = SECTION_HEADER.pack(len(payloads), size, offsets_start, table_start, postings_start, data_start)
+    return b''.join([header, bytes(offsets), bytes(table), bytes(postings_data)] + payloads)
+
+
+def write_mapped_snapshot(path, account_manager, order_manager=None, receipt_manager=None):
+    accounts = [account_to_record(account) for account in account_manager.accounts.values()]
+    orders = [order_to_record(order) for order in order_manager.orders.orders] if order_manager != None else []
+    receipts = receipt_manager.snapshot_state()['receipts'] if receipt_manager != None else []
+
+    sections = [
+        encode_section(accounts, [normalize_email(record[0]) for record in accounts]),
+        encode_section(orders, [normalize_email(record[0]) if record[0] != None else None for record in orders]),
+        encode_section(receipts, [normalize_email(record[0][0]) if record[0][0] != None else None
+                                  for record in receipts]),
+    ]
+    offsets = []
+    position = FILE_HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+
+    with open(path + '.tmp', 'wb') as snapshot:
+        snapshot.write(FILE_HEADER.pack(MAGIC, *offsets))
+        for section in sections:
+            snapshot.write(section)
+    # replaced atomically so workers never map a half written file
+    os.replace(path + '.tmp', path)
+
+
+class MappedSection:
+
+    def __init__(self, buffer, start):
+        self.buffer = buffer
+        self.start = start
+        (self.count, self.table_size, self.offsets_start, self.table_start,
+         self.postings_start, self.data_start) = SECTION_HEADER.unpack_from(buffer, start)
+
+    def __len__(self):
+        return self.count
+
+    def record(self, number):
+        offset = self.start + self.offsets_start + number * OFFSET.size
+        begin = OFFSET.unpack_from(self.buffer, offset)[0]
+        end = OFFSET.unpack_from(self.buffer, offset + OFFSET.size)[0]
+        data = self.start + self.data_start
+        return pickle.loads(self.buffer[data + begin:data + end])
+
+    # record numbers whose key hashes like key, callers compare the decoded record
+    def lookup(self, key):
+        hashed = key_hash(key)
+        mask = self.table_size - 1
+        slot = hashed & mask
+        while True:
+            slot_hash, posting = SLOT.unpack_from(self.buffer, self.start + self.table_start + slot * SLOT.size)
+            if posting == 0:
+                return ()
+            if slot_hash == hashed:
+                position = self.start + self.postings_start + posting - 1
+                count = COUNT.unpack_from(self.buffer, position)[0]
+                return struct.unpack_from('<%dI' % count, self.buffer, position + COUNT.size)
+            slot = (slot + 1) & mask
+
+
+# read-only view of a snapshot file; records are decoded only when a lookup
+# touches them, and every process mapping the file shares the page cache
+class MappedSnapshot:
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, accounts, orders, receipts = FILE_HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError('%s is not an account snapshot' % path)
+        self.accounts = MappedSection(self.buffer, accounts)
+        self.orders = MappedSection(self.buffer, orders)
+        self.receipts = MappedSection(self.buffer, receipts)
+        self._resolve_account = AccountResolver(self)
+
+    def close(self):
+        self.buffer.close()
+        self._file.close()
+
+    def find_account(self, email_address):
+        key = normalize_email(email_address)
+        for number in self.accounts.lookup(key):
+            record = self.accounts.record(number)
+            if normalize_email(record[0]) == key:
+                return account_from_record(record)
+        return None
+
+    # every record here was written at once, so the emails in orders are current
+    def find_account_by_id(self, account_id):
+        return None
+
+    def verify_email_does_not_exist_in_system(self, email_address):
+        return self.find_account(email_address) == None
+
+    def get_account(self, account):
+        return self.find_account(account.email_address) != None
+
+    def is_account_banned(self, account):
+        found = self.find_account(account.email_address)
+        return found != None and found.is_banned
+
+    def view_all_orders(self, account):
+        key = normalize_email(account.email_address)
+        orders = (order_from_record(self.orders.record(number), self._resolve_account)
+                  for number in self.orders.lookup(key))
+        return [order for order in orders if normalize_email(order.customer.email_address) == key]
+
+    def get_all_receipts(self, account):
+        key = normalize_email(account.email_address)
+        receipts = []
+        for number in self.receipts.lookup(key):
+            order_record, content = self.receipts.record(number)
+            if normalize_email(order_record[0]) == key:
+                receipt = Receipt(order_from_record(order_record, self._resolve_account))
+                receipt.content = content
+                receipts.append(receipt)
+        return receipts
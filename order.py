@@ -1,4 +1,7 @@
 class Order:
+    __slots__ = ('customer', 'received_by', 'order_date', 'payment_method', 'billing_address',
+                 'shipping_cost', 'tax_cost', 'total_cost')
+
     def __init__(self, customer, staff):
         self.customer = customer
         self.received_by = staff
@@ -8,3 +11,30 @@ class Order:
         self.shipping_cost = None
         self.tax_cost = None
         self.total_cost = None
+
+
+# customer and staff are stored by email address, everything else as is; their
+# account ids follow at the end, since an email can change after the record is written
+RECORD_FIELDS = ('order_date', 'payment_method', 'billing_address', 'shipping_cost', 'tax_cost', 'total_cost')
+
+
+def account_email(account):
+    return account.email_address if account != None else None
+
+
+def account_id(account):
+    return account.account_id if account != None else None
+
+
+def order_to_record(order):
+    return (account_email(order.customer), account_email(order.received_by)) + tuple(
+        getattr(order, field) for field in RECORD_FIELDS) + (account_id(order.customer), account_id(order.received_by))
+
+
+# records written before account ids were kept resolve by email alone
+def order_from_record(record, resolve_account):
+    ids = record[2 + len(RECORD_FIELDS):] or (None, None)
+    order = Order(resolve_account(record[0], ids[0]), resolve_account(record[1], ids[1]))
+    for field, value in zip(RECORD_FIELDS, record[2:]):
+        setattr(order, field, value)
+    return order
@@ -1,7 +1,183 @@
-class OrderManager:
+import bisect
+import threading
+import time
+
+from journal import AccountResolver, Journaled
+from order import order_from_record, order_to_record
+from salesaggregates import SalesAggregates
+
+DEFAULT_PAGE_SIZE = 50
+VIEW_BATCH_SIZE = 256
+
+
+# orders without a date sort before every dated order
+def order_sort_key(order, sequence):
+    if order.order_date == None:
+        return (0, sequence)
+    return (1, order.order_date, sequence)
+
+
+# orders kept sorted by order_date, with a parallel list of sort keys for bisecting
+class OrderIndex:
+
+    def __init__(self):
+        self.keys = []
+        self.orders = []
+        # odd while an insert is in progress, read by batch()
+        self.version = 0
+
+    # the position is found before the version turns odd, so a key that does
+    # not compare (a datetime among dates) raises without stalling batch()
+    def insert(self, key, order):
+        position = bisect.bisect_right(self.keys, key)
+        self.version += 1
+        try:
+            self.keys.insert(position, key)
+            self.orders.insert(position, order)
+        finally:
+            self.version += 1
+
+    # up to size (key, order) pairs after the key `after`, for readers on other
+    # threads; retried when an insert overlapped the read
+    def batch(self, after, size, start_date=None, end_date=None):
+        while True:
+            version = self.version
+            if version % 2 == 0:
+                low, high = self.bounds(start_date, end_date)
+                if after != None:
+                    low = max(low, bisect.bisect_right(self.keys, after))
+                high = min(high, low + size)
+                keys = self.keys[low:high]
+                orders = self.orders[low:high]
+                if self.version == version:
+                    return keys, orders
+            time.sleep(0)
+
+    def bounds(self, start_date=None, end_date=None):
+        if start_date == None and end_date == None:
+            return 0, len(self.keys)
+
+        low = bisect.bisect_left(self.keys, (1,) if start_date == None else (1, start_date))
+        high = len(self.keys) if end_date == None else bisect.bisect_left(self.keys, (1, end_date))
+        return low, max(low, high)
+
+
+def index_for(indexes, account):
+    index = indexes.get(account)
+    if index == None:
+        index = indexes[account] = OrderIndex()
+    return index
+
+
+# read-only window over the orders of an OrderIndex in a date range, nothing
+# is copied until an order is read. The range is found again on every read,
+# so orders added later inside it are seen and ones added outside it never
+# shift the window.
+class OrderView:
+
+    def __init__(self, index, start_date=None, end_date=None):
+        self.index = index
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def __len__(self):
+        start, stop = self.index.bounds(self.start_date, self.end_date)
+        return stop - start
+
+    def __getitem__(self, position):
+        start, stop = self.index.bounds(self.start_date, self.end_date)
+        if isinstance(position, slice):
+            first, last, step = position.indices(stop - start)
+            if step < 0:
+                return [self.index.orders[start + i] for i in range(first, last, step)]
+            return self.index.orders[start + first:start + last:step]
+        if position < 0:
+            position += stop - start
+        if position < 0 or position >= stop - start:
+            raise IndexError('order view index out of range')
+        return self.index.orders[start + position]
+
+    # walks by key, so an insert while iterating neither repeats nor skips an order
+    def __iter__(self):
+        after = None
+        while True:
+            keys, orders = self.index.batch(after, VIEW_BATCH_SIZE, self.start_date, self.end_date)
+            if not keys:
+                return
+            yield from orders
+            after = keys[-1]
+
+
+class OrderManager(Journaled):
+
+    # account_manager resolves customers and staff when orders are recovered from a journal
+    def __init__(self, journal=None, account_manager=None):
+        self.orders = OrderIndex()
+        self.orders_by_customer = {}
+        self.orders_by_staff = {}
+        self.sales = SalesAggregates()
+        self._sequence = 0
+        # sequence of the last order that is in every index
+        self.committed_sequence = 0
+        # one add_order at a time, the index version and sequence assume a
+        # single writer; readers never take it
+        self.write_lock = threading.Lock()
+        self._resolve_account = AccountResolver(account_manager)
+        self.journal = journal
+        if journal != None:
+            self.recover()
 
     def add_order(self, order):
-        return None
+        with self.write_lock:
+            self._sequence += 1
+            key = order_sort_key(order, self._sequence)
+            self.orders.insert(key, order)
+            if order.customer != None:
+                index_for(self.orders_by_customer, order.customer).insert(key, order)
+            if order.received_by != None:
+                index_for(self.orders_by_staff, order.received_by).insert(key, order)
+            self.sales.add(order)
+            self.committed_sequence = self._sequence
+            self._record('add_order', order_to_record(order))
+        return True
+
+    def _view(self, index, start_date, end_date):
+        return OrderView(index if index != None else OrderIndex(), start_date, end_date)
+
+    # 4.7.3.1 Order Information, oldest first, end_date is exclusive
+    def view_all_orders(self, account, start_date=None, end_date=None):
+        return self._view(self.orders_by_customer.get(account), start_date, end_date)
+
+    def view_orders_received_by(self, staff, start_date=None, end_date=None):
+        return self._view(self.orders_by_staff.get(staff), start_date, end_date)
+
+    # returns (orders, cursor); pass the cursor back to continue after the last order
+    def view_orders_page(self, account, cursor=None, limit=DEFAULT_PAGE_SIZE, start_date=None, end_date=None):
+        index = self.orders_by_customer.get(account)
+        if index == None:
+            return [], None
+
+        start, stop = index.bounds(start_date, end_date)
+        if cursor != None:
+            start = max(start, bisect.bisect_right(index.keys, cursor))
+        if start >= stop:
+            return [], None
+
+        end = min(stop, start + limit)
+        page = index.orders[start:end]
+        next_cursor = index.keys[end - 1] if end < stop else None
+        return page, next_cursor
+
+    # answered from the daily sales buckets, end_date is exclusive
+    def sales_totals(self, start_date=None, end_date=None, payment_method=None, received_by=None):
+        return self.sales.totals(start_date, end_date, payment_method, received_by)
+
+    def snapshot_state(self):
+        return {'orders': [order_to_record(order) for order in self.orders.orders]}
+
+    def load_state(self, state):
+        for record in state['orders']:
+            self.add_order(order_from_record(record, self._resolve_account))
 
-    def view_all_orders(self, account):
-        return None
+    def _apply_add_order(self, record):
+        self.add_order(order_from_record(record, self._resolve_account))
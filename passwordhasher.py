@@ -0,0 +1,92 @@
+import asyncio
+import functools
+import hashlib
+import hmac
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+ALGORITHM = 'pbkdf2'
+
+
+# module level so they can be sent to a process pool
+def hash_password(password, iterations, hash_name, salt):
+    digest = hashlib.pbkdf2_hmac(hash_name, password.encode('utf-8'), salt, iterations)
+    return '%s$%s$%d$%s$%s' % (ALGORITHM, hash_name, iterations, salt.hex(), digest.hex())
+
+
+# pbkdf2$hash name$iterations$salt hex$digest hex -> (hash name, iterations,
+# salt, digest), or None when encoded is not in that format
+def parse_hash(encoded):
+    parts = encoded.split('$') if type(encoded) is str else ()
+    if len(parts) != 5 or parts[0] != ALGORITHM or not parts[2].isdigit() or int(parts[2]) < 1:
+        return None
+    _, hash_name, iterations, salt, digest = parts
+    try:
+        hashlib.new(hash_name)
+        salt = bytes.fromhex(salt)
+        digest = bytes.fromhex(digest)
+    except ValueError:
+        return None
+    if not digest:
+        return None
+    return hash_name, int(iterations), salt, digest
+
+
+def verify_password(password, encoded):
+    parsed = parse_hash(encoded)
+    if parsed == None:
+        return False
+
+    hash_name, iterations, salt, digest = parsed
+    expected = hashlib.pbkdf2_hmac(hash_name, password.encode('utf-8'), salt, iterations, len(digest))
+    return hmac.compare_digest(expected, digest)
+
+
+# salted PBKDF2 hashing with tunable cost; the cost is stored in each hash
+# so raising it later does not invalidate existing passwords
+class PasswordHasher:
+
+    def __init__(self, iterations=100000, hash_name='sha256', salt_size=16,
+                 max_workers=None, use_processes=False):
+        self.iterations = iterations
+        self.hash_name = hash_name
+        self.salt_size = salt_size
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self._executor = None
+
+    @property
+    def executor(self):
+        # hashlib releases the GIL while hashing, so threads scale across cores
+        if self._executor == None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='password-hasher')
+        return self._executor
+
+    # the pool stays behind when the hasher is sent to another process
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_executor'] = None
+        return state
+
+    def hash(self, password):
+        return hash_password(password, self.iterations, self.hash_name, os.urandom(self.salt_size))
+
+    def verify(self, password, encoded):
+        return verify_password(password, encoded)
+
+    async def hash_async(self, password):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(
+            hash_password, password, self.iterations, self.hash_name, os.urandom(self.salt_size)))
+
+    async def verify_async(self, password, encoded):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(verify_password, password, encoded))
+
+    def shutdown(self):
+        if self._executor != None:
+            self._executor.shutdown()
+            self._executor = None
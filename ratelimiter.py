@@ -0,0 +1,81 @@
+import threading
+import time
+
+
+class RateLimiterShard:
+    __slots__ = ('lock', 'buckets', 'allowed', 'rejected')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [tokens, last refill time]
+        self.buckets = {}
+        self.allowed = 0
+        self.rejected = 0
+
+
+# token bucket per key; keys are spread over shards with their own lock
+# so threads checking unrelated keys rarely contend
+class RateLimiter:
+
+    def __init__(self, rate, burst, shards=16, max_keys_per_shard=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys_per_shard = max_keys_per_shard
+        self.clock = clock
+        self.shards = [RateLimiterShard() for _ in range(shards)]
+
+    @property
+    def allowed_count(self):
+        return sum(shard.allowed for shard in self.shards)
+
+    @property
+    def rejected_count(self):
+        return sum(shard.rejected for shard in self.shards)
+
+    def allow(self, key):
+        shard = self.shards[hash(key) % len(self.shards)]
+        now = self.clock()
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket == None:
+                if len(shard.buckets) >= self.max_keys_per_shard:
+                    self._prune(shard, now)
+                bucket = shard.buckets[key] = [self.burst, now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                shard.allowed += 1
+                return True
+            shard.rejected += 1
+            return False
+
+    # buckets that have refilled completely behave like new ones and can go
+    def _prune(self, shard, now):
+        full = [key for key, (tokens, updated) in shard.buckets.items()
+                if tokens + (now - updated) * self.rate >= self.burst]
+        for key in full:
+            del shard.buckets[key]
+
+
+# 4.3 Login, limits attempts per email and per client before any password hashing
+class LoginRateLimiter:
+
+    def __init__(self, email_rate=10 / 60, email_burst=10, client_rate=100 / 60, client_burst=100, shards=16):
+        self.by_email = RateLimiter(email_rate, email_burst, shards)
+        self.by_client = RateLimiter(client_rate, client_burst, shards)
+
+    def allow(self, email_key, client_id=None):
+        if client_id != None and not self.by_client.allow(client_id):
+            return False
+        return self.by_email.allow(email_key)
+
+    def metrics(self):
+        return {
+            'allowed_by_email': self.by_email.allowed_count,
+            'rejected_by_email': self.by_email.rejected_count,
+            'allowed_by_client': self.by_client.allowed_count,
+            'rejected_by_client': self.by_client.rejected_count,
+        }
@@ -1,4 +1,8 @@
 class Receipt:
+    __slots__ = ('order', 'content', 'receipt_id')
+
     def __init__(self, order):
         self.order = order
         self.content = None
+        # set by ReceiptManager.add_receipt
+        self.receipt_id = None
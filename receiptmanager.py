@@ -1,10 +1,157 @@
-class ReceiptManager:
+import threading
+import zlib
+from collections import OrderedDict
 
+from journal import AccountResolver, Journaled
+from order import order_from_record, order_to_record
+from receipt import Receipt
+from receiptrenderer import ReceiptRenderer
+
+DEFAULT_MAX_CACHED = 1000
+
+
+# metadata of a stored receipt; the body is only loaded when content is read
+class ReceiptInfo:
+    __slots__ = ('manager', 'receipt_id')
+
+    def __init__(self, manager, receipt_id):
+        self.manager = manager
+        self.receipt_id = receipt_id
+
+    @property
+    def order(self):
+        return self.manager.orders[self.receipt_id]
+
+    @property
+    def customer(self):
+        return self.order.customer
+
+    @property
+    def received_by(self):
+        return self.order.received_by
+
+    @property
+    def order_date(self):
+        return self.order.order_date
+
+    @property
+    def total_cost(self):
+        return self.order.total_cost
+
+    @property
+    def content(self):
+        return self.manager.get_receipt_content(self.receipt_id)
+
+
+# read-only list of receipt ids, ReceiptInfo objects are made as they are read
+class ReceiptView:
+
+    def __init__(self, manager, receipt_ids):
+        self.manager = manager
+        self.receipt_ids = receipt_ids
+
+    def __len__(self):
+        return len(self.receipt_ids)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        return ReceiptInfo(self.manager, self.receipt_ids[position])
+
+    def __iter__(self):
+        manager = self.manager
+        for receipt_id in self.receipt_ids:
+            yield ReceiptInfo(manager, receipt_id)
+
+
+class ReceiptManager(Journaled):
+
+    # account_manager resolves customers and staff when receipts are recovered from a journal,
+    # and tells guests apart when content is rendered lazily
+    def __init__(self, journal=None, account_manager=None, renderer=None, max_cached=DEFAULT_MAX_CACHED):
+        # receipt id -> order, and zlib compressed content or None when it is rendered on demand
+        self.orders = []
+        self.contents = []
+        # account -> receipt ids, oldest first
+        self.receipts_by_customer = {}
+        self.receipts_by_staff = {}
+        # receipt id -> content of recently read receipts
+        self.hot = OrderedDict()
+        # one add_receipt at a time so receipt ids are unique; readers never take it
+        self.write_lock = threading.Lock()
+        self.max_cached = max_cached
+        self.account_manager = account_manager
+        self.renderer = renderer if renderer != None else ReceiptRenderer()
+        self._resolve_account = AccountResolver(account_manager)
+        self.journal = journal
+        if journal != None:
+            self.recover()
+
+    @property
+    def receipts(self):
+        return ReceiptView(self, range(len(self.orders)))
+
+    # 4.6.1.2 Receipt Database Storage
     def add_receipt(self, receipt):
-        return None
+        order = receipt.order
+        content = zlib.compress(receipt.content.encode()) if receipt.content != None else None
+        with self.write_lock:
+            receipt_id = len(self.orders)
+            # content first, a receipt id below len(self.orders) always has both
+            self.contents.append(content)
+            self.orders.append(order)
+            if order.customer != None:
+                self.receipts_by_customer.setdefault(order.customer, []).append(receipt_id)
+            if order.received_by != None:
+                self.receipts_by_staff.setdefault(order.received_by, []).append(receipt_id)
+            receipt.receipt_id = receipt_id
+            self._record('add_receipt', order_to_record(order), receipt.content)
+        return True
 
+    # 4.6 Save Receipt Record
     def get_receipt_information(self, receipt):
-        return None
+        receipt_id = receipt.receipt_id
+        if receipt_id == None or receipt_id >= len(self.orders) or self.orders[receipt_id] is not receipt.order:
+            return None
+        return ReceiptInfo(self, receipt_id)
 
+    def stored_content(self, receipt_id):
+        content = self.contents[receipt_id]
+        return zlib.decompress(content).decode() if content != None else None
+
+    def get_receipt_content(self, receipt_id):
+        content = self.hot.get(receipt_id)
+        if content != None:
+            self.hot.move_to_end(receipt_id)
+            return content
+
+        content = self.stored_content(receipt_id)
+        if content == None:
+            order = self.orders[receipt_id]
+            is_guest = (self.account_manager == None or order.customer == None
+                        or self.account_manager.find_account(order.customer.email_address) == None)
+            content = self.renderer.render(Receipt(order), is_guest)
+        self.hot[receipt_id] = content
+        if len(self.hot) > self.max_cached:
+            self.hot.popitem(last=False)
+        return content
+
+    # 4.9.1 Receipt View Access, staff see the receipts they took and customers their own
     def get_all_receipts(self, account):
-        return None
+        receipt_ids = self.receipts_by_staff.get(account)
+        if receipt_ids == None:
+            receipt_ids = self.receipts_by_customer.get(account, [])
+        return ReceiptView(self, receipt_ids)
+
+    def snapshot_state(self):
+        return {'receipts': [(order_to_record(order), self.stored_content(receipt_id))
+                             for receipt_id, order in enumerate(self.orders)]}
+
+    def load_state(self, state):
+        for order_record, content in state['receipts']:
+            self._apply_add_receipt(order_record, content)
+
+    def _apply_add_receipt(self, order_record, content):
+        receipt = Receipt(order_from_record(order_record, self._resolve_account))
+        receipt.content = content
+        self.add_receipt(receipt)
@@ -0,0 +1,81 @@
+import string
+
+ACCOUNT_CREATION_LINK = 'https://example.com/create-account?email=%s'
+TEMPLATE_VERSION = 1
+
+EXISTING_ACCOUNT_TEMPLATE = '''Hello {customer_name},
+
+Thank you for your order.
+
+Order date: {order_date}
+Payment method: {payment_method}
+Billing address: {billing_address}
+Shipping: {shipping_cost}
+Tax: {tax_cost}
+Total: {total_cost}
+'''
+
+# 4.4.1.1 Guest Account Creation
+GUEST_TEMPLATE = EXISTING_ACCOUNT_TEMPLATE + '''
+Create an account to track your orders: {account_creation_link}
+'''
+
+TEMPLATES = {'existing': EXISTING_ACCOUNT_TEMPLATE, 'guest': GUEST_TEMPLATE}
+
+
+def format_value(value):
+    return 'N/A' if value == None else str(value)
+
+
+# 4.5.1 Email Information for Account
+def receipt_model(receipt, is_guest):
+    order = receipt.order
+    customer = order.customer
+    email_address = customer.email_address if customer != None else None
+    names = [name for name in (customer.first_name, customer.last_name) if name] if customer != None else []
+    return {
+        'email_address': email_address,
+        'customer_name': ' '.join(names) if names else format_value(email_address),
+        'order_date': format_value(order.order_date),
+        'payment_method': format_value(order.payment_method),
+        'billing_address': format_value(order.billing_address),
+        'shipping_cost': format_value(order.shipping_cost),
+        'tax_cost': format_value(order.tax_cost),
+        'total_cost': format_value(order.total_cost),
+        'is_guest': is_guest,
+        'account_creation_link': ACCOUNT_CREATION_LINK % email_address if is_guest else None,
+    }
+
+
+# splits a template into (literal, field) pairs once so rendering is a single join
+def compile_template(template):
+    return [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+
+
+class ReceiptRenderer:
+
+    def __init__(self, templates=None, version=TEMPLATE_VERSION):
+        self.templates = templates if templates != None else TEMPLATES
+        self.version = version
+        # (template name, version) -> compiled template
+        self._compiled = {}
+
+    def compiled_template(self, name):
+        key = (name, self.version)
+        compiled = self._compiled.get(key)
+        if compiled == None:
+            compiled = self._compiled[key] = compile_template(self.templates[name])
+        return compiled
+
+    def render_model(self, model):
+        compiled = self.compiled_template('guest' if model['is_guest'] else 'existing')
+        parts = []
+        append = parts.append
+        for literal, field in compiled:
+            append(literal)
+            if field != None:
+                append(model[field])
+        return ''.join(parts)
+
+    def render(self, receipt, is_guest):
+        return self.render_model(receipt_model(receipt, is_guest))
@@ -0,0 +1,115 @@
+from account import STAFF_ROLES, account_from_record, account_to_record
+from accountmanager import iterate_accounts
+from receiptmanager import ReceiptInfo
+
+BATCH_SIZE = 256
+
+
+# accounts as they were when the snapshot was opened. Partitions are frozen
+# copy-on-write, and writers hand over an account's old record before its
+# first change, so nothing is copied up front and writers never wait.
+class AccountSnapshot:
+
+    def __init__(self, account_manager):
+        self.account_manager = account_manager
+        # key -> account record from before its first change after the snapshot
+        self.before = {}
+        with account_manager.index_lock:
+            self.partitions = {name: partition.freeze() for name, partition in account_manager.partitions.items()}
+            account_manager.snapshots.append(self)
+
+    def preserve(self, key, account):
+        if key not in self.before:
+            self.before[key] = account_to_record(account)
+
+    # a detached copy; the old record is checked after reading the live
+    # account so a change that started meanwhile is never seen
+    def account(self, key):
+        account = self.account_manager.accounts.get(key)
+        record = account_to_record(account) if account != None else None
+        return account_from_record(self.before.get(key, record))
+
+    # 4.8.1 Account view access
+    def view_all_accounts(self, role, **filters):
+        if role not in STAFF_ROLES:
+            return iter(())
+        return iterate_accounts(self.partitions, self.account, None, **filters)
+
+    def close(self):
+        with self.account_manager.index_lock:
+            if self in self.account_manager.snapshots:
+                self.account_manager.snapshots.remove(self)
+
+
+# orders are never changed once added, so a snapshot is the last committed
+# sequence number; later orders are skipped while reading
+class OrderSnapshot:
+
+    def __init__(self, order_manager):
+        self.order_manager = order_manager
+        self.sequence = order_manager.committed_sequence
+
+    def _iterate(self, index, start_date, end_date):
+        if index == None:
+            return
+        after = None
+        while True:
+            keys, orders = index.batch(after, BATCH_SIZE, start_date, end_date)
+            if not keys:
+                return
+            for key, order in zip(keys, orders):
+                if key[-1] <= self.sequence:
+                    yield order
+            after = keys[-1]
+
+    def view_all_orders(self, account, start_date=None, end_date=None):
+        return self._iterate(self.order_manager.orders_by_customer.get(account), start_date, end_date)
+
+    def view_orders_received_by(self, staff, start_date=None, end_date=None):
+        return self._iterate(self.order_manager.orders_by_staff.get(staff), start_date, end_date)
+
+    def all_orders(self, start_date=None, end_date=None):
+        return self._iterate(self.order_manager.orders, start_date, end_date)
+
+
+# receipts are append only, ids at or past the count are newer than the snapshot
+class ReceiptSnapshot:
+
+    def __init__(self, receipt_manager):
+        self.receipt_manager = receipt_manager
+        self.count = len(receipt_manager.orders)
+
+    # 4.9.1 Receipt View Access
+    def get_all_receipts(self, account):
+        manager = self.receipt_manager
+        receipt_ids = manager.receipts_by_staff.get(account)
+        if receipt_ids == None:
+            receipt_ids = manager.receipts_by_customer.get(account, [])
+        for receipt_id in receipt_ids:
+            if receipt_id >= self.count:
+                return
+            yield ReceiptInfo(manager, receipt_id)
+
+
+# one consistent view over the stores for a staff report:
+#     with ReportSnapshot(accounts, orders, receipts) as report:
+#         for account in report.accounts.view_all_accounts(KITCHEN_MANAGER): ...
+class ReportSnapshot:
+
+    def __init__(self, account_manager, order_manager=None, receipt_manager=None):
+        # only the account snapshot is consistent with itself: orders and receipts
+        # are not written under the account index lock, so each of them is cut on
+        # its own and one added meanwhile may show in the orders but not the receipts
+        with account_manager.index_lock:
+            self.accounts = AccountSnapshot(account_manager)
+            self.orders = OrderSnapshot(order_manager) if order_manager != None else None
+            self.receipts = ReceiptSnapshot(receipt_manager) if receipt_manager != None else None
+
+    def close(self):
+        self.accounts.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,127 @@
+import bisect
+from datetime import datetime
+
+METRICS = ('total_cost', 'tax_cost', 'shipping_cost')
+
+
+# running count, sum, min and max of one cost field
+class Statistic:
+    __slots__ = ('count', 'sum', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        if self.min == None or value < self.min:
+            self.min = value
+        if self.max == None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        self.count += other.count
+        self.sum += other.sum
+        if self.min == None or other.min < self.min:
+            self.min = other.min
+        if self.max == None or other.max > self.max:
+            self.max = other.max
+
+
+class SalesAggregate:
+    __slots__ = ('count', 'total_cost', 'tax_cost', 'shipping_cost')
+
+    def __init__(self):
+        self.count = 0
+        self.total_cost = Statistic()
+        self.tax_cost = Statistic()
+        self.shipping_cost = Statistic()
+
+    def add(self, order):
+        self.count += 1
+        for metric in METRICS:
+            value = getattr(order, metric)
+            if value != None:
+                getattr(self, metric).add(value)
+
+    def merge(self, other):
+        self.count += other.count
+        for metric in METRICS:
+            getattr(self, metric).merge(getattr(other, metric))
+
+
+def as_day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+# one aggregate per day plus an all-time aggregate, days kept sorted for range queries
+class DailySales:
+
+    def __init__(self):
+        self.all_time = SalesAggregate()
+        self.days = []
+        self.by_day = {}
+
+    def add(self, day, order):
+        self.all_time.add(order)
+        if day == None:
+            return
+
+        aggregate = self.by_day.get(day)
+        if aggregate == None:
+            aggregate = self.by_day[day] = SalesAggregate()
+            bisect.insort(self.days, day)
+        aggregate.add(order)
+
+    # start_day is inclusive and end_day exclusive
+    def window(self, start_day=None, end_day=None):
+        result = SalesAggregate()
+        if start_day == None and end_day == None:
+            result.merge(self.all_time)
+            return result
+
+        low = 0 if start_day == None else bisect.bisect_left(self.days, start_day)
+        high = len(self.days) if end_day == None else bisect.bisect_left(self.days, end_day)
+        for day in self.days[low:high]:
+            result.merge(self.by_day[day])
+        return result
+
+
+def bucket(buckets, key):
+    sales = buckets.get(key)
+    if sales == None:
+        sales = buckets[key] = DailySales()
+    return sales
+
+
+class SalesAggregates:
+
+    def __init__(self):
+        self.overall = DailySales()
+        self.by_payment_method = {}
+        self.by_staff = {}
+
+    def add(self, order):
+        day = as_day(order.order_date)
+        self.overall.add(day, order)
+        bucket(self.by_payment_method, order.payment_method).add(day, order)
+        bucket(self.by_staff, order.received_by).add(day, order)
+
+    def totals(self, start_day=None, end_day=None, payment_method=None, received_by=None):
+        if payment_method != None and received_by != None:
+            raise ValueError('sales are bucketed by payment method or by staff, not both')
+
+        if payment_method != None:
+            sales = self.by_payment_method.get(payment_method)
+        elif received_by != None:
+            sales = self.by_staff.get(received_by)
+        else:
+            sales = self.overall
+        return sales.window(as_day(start_day), as_day(end_day)) if sales != None else SalesAggregate()
@@ -0,0 +1,51 @@
+from sortedkeys import SortedKeyList
+
+SEARCH_FIELDS = ('email_address', 'first_name', 'last_name')
+NAME_FIELDS = ('first_name', 'last_name')
+
+
+# sorted (term, account key) pairs per field, so a prefix query is a range scan
+class AccountSearchIndex:
+
+    def __init__(self, fields=SEARCH_FIELDS):
+        self.fields = fields
+        self.terms = {field: SortedKeyList() for field in fields}
+
+    def add(self, key, account):
+        for field in self.fields:
+            value = getattr(account, field)
+            if value:
+                self.terms[field].add((value.lower(), key))
+
+    # must be called with the values that were indexed, before they change
+    def remove(self, key, account):
+        for field in self.fields:
+            value = getattr(account, field)
+            if value:
+                self.terms[field].remove((value.lower(), key))
+
+    def _matches(self, field, prefix):
+        for term, key in self.terms[field].irange((prefix,)):
+            if not term.startswith(prefix):
+                return
+            yield key
+
+    # every account key with a term in fields starting with prefix
+    def keys_with_prefix(self, prefix, fields):
+        prefix = prefix.lower()
+        return {key for field in fields for key in self._matches(field, prefix)}
+
+    # first `limit` distinct account keys with a term starting with prefix,
+    # field by field in the order of self.fields, then by term
+    def search(self, prefix, limit=10, fields=None):
+        prefix = prefix.strip().lower()
+        found = []
+        seen = set()
+        for field in fields if fields != None else self.fields:
+            for key in self._matches(field, prefix):
+                if key not in seen:
+                    seen.add(key)
+                    found.append(key)
+                    if len(found) == limit:
+                        return found
+        return found
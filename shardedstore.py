@@ -0,0 +1,410 @@
+import heapq
+import multiprocessing
+import os
+import threading
+import zlib
+
+import validators
+from account import STAFF_ROLES
+from accountmanager import DEFAULT_PAGE_SIZE, AccountManager, AccountView, normalize_email
+from emailoutbox import EmailOutbox
+from journal import AccountResolver
+from order import order_from_record, order_to_record
+from ordermanager import OrderManager, OrderView
+from receipt import Receipt
+from receiptmanager import ReceiptManager
+from salesaggregates import SalesAggregate
+
+
+# stable across processes, unlike hash() on str
+# the calls that store an order or receipt; only these keep stand-in accounts
+STORING_METHODS = ('add_order', 'add_receipt')
+
+
+def shard_for(email_address, shards):
+    return zlib.crc32(normalize_email(email_address).encode()) % shards
+
+
+# accounts, orders and receipts cross the process boundary as copies, so
+# they are sent as references the shard resolves against its own objects
+class AccountRef:
+    __slots__ = ('email_address',)
+
+    def __init__(self, email_address):
+        self.email_address = email_address
+
+
+class OrderRef:
+    __slots__ = ('record',)
+
+    def __init__(self, order):
+        self.record = order_to_record(order)
+
+
+class ReceiptRef:
+    __slots__ = ('order', 'content', 'receipt_id')
+
+    def __init__(self, receipt):
+        self.order = OrderRef(receipt.order)
+        self.content = receipt.content
+        self.receipt_id = receipt.receipt_id
+
+
+def account_ref(account):
+    return AccountRef(account.email_address) if account != None else None
+
+
+def order_date_key(order):
+    return (0,) if order.order_date == None else (1, order.order_date)
+
+
+# stands in for the shard's outbox; the mail goes back to the router with the
+# response and is delivered by the store's outbox
+class ReturnedMail:
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(message)
+        return True
+
+    def take(self):
+        messages, self.messages = self.messages, []
+        return messages
+
+
+# one shard: the three managers for the customers whose email hashes here,
+# with their orders and receipts co-located
+class Shard:
+
+    def __init__(self, password_hasher=None):
+        self.mail = ReturnedMail()
+        self.account_manager = AccountManager(password_hasher, self.mail)
+        self.order_manager = OrderManager(account_manager=self.account_manager)
+        self.receipt_manager = ReceiptManager(account_manager=self.account_manager)
+        # staff and customers of other shards get stand-in accounts
+        self._resolve_account = AccountResolver(self.account_manager)
+
+    # resolve_account keeps the stand-ins it makes, or, for lookups, throws them away
+    def resolve(self, value, resolve_account):
+        if isinstance(value, AccountRef):
+            return resolve_account(value.email_address)
+        if isinstance(value, OrderRef):
+            return order_from_record(value.record, resolve_account)
+        if isinstance(value, ReceiptRef):
+            receipt = Receipt(self.resolve(value.order, resolve_account))
+            receipt.content = value.content
+            receipt.receipt_id = value.receipt_id
+            return receipt
+        return value
+
+    def call(self, target, method, args, kwargs):
+        resolver = self._resolve_account
+        resolve_account = resolver if method in STORING_METHODS else resolver.find
+        args = [self.resolve(argument, resolve_account) for argument in args]
+        function = getattr(self, method, None) if target == None else getattr(getattr(self, target), method)
+        result = function(*args, **kwargs)
+        # views hold the whole index, only the rows they cover are sent back
+        if isinstance(result, (AccountView, OrderView)):
+            return list(result)
+        if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], OrderView):
+            return list(result[0]), result[1]
+        return result
+
+    def verification_email(self, account):
+        message = self.account_manager.send_email_verification_email(account)
+        return message, account.activation_code
+
+    def add_receipt(self, receipt):
+        self.receipt_manager.add_receipt(receipt)
+        return receipt.receipt_id
+
+    def receipt_information(self, receipt):
+        receipts = self.receipt_manager
+        receipt_id = receipt.receipt_id
+        if receipt_id == None or receipt_id >= len(receipts.orders):
+            return None
+        if order_to_record(receipts.orders[receipt_id]) != order_to_record(receipt.order):
+            return None
+        return self.detached_receipt(receipt_id)
+
+    # metadata only, content stays in the shard until asked for
+    def detached_receipt(self, receipt_id):
+        receipt = Receipt(self.receipt_manager.orders[receipt_id])
+        receipt.receipt_id = receipt_id
+        return receipt
+
+    def receipt_content(self, receipt_id):
+        return self.receipt_manager.get_receipt_content(receipt_id)
+
+    def all_receipts(self, account):
+        return [self.detached_receipt(info.receipt_id) for info in self.receipt_manager.get_all_receipts(account)]
+
+
+def serve(connection, password_hasher):
+    shard = Shard(password_hasher)
+    while True:
+        request = connection.recv()
+        if request == None:
+            break
+        try:
+            response = (True, shard.call(*request))
+        except Exception as error:
+            response = (False, error)
+        connection.send(response + (shard.mail.take(),))
+    connection.close()
+
+
+class ShardClient:
+
+    def __init__(self, context, password_hasher, outbox):
+        self.outbox = outbox
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=serve, args=(child, password_hasher), daemon=True)
+        self.process.start()
+        child.close()
+        # one request in flight per shard; callers on other shards run in parallel
+        self.lock = threading.Lock()
+
+    def send(self, target, method, args, kwargs):
+        self.connection.send((target, method, args, kwargs))
+
+    def receive(self):
+        ok, value, messages = self.connection.recv()
+        for message in messages:
+            self.outbox.send(message)
+        if not ok:
+            raise value
+        return value
+
+    def call(self, target, method, *args, **kwargs):
+        with self.lock:
+            self.send(target, method, args, kwargs)
+            return self.receive()
+
+    def close(self):
+        with self.lock:
+            self.connection.send(None)
+            self.connection.close()
+        self.process.join()
+
+
+# accounts are partitioned across worker processes by a hash of their email;
+# the router objects keep the AccountManager, OrderManager and ReceiptManager
+# method signatures. Accounts, orders and receipts returned are copies. An
+# account stays on the shard it was created on: when its email changes to one
+# that hashes elsewhere, the directory routes the new email back to it, so its
+# password hash, orders and receipts never move.
+class ShardedStore:
+
+    # workers are not forked from the caller, which may already run threads
+    # (the outbox, the password hasher pool) whose locks a fork would copy held
+    def __init__(self, shards=None, password_hasher=None, outbox=None):
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        context = multiprocessing.get_context(start_method)
+        self.outbox = outbox if outbox != None else EmailOutbox()
+        self.shards = [ShardClient(context, password_hasher, self.outbox) for _ in range(shards or os.cpu_count())]
+        # normalized email -> shard number, only for accounts off their hash shard
+        self.directory = {}
+        # per hash shard, held while an email is placed on it by a registration
+        # or claimed for an account on another shard
+        self.placement_locks = [threading.Lock() for _ in self.shards]
+        self.account_manager = ShardedAccountManager(self)
+        self.order_manager = ShardedOrderManager(self)
+        self.receipt_manager = ShardedReceiptManager(self)
+
+    def home(self, email_address):
+        return shard_for(email_address if type(email_address) is str else '', len(self.shards))
+
+    def shard(self, email_address):
+        number = self.directory.get(normalize_email(email_address)) if type(email_address) is str else None
+        return self.shards[number if number != None else self.home(email_address)]
+
+    def customer_shard(self, order):
+        return self.shard(order.customer.email_address if order.customer != None else None)
+
+    # sends to every shard before waiting on any, so they work in parallel
+    def broadcast(self, target, method, *args, **kwargs):
+        for shard in self.shards:
+            shard.lock.acquire()
+        try:
+            for shard in self.shards:
+                shard.send(target, method, args, kwargs)
+            return [shard.receive() for shard in self.shards]
+        finally:
+            for shard in self.shards:
+                shard.lock.release()
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self.outbox.close()
+
+
+class ShardedAccountManager:
+
+    def __init__(self, store):
+        self.store = store
+
+    def _call(self, email_address, method, *args, **kwargs):
+        return self.store.shard(email_address).call('account_manager', method, *args, **kwargs)
+
+    def verify_account(self, first_name, last_name, email_address, home_address, password):
+        return self._call(email_address, 'verify_account', first_name, last_name, email_address, home_address,
+                          password)
+
+    def verify_email_address(self, email_address):
+        return validators.is_valid_email(email_address)
+
+    def verify_password(self, password):
+        return validators.is_valid_password(password)
+
+    def verify_email_does_not_exist_in_system(self, email_address):
+        return self._call(email_address, 'verify_email_does_not_exist_in_system', email_address)
+
+    def find_account(self, email_address):
+        return self._call(email_address, 'find_account', email_address)
+
+    def add_account(self, account):
+        with self.store.placement_locks[self.store.home(account.email_address)]:
+            return self._call(account.email_address, 'add_account', account)
+
+    def unlock_account(self, activation_code):
+        return any(self.store.broadcast('account_manager', 'unlock_account', activation_code))
+
+    def send_password_reset_email(self, email):
+        return self._call(email, 'send_password_reset_email', email)
+
+    def send_email_verification_email(self, account):
+        message, activation_code = self.store.shard(account.email_address).call(
+            None, 'verification_email', account_ref(account))
+        if message != None:
+            account.activation_code = activation_code
+        return message
+
+    def login(self, email, password, client_id=None):
+        return self._call(email, 'login', email, password, client_id)
+
+    def get_account(self, account):
+        return self._call(account.email_address, 'get_account', account_ref(account))
+
+    def change_password(self, account, new_password):
+        return self._call(account.email_address, 'change_password', account_ref(account), new_password)
+
+    def reset_password(self, code, new_password):
+        return any(self.store.broadcast('account_manager', 'reset_password', code, new_password))
+
+    def view_all_accounts(self, role, **filters):
+        if role not in STAFF_ROLES:
+            return []
+        pages = self.store.broadcast('account_manager', 'view_all_accounts', role, **filters)
+        return list(heapq.merge(*pages, key=lambda account: normalize_email(account.email_address)))
+
+    def view_accounts_page(self, role, cursor=None, limit=DEFAULT_PAGE_SIZE, **filters):
+        if role not in STAFF_ROLES:
+            return [], None
+        results = self.store.broadcast('account_manager', 'view_accounts_page', role, cursor, limit, **filters)
+        merged = list(heapq.merge(*[page for page, _ in results],
+                                  key=lambda account: normalize_email(account.email_address)))
+        page = merged[:limit]
+        more = len(merged) > limit or any(next_cursor != None for _, next_cursor in results)
+        return page, normalize_email(page[-1].email_address) if more and page else None
+
+    def ban_account(self, account, state):
+        if not self._call(account.email_address, 'ban_account', account_ref(account), state):
+            return False
+        account.is_banned = state
+        return True
+
+    def is_account_banned(self, account):
+        return self._call(account.email_address, 'is_account_banned', account_ref(account))
+
+    def admin_create_account(self, creator_role, email, role):
+        with self.store.placement_locks[self.store.home(email)]:
+            return self._call(email, 'admin_create_account', creator_role, email, role)
+
+    def search_accounts(self, prefix, limit=10):
+        found = [account for accounts in self.store.broadcast('account_manager', 'search_accounts', prefix, limit)
+                 for account in accounts]
+        return sorted(found, key=lambda account: normalize_email(account.email_address))[:limit]
+
+    # the account keeps its shard; a new email that routes elsewhere is
+    # claimed in the directory first, and released again if the change fails
+    def change_personal_information(self, account, first_name, last_name, email_address, address):
+        store = self.store
+        if type(email_address) is not str:
+            return False
+        source = store.shard(account.email_address)
+        old_key = normalize_email(account.email_address)
+        new_key = normalize_email(email_address)
+        with store.placement_locks[store.home(email_address)]:
+            destination = store.shard(email_address)
+            claimed = new_key != old_key and destination is not source
+            if claimed:
+                if not destination.call('account_manager', 'verify_email_does_not_exist_in_system', email_address):
+                    return False
+                store.directory[new_key] = store.shards.index(source)
+            if not source.call('account_manager', 'change_personal_information', account_ref(account),
+                               first_name, last_name, email_address, address):
+                if claimed:
+                    del store.directory[new_key]
+                return False
+            if new_key != old_key:
+                store.directory.pop(old_key, None)
+        account.first_name = first_name
+        account.last_name = last_name
+        account.email_address = email_address
+        account.address = address
+        return True
+
+
+class ShardedOrderManager:
+
+    def __init__(self, store):
+        self.store = store
+
+    def add_order(self, order):
+        return self.store.customer_shard(order).call('order_manager', 'add_order', OrderRef(order))
+
+    def view_all_orders(self, account, start_date=None, end_date=None):
+        return self.store.shard(account.email_address).call('order_manager', 'view_all_orders',
+                                                            account_ref(account), start_date, end_date)
+
+    def view_orders_received_by(self, staff, start_date=None, end_date=None):
+        orders = self.store.broadcast('order_manager', 'view_orders_received_by', account_ref(staff),
+                                      start_date, end_date)
+        return list(heapq.merge(*orders, key=order_date_key))
+
+    def view_orders_page(self, account, cursor=None, limit=DEFAULT_PAGE_SIZE, start_date=None, end_date=None):
+        return self.store.shard(account.email_address).call('order_manager', 'view_orders_page',
+                                                            account_ref(account), cursor, limit, start_date,
+                                                            end_date)
+
+    def sales_totals(self, start_date=None, end_date=None, payment_method=None, received_by=None):
+        result = SalesAggregate()
+        for totals in self.store.broadcast('order_manager', 'sales_totals', start_date, end_date, payment_method,
+                                           account_ref(received_by)):
+            result.merge(totals)
+        return result
+
+
+class ShardedReceiptManager:
+
+    def __init__(self, store):
+        self.store = store
+
+    def add_receipt(self, receipt):
+        receipt.receipt_id = self.store.customer_shard(receipt.order).call(None, 'add_receipt', ReceiptRef(receipt))
+        return True
+
+    def get_receipt_information(self, receipt):
+        return self.store.customer_shard(receipt.order).call(None, 'receipt_information', ReceiptRef(receipt))
+
+    # receipt ids are per shard, so the receipt's customer picks the shard
+    def get_receipt_content(self, receipt):
+        return self.store.customer_shard(receipt.order).call(None, 'receipt_content', receipt.receipt_id)
+
+    def get_all_receipts(self, account):
+        return [receipt for receipts in self.store.broadcast(None, 'all_receipts', account_ref(account))
+                for receipt in receipts]
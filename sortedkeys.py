@@ -0,0 +1,120 @@
+import bisect
+
+
+# sorted list of unique keys split into bounded chunks, so inserts and
+# removals move at most one chunk instead of the whole list. freeze() shares
+# the chunks with a read-only copy; a shared chunk is copied before it changes.
+class SortedKeyList:
+
+    CHUNK_SIZE = 1000
+
+    def __init__(self, keys=()):
+        self.chunks = []
+        self.maxes = []
+        keys = sorted(set(keys))
+        for start in range(0, len(keys), self.CHUNK_SIZE):
+            chunk = keys[start:start + self.CHUNK_SIZE]
+            self.chunks.append(chunk)
+            self.maxes.append(chunk[-1])
+        self.length = len(keys)
+        # False for chunks shared with a frozen copy
+        self.owned = [True] * len(self.chunks)
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, key):
+        position = bisect.bisect_left(self.maxes, key)
+        if position == len(self.maxes):
+            return False
+        chunk = self.chunks[position]
+        return chunk[bisect.bisect_left(chunk, key)] == key
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield from chunk
+
+    def add(self, key):
+        if not self.maxes:
+            self.chunks.append([key])
+            self.maxes.append(key)
+            self.owned.append(True)
+            self.length = 1
+            return True
+
+        position = bisect.bisect_left(self.maxes, key)
+        if position == len(self.maxes):
+            position -= 1
+        chunk = self.chunks[position]
+        index = bisect.bisect_left(chunk, key)
+        if index < len(chunk) and chunk[index] == key:
+            return False
+
+        chunk = self._own(position)
+        chunk.insert(index, key)
+        self.maxes[position] = chunk[-1]
+        self.length += 1
+        if len(chunk) > self.CHUNK_SIZE * 2:
+            self.chunks.insert(position + 1, chunk[self.CHUNK_SIZE:])
+            self.owned.insert(position + 1, True)
+            del chunk[self.CHUNK_SIZE:]
+            self.maxes.insert(position, chunk[-1])
+        return True
+
+    def remove(self, key):
+        position = bisect.bisect_left(self.maxes, key)
+        if position == len(self.maxes):
+            return False
+        chunk = self.chunks[position]
+        index = bisect.bisect_left(chunk, key)
+        if index == len(chunk) or chunk[index] != key:
+            return False
+
+        chunk = self._own(position)
+        del chunk[index]
+        self.length -= 1
+        if chunk:
+            self.maxes[position] = chunk[-1]
+        else:
+            del self.chunks[position]
+            del self.maxes[position]
+            del self.owned[position]
+        return True
+
+    def _own(self, position):
+        if not self.owned[position]:
+            self.chunks[position] = list(self.chunks[position])
+            self.owned[position] = True
+        return self.chunks[position]
+
+    # read-only copy of the current keys, costs one reference per chunk
+    def freeze(self):
+        frozen = SortedKeyList()
+        frozen.chunks = list(self.chunks)
+        frozen.maxes = list(self.maxes)
+        frozen.owned = [False] * len(self.chunks)
+        frozen.length = self.length
+        self.owned = [False] * len(self.chunks)
+        return frozen
+
+    # keys from start onwards (after start when inclusive is False)
+    def irange(self, start=None, inclusive=True):
+        if start == None:
+            yield from self
+            return
+
+        find = bisect.bisect_left if inclusive else bisect.bisect_right
+        position = find(self.maxes, start)
+        if position == len(self.maxes):
+            return
+        chunk = self.chunks[position]
+        yield from chunk[find(chunk, start):]
+        for chunk in self.chunks[position + 1:]:
+            yield from chunk
+
+    def prefix(self, prefix, after=None):
+        start = prefix if after == None or after < prefix else after
+        for key in self.irange(start, inclusive=after == None or after < prefix):
+            if not key.startswith(prefix):
+                return
+            yield key
@@ -0,0 +1,43 @@
+import threading
+from contextlib import nullcontext
+
+
+class StripeGuard:
+
+    def __init__(self, locks):
+        self.locks = locks
+
+    def __enter__(self):
+        for lock in self.locks:
+            lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        for lock in reversed(self.locks):
+            lock.release()
+
+
+# a fixed set of locks shared by all keys; keys hash onto a stripe, so
+# unrelated keys rarely share a lock. Several keys are locked in stripe
+# order to avoid deadlocks.
+class StripedLock:
+
+    def __init__(self, stripes=64):
+        self.stripes = [threading.RLock() for _ in range(stripes)]
+
+    def __call__(self, *keys):
+        numbers = sorted({hash(key) % len(self.stripes) for key in keys})
+        return StripeGuard([self.stripes[number] for number in numbers])
+
+
+# used when a manager is only touched from one thread
+class NoLock:
+
+    def __call__(self, *keys):
+        return nullcontext()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
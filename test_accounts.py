@@ -1,7 +1,13 @@
 from accountmanager import AccountManager
 from account import Account
-from accountexceptions import AccountBannedException, AccountDoesNotExistException, AccountLockedException, AccountIncorrectPasswordException
+from accounttable import AccountTable
+from passwordhasher import PasswordHasher
+from ratelimiter import LoginRateLimiter
+from accountexceptions import AccountBannedException, AccountDoesNotExistException, AccountLockedException, AccountIncorrectPasswordException, AccountRateLimitedException
+import asyncio
 import pytest
+import threading
+import validators
 
 def test_verify_account_is_valid():
     # 4.1.1 Required account information
@@ -303,4 +309,149 @@ def test_account_creation_with_customer_role_unsuccessful():
     # 4.9.1.1 Account Type
     manager = AccountManager()
   
-    assert manager.admin_create_account('KitchenManager', 'newAdmin@hotmail.com', 'Customer') == False, 'Expected customer to not be created'
\ No newline at end of file
+    assert manager.admin_create_account('KitchenManager', 'newAdmin@hotmail.com', 'Customer') == False, 'Expected customer to not be created'
+
+def test_verify_existing_account_ignores_email_case():
+    # 4.1.1.2 Existing accounts
+    manager = AccountManager()
+    manager.add_account(Account('Mixed.Case@Example.com'))
+
+    assert manager.verify_email_does_not_exist_in_system(
+        'mixed.case@example.com ') == False, 'Account already exists within the system'
+
+
+def test_account_table_round_trip():
+    # 4.8.1.1 Viewable customer information
+    account = Account('table@example.com')
+    account.first_name = 'Bob'
+    account.is_locked = False
+
+    table = AccountTable.from_accounts([account])
+    row = table.row(0)
+
+    assert len(table) == 1, 'Expected one row in the table'
+    assert row.email_address == account.email_address, 'Expected email address to match'
+    assert row.first_name == account.first_name, 'Expected first name to match'
+    assert row.is_locked == False, 'Expected locked status to match'
+
+def test_verify_accounts_batch_reports_each_row():
+    # 4.1.1 Required account information
+    manager = AccountManager()
+    manager.add_account(Account('hey@example.com'))
+
+    results = manager.verify_accounts_batch([
+        ('Greg', 'Gregton', 'greg.ton@example.com', '46 Greg Ave', 'Password1'),
+        ('Greg', 'Gregton', 'ton$gregexamplecom', '46 Greg Ave', 'Password1'),
+        ('Greg', 'Gregton', 'super@example.com', '46 Greg Ave', 'SupermanGuy'),
+        ('Greg', 'Gregton', 'hey@example.com', '46 Greg Ave', 'Password1'),
+        ('Greg', 'Gregton', 'Greg.Ton@example.com', '46 Greg Ave', 'Password1'),
+        (None, 'Gregton', 'none@example.com', '46 Greg Ave', 'Password1'),
+    ])
+
+    assert results == [validators.VALID, validators.INVALID_EMAIL, validators.INVALID_PASSWORD,
+                       validators.EMAIL_EXISTS, validators.EMAIL_EXISTS,
+                       validators.MISSING_INFORMATION], 'Expected a result for every row'
+
+def test_password_is_stored_as_salted_hash():
+    # 4.3 Login
+    manager = AccountManager(PasswordHasher(iterations=1000))
+    account = Account('hash@example.com')
+    account.password = 'Password1'
+    account.is_locked = False
+
+    manager.add_account(account)
+    password_hash = manager.password_hashes['hash@example.com']
+
+    assert 'Password1' not in password_hash, 'Expected password to not be stored in plain text'
+    assert asyncio.run(manager.login_async(account.email_address, 'Password1')) == True, 'Expected login to succeed'
+    assert asyncio.run(manager.change_password_async(account, 'Password2')) == True, 'Expected password to be changed'
+    with pytest.raises(AccountIncorrectPasswordException):
+        manager.login(account.email_address, 'Password1')
+
+def test_view_accounts_page_with_filters():
+    # 4.8.1 Account view access
+    manager = AccountManager()
+    for i in range(10):
+        account = Account('customer%d@see.ca' % i)
+        account.is_banned = i % 2 == 0
+        manager.add_account(account)
+    manager.admin_create_account('KitchenManager', 'staff@see.ca', 'KitchenStaff')
+
+    first_page, cursor = manager.view_accounts_page('KitchenStaff', limit=3, is_banned=False, account_role='Customer')
+    second_page, cursor = manager.view_accounts_page('KitchenStaff', cursor, limit=3, is_banned=False, account_role='Customer')
+
+    assert [a.email_address for a in first_page + second_page] == ['customer%d@see.ca' % i for i in (1, 3, 5, 7, 9)], 'Expected unbanned customers in email order'
+    assert cursor == None, 'Expected no cursor after the last page'
+    assert len(manager.view_all_accounts('KitchenManager', account_role='KitchenStaff')) == 1, 'Expected one staff account'
+    assert len(manager.view_all_accounts('KitchenManager', email_prefix='customer1')) == 1, 'Expected one account with the email prefix'
+
+def test_view_accounts_page_by_name_prefix_and_lock():
+    # 4.8.1 Account view access
+    manager = AccountManager()
+    for i, (first_name, last_name) in enumerate([('Ann', 'Lee'), ('Bob', 'Annis'), ('Cal', 'Moe'), ('Anna', 'Ray')]):
+        account = Account('customer%d@see.ca' % i)
+        account.first_name = first_name
+        account.last_name = last_name
+        account.activation_code = 'Code%d' % i
+        manager.add_account(account)
+    manager.unlock_account('Code3')
+
+    first_page, cursor = manager.view_accounts_page('KitchenStaff', limit=2, name_prefix='ann')
+    second_page, cursor = manager.view_accounts_page('KitchenStaff', cursor, limit=2, name_prefix='ann')
+
+    assert [a.email_address for a in first_page + second_page] == ['customer0@see.ca', 'customer1@see.ca', 'customer3@see.ca'], 'Expected first or last name matches in email order'
+    assert cursor == None, 'Expected no cursor after the last page'
+    assert [a.email_address for a in manager.view_all_accounts('KitchenStaff', is_locked=False)] == ['customer3@see.ca'], 'Expected the activated account only'
+    assert [a.email_address for a in manager.view_all_accounts('KitchenStaff', is_locked=True, name_prefix='ann')] == ['customer0@see.ca', 'customer1@see.ca'], 'Expected locked name matches'
+    assert len(manager.view_all_accounts('KitchenStaff', is_locked=True)) == 3, 'Expected three locked accounts'
+
+def test_search_accounts_by_prefix_follows_personal_information_changes():
+    # 4.7.2.1 Modifiable Information
+    manager = AccountManager()
+    account = Account('existing@gmail.com')
+    account.first_name = 'John'
+    account.last_name = 'Doe'
+    manager.add_account(account)
+    manager.add_account(Account('johnny@gmail.com'))
+
+    assert [a.email_address for a in manager.search_accounts('joh')] == ['johnny@gmail.com', 'existing@gmail.com'], 'Expected email then name matches'
+
+    manager.change_personal_information(account, 'Joe', 'Schmoe', 'newemail@gmail.com', '10 Change Lane')
+
+    assert manager.search_accounts('john') == [manager.find_account('johnny@gmail.com')], 'Expected old name to be removed'
+    assert manager.search_accounts('schm') == [account], 'Expected new last name to be indexed'
+    assert manager.search_accounts('newemail') == [account], 'Expected new email to be indexed'
+    assert manager.verify_email_does_not_exist_in_system('existing@gmail.com') == True, 'Expected old email to be free'
+
+def test_login_is_rate_limited_before_password_check():
+    # 4.3 Login
+    manager = AccountManager(PasswordHasher(iterations=1000), login_rate_limiter=LoginRateLimiter(email_rate=0, email_burst=2))
+    account = Account('cool@man.com')
+    account.password = 'Coolio123'
+    account.is_locked = False
+    manager.add_account(account)
+
+    for _ in range(2):
+        with pytest.raises(AccountIncorrectPasswordException):
+            manager.login(account.email_address, 'wrongPassword1')
+
+    with pytest.raises(AccountRateLimitedException):
+        manager.login(account.email_address, account.password)
+    assert manager.login_rate_limiter.metrics()['rejected_by_email'] == 1, 'Expected one rejected attempt'
+
+def test_concurrent_registration_creates_no_duplicates():
+    # 4.1.1.2 Existing accounts
+    manager = AccountManager(thread_safe=True)
+    emails = ['customer%d@example.com' % i for i in range(200)]
+    created = []
+
+    def register():
+        created.extend(email for email in emails if manager.add_account(Account(email)))
+
+    threads = [threading.Thread(target=register) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(created) == sorted(emails), 'Expected every email to be registered exactly once'
@@ -0,0 +1,37 @@
+from addressengine import AddressEngine, normalize_address
+
+
+def test_normalize_address():
+    # 4.5.1.3 Shipping Address Validation
+    assert normalize_address('10 Valid Dr.') == '10 valid drive', 'Expected abbreviation expanded'
+    assert normalize_address('10  valid   drive, N') == '10 valid drive north', 'Expected direction kept'
+    assert normalize_address('10 not valid 10 drive') == None, 'Expected number inside street name rejected'
+    assert normalize_address('valid drive') == None, 'Expected house number required'
+    assert normalize_address('10 valid') == None, 'Expected street type required'
+    assert normalize_address(None) == None, 'Expected non string rejected'
+
+
+def test_address_engine_cache():
+    now = [0]
+    engine = AddressEngine(max_entries=2, ttl=10, clock=lambda: now[0])
+
+    assert engine.is_valid('10 valid drive') == True, 'Address is valid'
+    assert engine.is_valid('10 Valid  Drive') == True, 'Address is valid'
+    assert (engine.hits, engine.misses) == (1, 1), 'Expected the same address served from the cache'
+
+    engine.is_valid('1 a st')
+    engine.is_valid('2 b st')
+    assert len(engine.cache) == 2, 'Expected least recently used entry evicted'
+
+    now[0] = 11
+    engine.is_valid('2 b st')
+    assert engine.misses == 4, 'Expected expired entry normalized again'
+
+
+def test_address_engine_batch():
+    # bulk import validates a whole chunk at once
+    engine = AddressEngine()
+    results = engine.validate_batch(['10 valid drive', None, '10 valid drive', 'nowhere'])
+
+    assert results == [True, False, True, False], 'Expected one result per address'
+    assert engine.misses == 2, 'Expected repeated addresses normalized once'
@@ -0,0 +1,70 @@
+import asyncio
+
+from account import Account
+from accountmanager import AccountManager
+from asyncmanagers import AsyncAccountManager, AsyncEmailUtils, AsyncOrderManager, AsyncReceiptManager
+from emailoutbox import EmailOutbox, MemoryTransport
+from emailutils import EmailUtils
+from journal import Journal
+from order import Order
+from ordermanager import OrderManager
+from passwordhasher import PasswordHasher
+from receipt import Receipt
+from receiptmanager import ReceiptManager
+
+
+async def checkout(accounts, orders, receipts, email_utils, email_address, staff):
+    customer = Account(email_address)
+    customer.password = 'Password1'
+    await accounts.add_account(customer)
+    order = Order(customer, staff)
+    await orders.add_order(order)
+    receipt = Receipt(order)
+    await receipts.add_receipt(receipt)
+    return await email_utils.send_receipt(email_address, receipt)
+
+
+def test_async_checkout_flow(tmp_path):
+    # 4.4 Existing and Guest User Receipt
+    transport = MemoryTransport()
+    account_manager = AccountManager(PasswordHasher(iterations=1000), thread_safe=True,
+                                     journal=Journal(str(tmp_path), 'accounts'))
+    accounts = AsyncAccountManager(account_manager)
+    orders = AsyncOrderManager(OrderManager())
+    receipts = AsyncReceiptManager(ReceiptManager())
+    email_utils = AsyncEmailUtils(EmailUtils(EmailOutbox(transport), account_manager))
+    staff = Account('staff@example.com')
+
+    async def run():
+        results = await asyncio.gather(*(checkout(accounts, orders, receipts, email_utils,
+                                                  'customer%d@example.com' % i, staff) for i in range(50)))
+        await email_utils.flush()
+        customer = account_manager.find_account('customer7@example.com')
+        customer.is_locked = False
+        return results, await accounts.login('customer7@example.com', 'Password1')
+
+    results, logged_in = asyncio.run(run())
+    accounts.close()
+
+    assert all(results), 'Expected every receipt to be sent'
+    assert len(transport.sent) == 50, 'Expected every receipt to be delivered'
+    assert len(account_manager.accounts) == 50, 'Expected every account to be stored'
+    assert logged_in == True, 'Expected login to succeed'
+
+
+def test_async_reads_follow_queued_writes(tmp_path):
+    # 4.7.3.1 Order Information
+    orders = AsyncOrderManager(OrderManager(Journal(str(tmp_path), 'orders')))
+    customer = Account('customer@example.com')
+
+    async def run():
+        writes = [asyncio.ensure_future(orders.add_order(Order(customer, None))) for _ in range(20)]
+        await asyncio.sleep(0)
+        page, _ = await orders.view_orders_page(customer, limit=100)
+        await asyncio.gather(*writes)
+        return page
+
+    page = asyncio.run(run())
+    orders.close()
+
+    assert len(page) == 20, 'Expected the read to see every write queued before it'
@@ -0,0 +1,68 @@
+import pytest
+
+from account import CUSTOMER, KITCHEN_MANAGER, KITCHEN_STAFF, Account
+from accountmanager import AccountManager
+from auditlog import AUDIT_RECORD, BAN_ACCOUNT, AuditLog
+
+
+def test_admin_operations_are_audited(tmp_path):
+    # 4.8.2 Account banning and 4.9.1 Management Account Creation
+    audit_log = AuditLog(str(tmp_path))
+    manager = AccountManager(audit_log=audit_log)
+    account = Account('customer@example.com')
+    manager.add_account(account)
+
+    manager.ban_account(account, True)
+    manager.admin_create_account(CUSTOMER, 'staff@example.com', KITCHEN_STAFF)
+    manager.admin_create_account(KITCHEN_MANAGER, 'staff@example.com', KITCHEN_STAFF)
+    manager.change_personal_information(account, 'John', 'Doe', 'renamed@example.com', '10 valid drive')
+
+    history = audit_log.history('Customer@example.com')
+    assert [record.operation for record in history] == ['ban_account', 'change_personal_information'], \
+        'Expected account history oldest first'
+    assert history[0].state == True and history[0].succeeded == True, 'Expected ban state recorded'
+    assert history[1].detail == 'renamed@example.com', 'Expected new email recorded'
+
+    staff = audit_log.history('staff@example.com')
+    assert [(record.actor_role, record.succeeded) for record in staff] == [(CUSTOMER, False), (KITCHEN_MANAGER, True)], \
+        'Expected refused and allowed account creation'
+
+
+def test_audit_log_rotates_and_reopens(tmp_path):
+    audit_log = AuditLog(str(tmp_path), segment_records=4, max_segments=2)
+    manager = AccountManager(audit_log=audit_log)
+    account = Account('customer@example.com')
+    manager.add_account(account)
+    for state in [True, False] * 5:
+        manager.ban_account(account, state)
+    audit_log.close()
+
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert files == ['audit-00000002.seg', 'audit-00000003.seg'], 'Expected oldest segment dropped'
+    assert (tmp_path / 'audit-00000003.seg').stat().st_size == 2 * AUDIT_RECORD.size, 'Expected fixed size records'
+
+    reopened = AuditLog(str(tmp_path), segment_records=4, max_segments=2)
+    history = reopened.history('customer@example.com')
+    assert [record.sequence for record in history] == [5, 6, 7, 8, 9, 10], 'Expected index rebuilt from segments'
+
+
+def test_audit_log_survives_write_error(tmp_path):
+    audit_log = AuditLog(str(tmp_path))
+    open_segment = audit_log._open_segment
+
+    def failing_open_segment():
+        audit_log._open_segment = open_segment
+        raise OSError('disk full')
+    audit_log._open_segment = failing_open_segment
+
+    audit_log.record(BAN_ACCOUNT, 'customer@example.com', True, state=True)
+    with pytest.raises(OSError):
+        audit_log.flush()
+    assert audit_log.failed_count == 1, 'Expected the failed record counted'
+
+    audit_log.record(BAN_ACCOUNT, 'customer@example.com', True, state=False)
+    audit_log.flush()
+    history = audit_log.history('customer@example.com')
+    assert [(record.sequence, record.state) for record in history] == [(1, False)], \
+        'Expected the worker to keep writing after a failed batch'
+    audit_log.close()
@@ -0,0 +1,128 @@
+import io
+import json
+
+import validators
+from account import KITCHEN_STAFF
+from accountmanager import AccountManager
+from bulkimport import (INVALID_DATE, INVALID_NUMBER, INVALID_PASSWORD_HASH, INVALID_ROLE, BulkLoader,
+                        export_accounts, export_orders, read_rows)
+from ordermanager import OrderManager
+from passwordhasher import PasswordHasher, verify_password
+
+ACCOUNTS_CSV = '''email_address,first_name,last_name,home_address,password,role,is_locked
+valid@example.com,first,last,10 valid drive,Password1,,false
+staff@example.com,first,last,5 staff street,Password1,KitchenStaff,false
+invalid email,first,last,10 valid drive,Password1,,
+nohouse@example.com,first,last,valid drive,Password1,,
+missing@example.com,,last,10 valid drive,Password1,,
+VALID@example.com,first,last,10 valid drive,Password1,,
+admin@example.com,first,last,10 valid drive,Password1,admin,
+'''
+
+
+def make_loader(chunk_size=2):
+    account_manager = AccountManager(PasswordHasher(iterations=1000))
+    return BulkLoader(account_manager, OrderManager(account_manager=account_manager), chunk_size=chunk_size)
+
+
+def test_import_accounts_report():
+    # 4.1 Registration rules applied to imported rows
+    loader = make_loader()
+    report = loader.import_accounts(io.StringIO(ACCOUNTS_CSV))
+
+    assert report.rows == 7, 'Expected every row counted'
+    assert report.imported == 2, 'Expected only the valid rows imported'
+    assert report.rejected == {validators.INVALID_EMAIL: 1, validators.INVALID_ADDRESS: 1,
+                               validators.MISSING_INFORMATION: 1, validators.EMAIL_EXISTS: 1, INVALID_ROLE: 1}, \
+        'Expected rejected rows grouped by reason'
+    assert loader.account_manager.login('valid@example.com', 'Password1') != None, 'Expected imported password to work'
+    assert loader.account_manager.find_account('staff@example.com').role == KITCHEN_STAFF, 'Expected role imported'
+
+
+def test_export_then_import_accounts_keeps_password_hashes():
+    loader = make_loader()
+    loader.import_accounts(io.StringIO(ACCOUNTS_CSV))
+    exported = io.StringIO()
+    export_accounts(loader.account_manager, exported, 'jsonl')
+
+    rows = list(read_rows(io.StringIO(exported.getvalue()), 'jsonl'))
+    assert all(row['password'] == None for row in rows), 'Expected no plain text passwords exported'
+
+    copy = make_loader()
+    report = copy.import_accounts(io.StringIO(exported.getvalue()), 'jsonl')
+    assert report.imported == 2, 'Expected exported accounts to import again'
+    assert copy.account_manager.login('valid@example.com', 'Password1') != None, 'Expected password hash carried over'
+
+
+def test_import_orders():
+    # 4.5.1.4 Payment Address Validation on imported orders
+    loader = make_loader()
+    loader.import_accounts(io.StringIO(ACCOUNTS_CSV))
+    rows = [
+        {'customer_email': 'valid@example.com', 'staff_email': 'staff@example.com',
+         'order_date': '2020-12-01T10:00:00', 'billing_address': '10 valid drive', 'total_cost': 12.5},
+        {'customer_email': 'valid@example.com', 'billing_address': 'nowhere'},
+        {'customer_email': 'guest@example.com', 'order_date': '2020-12-02T10:00:00'},
+    ]
+    report = loader.import_orders(io.StringIO(''.join(json.dumps(row) + '\n' for row in rows)), 'jsonl')
+
+    assert report.imported == 2 and report.rejected == {validators.INVALID_ADDRESS: 1}, 'Expected bad address rejected'
+    customer = loader.account_manager.find_account('valid@example.com')
+    assert len(loader.order_manager.view_all_orders(customer)) == 1, 'Expected order linked to the imported account'
+
+    exported = io.StringIO()
+    export_orders(loader.order_manager, exported)
+    assert exported.getvalue().count('\n') == 3, 'Expected header and one line per order'
+
+
+def test_import_orders_rejects_malformed_cells():
+    loader = make_loader()
+    loader.import_accounts(io.StringIO(ACCOUNTS_CSV))
+    orders_csv = '''customer_email,order_date,total_cost
+valid@example.com,2020-12-01T10:00:00,12.5
+valid@example.com,yesterday,12.5
+valid@example.com,2020-12-01T10:00:00,twelve
+valid@example.com,2020-12-01T10:00:00,1.2.3
+'''
+    report = loader.import_orders(io.StringIO(orders_csv))
+
+    assert report.rows == 4 and report.imported == 1, 'Expected the import to carry on past bad cells'
+    assert report.rejected == {INVALID_DATE: 1, INVALID_NUMBER: 2}, 'Expected bad cells rejected per row'
+
+
+def test_import_accounts_rejects_malformed_password_hash():
+    hashed = PasswordHasher(iterations=1000).hash('Password1')
+    rows = [
+        {'email_address': 'hashed@example.com', 'first_name': 'first', 'last_name': 'last',
+         'home_address': '10 valid drive', 'password_hash': hashed},
+        {'email_address': 'plain@example.com', 'first_name': 'first', 'last_name': 'last',
+         'home_address': '10 valid drive', 'password_hash': 'Password1'},
+        {'email_address': 'short@example.com', 'first_name': 'first', 'last_name': 'last',
+         'home_address': '10 valid drive', 'password_hash': 'pbkdf2$sha256$1000$zz$00'},
+    ]
+    loader = make_loader()
+    report = loader.import_accounts(io.StringIO(''.join(json.dumps(row) + '\n' for row in rows)), 'jsonl')
+
+    assert report.imported == 1, 'Expected only the well formed hash imported'
+    assert report.rejected == {INVALID_PASSWORD_HASH: 2}, 'Expected malformed hashes rejected'
+    assert verify_password('Password1', hashed), 'Expected a well formed hash to verify'
+    for encoded in ('Password1', 'pbkdf2$sha256$1000$zz$00', 'pbkdf2$nohash$1000$00$00', 'pbkdf2$sha256$x$00$00', None):
+        assert verify_password('Password1', encoded) == False, 'Expected False for a malformed hash'
+
+
+def test_export_then_import_date_orders():
+    loader = make_loader()
+    loader.import_accounts(io.StringIO(ACCOUNTS_CSV))
+    orders_csv = '''customer_email,order_date
+valid@example.com,2020-12-01
+valid@example.com,2020-12-02
+'''
+    loader.import_orders(io.StringIO(orders_csv))
+    exported = io.StringIO()
+    export_orders(loader.order_manager, exported)
+
+    report = loader.import_orders(io.StringIO(exported.getvalue() + 'valid@example.com,,2020-12-03T10:00:00\n'))
+    assert report.imported == 2, 'Expected exported date orders to import again'
+    assert report.rejected == {INVALID_DATE: 1}, 'Expected a datetime among date orders rejected'
+    assert len(loader.order_manager.view_all_orders(loader.account_manager.find_account('valid@example.com'))) == 4, \
+        'Expected the rejected row left out'
@@ -377,3 +377,45 @@ def test_view_receipt_as_staff():
     all_receipts = receiptManager.get_all_receipts(staff_account)
 
     assert all_receipts[0].received_by == staff_account, 'Receipt for Staff found'
+
+
+def test_receipt_content_rendered_for_existing_account():
+    # 4.5.1 Email Information for Account
+    manager = AccountManager()
+    utils = EmailUtils(account_manager=manager)
+    account = Account('existing@gmail.com')
+    account.first_name = 'John'
+    account.last_name = 'Doe'
+    manager.add_account(account)
+
+    new_order = Order(account, Account('staff@gmail.com'))
+    new_order.total_cost = 25
+    order_receipt = Receipt(new_order)
+
+    assert utils.send_receipt(account.email_address, order_receipt) == True, 'Email has been sent'
+    assert 'John Doe' in order_receipt.content, 'Expected customer name in receipt'
+    assert 'Total: 25' in order_receipt.content, 'Expected order total in receipt'
+    assert 'create-account' not in order_receipt.content, 'Expected no account creation link'
+
+
+def test_customer_information_cache_invalidated():
+    # 4.5.1.2 Email is found, cached lookups follow account changes
+    manager = AccountManager()
+    utils = EmailUtils(account_manager=manager)
+
+    assert utils.account_exist('customer@gmail.com') == False, 'Expected guest'
+    assert utils.account_exist('customer@gmail.com') == False, 'Expected guest from the cache'
+    assert utils.customer_cache.negative_hits == 1, 'Expected guest lookup cached'
+
+    account = Account('customer@gmail.com')
+    manager.add_account(account)
+    assert utils.find_customer('customer@gmail.com') is account, 'Expected new account found'
+
+    manager.change_personal_information(account, 'John', 'Doe', 'renamed@gmail.com', '10 valid drive')
+    assert utils.account_exist('customer@gmail.com') == False, 'Expected old email forgotten'
+    assert utils.find_customer('renamed@gmail.com') is account, 'Expected new email found'
+    assert utils.customer_cache.metrics()['hits'] == 0, 'Expected every changed email looked up again'
+    assert utils.get_customer_information('renamed@gmail.com') == True, 'Expected customer information found'
+
+    utils.close()
+    assert manager.listeners == [], 'Expected the cache detached from the manager'
@@ -0,0 +1,161 @@
+import smtplib
+
+from account import Account
+from accountmanager import AccountManager
+from emailoutbox import DiscardTransport, EmailMessage, EmailOutbox, MemoryTransport, SmtpTransport
+
+
+class FlakyTransport(MemoryTransport):
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def send_batch(self, messages):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError('mail server unavailable')
+        super().send_batch(messages)
+
+
+# an SMTP connection that fails once with `error` after `failures_after` messages
+class DroppingConnection:
+
+    def __init__(self, sent, failures_after, error=None):
+        self.sent = sent
+        self.failures_after = failures_after
+        self.error = error if error != None else smtplib.SMTPServerDisconnected('connection dropped')
+        self.closed = False
+
+    def send_message(self, mail):
+        if self.failures_after == 0:
+            self.failures_after = -1
+            raise self.error
+        self.failures_after -= 1
+        self.sent.append(mail['To'])
+
+    def close(self):
+        self.closed = True
+
+
+class DroppingSmtpTransport(SmtpTransport):
+
+    def __init__(self, failures_after, error=None):
+        super().__init__('localhost')
+        self.sent = []
+        self.dropped = DroppingConnection(self.sent, failures_after, error)
+        self.connections = [self.dropped]
+
+    def _connect(self):
+        if self.connections:
+            return self.connections.pop()
+        return DroppingConnection(self.sent, -1)
+
+
+def test_outbox_delivers_queued_messages_on_flush():
+    # 4.5 Email Receipt after Order
+    transport = MemoryTransport()
+    outbox = EmailOutbox(transport)
+
+    for i in range(10):
+        outbox.send(EmailMessage('customer%d@example.com' % i, 'Your receipt', 'Thanks'))
+    outbox.flush()
+
+    assert len(transport.sent) == 10, 'Expected every message to be delivered'
+    assert outbox.queue_depth == 0, 'Expected the queue to be empty'
+    assert outbox.metrics()['sent'] == 10, 'Expected sent metric to count every message'
+
+
+def test_outbox_retries_failed_batches():
+    # 4.5 Email Receipt after Order
+    transport = FlakyTransport(failures=2)
+    outbox = EmailOutbox(transport, retry_backoff=0)
+
+    outbox.send(EmailMessage('customer@example.com', 'Your receipt', 'Thanks'))
+    outbox.flush()
+
+    assert len(transport.sent) == 1, 'Expected the message to be delivered after retrying'
+    assert outbox.retry_count == 2, 'Expected two retries'
+
+
+def test_verification_email_is_queued_in_outbox():
+    # 4.1.3.1 Password verification link
+    transport = MemoryTransport()
+    manager = AccountManager(outbox=EmailOutbox(transport))
+    account = Account('myemail@email.com')
+
+    manager.add_account(account)
+    email_details = manager.send_email_verification_email(account)
+    manager.outbox.flush()
+
+    assert transport.sent == [email_details], 'Expected verification email to be delivered'
+    assert manager.unlock_account(account.activation_code) == True, 'Expected link code to unlock the account'
+
+
+def test_close_delivers_queued_messages_and_stops_worker():
+    # 4.5 Email Receipt after Order
+    transport = MemoryTransport()
+    manager = AccountManager(outbox=EmailOutbox(transport, batch_size=3))
+    for i in range(10):
+        manager.outbox.send(EmailMessage('customer%d@example.com' % i, 'Your receipt', 'Thanks'))
+    worker = manager.outbox._worker
+
+    manager.close()
+
+    assert len(transport.sent) == 10, 'Expected queued messages delivered before closing'
+    assert not worker.is_alive(), 'Expected the worker thread to stop'
+    manager.close()
+
+
+def test_outbox_retries_only_unsent_messages():
+    # 4.5 Email Receipt after Order
+    transport = DroppingSmtpTransport(failures_after=2)
+    outbox = EmailOutbox(transport, retry_backoff=0)
+
+    for i in range(5):
+        outbox.send(EmailMessage('customer%d@example.com' % i, 'Your receipt', 'Thanks'))
+    outbox.flush()
+
+    assert transport.sent == ['customer%d@example.com' % i for i in range(5)], 'Expected each message sent once'
+    assert outbox.sent_count == 5 and outbox.retry_count == 1, 'Expected one retry for the rest of the batch'
+
+
+def test_smtp_connection_closed_on_any_error():
+    # 4.5 Email Receipt after Order
+    transport = DroppingSmtpTransport(failures_after=1, error=OSError('connection reset'))
+    outbox = EmailOutbox(transport, retry_backoff=0)
+
+    for i in range(3):
+        outbox.send(EmailMessage('customer%d@example.com' % i, 'Your receipt', 'Thanks'))
+    outbox.flush()
+
+    assert transport.dropped.closed, 'Expected the failed connection closed'
+    assert transport._connections.qsize() == 1 and transport._connections.get() is not transport.dropped, \
+        'Expected only a healthy connection returned to the pool'
+    assert len(transport.sent) == 3, 'Expected the rest sent on a fresh connection'
+
+
+def test_permanently_refused_recipient_fails_alone():
+    # 4.5 Email Receipt after Order
+    refusal = smtplib.SMTPRecipientsRefused({'b@x.com': (550, b'no such user')})
+    transport = DroppingSmtpTransport(failures_after=1, error=refusal)
+    outbox = EmailOutbox(transport, retry_backoff=10)
+
+    for recipient in ('a@x.com', 'b@x.com', 'c@x.com'):
+        outbox.send(EmailMessage(recipient, 'Your receipt', 'Thanks'))
+    outbox.flush()
+
+    assert transport.sent == ['a@x.com', 'c@x.com'], 'Expected the messages behind the refused one delivered'
+    assert outbox.failed_count == 1 and outbox.retry_count == 0, 'Expected the refused message failed without retries'
+    assert not transport.dropped.closed, 'Expected the connection kept after a refused recipient'
+
+
+def test_default_outbox_keeps_no_messages():
+    manager = AccountManager()
+    for i in range(10):
+        manager.outbox.send(EmailMessage('customer%d@example.com' % i, 'Your receipt', 'Thanks'))
+    manager.outbox.flush()
+
+    assert isinstance(manager.outbox.transport, DiscardTransport), 'Expected messages dropped without a mail server'
+    assert manager.outbox.transport.discarded_count == 10, 'Expected dropped messages counted'
+    manager.close()
@@ -0,0 +1,47 @@
+import pytest
+
+from account import Account
+from accountexceptions import AccountDoesNotExistException
+from accountmanager import AccountManager
+from instrumentation import Instrumentation, export_metrics, prometheus_text
+from order import Order
+from ordermanager import OrderManager
+
+
+def test_instrumentation_counts_calls_and_errors():
+    manager = AccountManager()
+    instrumentation = Instrumentation()
+    instrumentation.attach('account_manager', manager)
+    instrumentation.enable()
+
+    manager.add_account(Account('customer@example.com'))
+    with pytest.raises(AccountDoesNotExistException):
+        manager.login('missing@example.com', 'Password1')
+
+    snapshot = instrumentation.snapshot()
+    assert snapshot['account_manager.add_account']['calls'] == 1, 'Expected call counted'
+    assert snapshot['account_manager.login']['errors'] == {'AccountDoesNotExistException': 1}, \
+        'Expected error counted by exception type'
+    assert 'manager_errors_total{method="account_manager.login",exception="AccountDoesNotExistException"} 1' \
+        in prometheus_text(instrumentation), 'Expected error in prometheus text'
+
+    instrumentation.disable()
+    manager.add_account(Account('other@example.com'))
+    assert 'add_account' not in vars(manager), 'Expected wrappers removed when disabled'
+    assert instrumentation.snapshot()['account_manager.add_account']['calls'] == 1, 'Expected no counting when disabled'
+
+
+def test_profiling_and_export(tmp_path):
+    manager = OrderManager()
+    instrumentation = Instrumentation()
+    instrumentation.attach('order_manager', manager)
+    instrumentation.enable()
+    instrumentation.start_profiling(every=2)
+    for _ in range(4):
+        manager.add_order(Order(Account('customer@example.com'), None))
+    stats = instrumentation.stop_profiling()
+
+    assert stats.total_calls > 0, 'Expected sampled calls profiled'
+    export_metrics(instrumentation, str(tmp_path / 'metrics.prom'), 'prometheus')
+    text = (tmp_path / 'metrics.prom').read_text()
+    assert 'manager_latency_seconds_count{method="order_manager.add_order"} 4' in text, 'Expected histogram exported'
@@ -0,0 +1,110 @@
+import os
+import time
+
+from account import Account
+from accountmanager import AccountManager
+from journal import Journal, read_records
+from order import Order
+from ordermanager import OrderManager
+from passwordhasher import PasswordHasher
+from receipt import Receipt
+from receiptmanager import ReceiptManager
+
+
+def open_managers(directory, snapshot_interval=100000):
+    accounts = AccountManager(PasswordHasher(iterations=1000),
+                              journal=Journal(directory, 'accounts', 0, snapshot_interval))
+    orders = OrderManager(Journal(directory, 'orders', 0, snapshot_interval), accounts)
+    receipts = ReceiptManager(Journal(directory, 'receipts', 0, snapshot_interval), accounts)
+    return accounts, orders, receipts
+
+
+def populate(accounts, orders, receipts):
+    customer = Account('customer@example.com')
+    customer.password = 'Password1'
+    customer.activation_code = 'Code1'
+    staff = Account('staff@example.com')
+    accounts.add_account(customer)
+    accounts.add_account(staff)
+    accounts.unlock_account('Code1')
+    accounts.ban_account(staff, True)
+    accounts.change_password(customer, 'Password2')
+
+    order = Order(customer, staff)
+    order.total_cost = 12
+    orders.add_order(order)
+    orders.add_order(Order(Account('guest@example.com'), staff))
+    receipt = Receipt(order)
+    receipt.content = 'Thanks'
+    receipts.add_receipt(receipt)
+
+
+def assert_recovered(accounts, orders, receipts):
+    customer = accounts.find_account('customer@example.com')
+    staff = accounts.find_account('staff@example.com')
+
+    assert customer.is_locked == False, 'Expected unlock to be recovered'
+    assert accounts.is_account_banned(staff) == True, 'Expected ban to be recovered'
+    assert accounts.login('customer@example.com', 'Password2') == True, 'Expected new password to be recovered'
+    assert customer.password == None, 'Expected plain text password to never be persisted'
+    assert orders.view_all_orders(customer)[0].total_cost == 12, 'Expected order to be recovered'
+    assert len(orders.view_orders_received_by(staff)) == 2, 'Expected staff index to be recovered'
+    assert receipts.receipts[0].order.customer is customer, 'Expected receipt to be recovered'
+    assert receipts.receipts[0].content == 'Thanks', 'Expected receipt content to be recovered'
+
+
+def test_managers_recover_from_log(tmp_path):
+    populate(*open_managers(str(tmp_path)))
+
+    assert_recovered(*open_managers(str(tmp_path)))
+
+
+def test_managers_recover_from_snapshot_and_log(tmp_path):
+    populate(*open_managers(str(tmp_path), snapshot_interval=3))
+
+    assert any(name.endswith('.snapshot') for name in os.listdir(str(tmp_path))), 'Expected a snapshot'
+    assert_recovered(*open_managers(str(tmp_path)))
+
+
+def test_torn_log_tail_is_discarded(tmp_path):
+    journal = Journal(str(tmp_path), 'test', 0)
+    journal.load()
+    journal.append(('first',))
+    journal.append(('second',))
+    journal.close()
+    path = os.path.join(str(tmp_path), 'test-00000001.log')
+    os.truncate(path, os.path.getsize(path) - 1)
+
+    state, records = Journal(str(tmp_path), 'test', 0).load()
+
+    assert records == [('first',)], 'Expected only the complete record to be replayed'
+
+
+def test_idle_log_synced_within_group_commit_interval(tmp_path):
+    accounts = AccountManager(PasswordHasher(iterations=1000),
+                              journal=Journal(str(tmp_path), 'accounts', group_commit_interval=0.05))
+    accounts.add_account(Account('first@example.com'))
+    accounts.add_account(Account('second@example.com'))
+    time.sleep(0.3)
+
+    records, _ = read_records(str(tmp_path / 'accounts-00000001.log'))
+    assert len(records) == 2, 'Expected records on disk without further appends'
+    accounts.close()
+
+
+def test_orders_follow_customer_email_change_across_restart(tmp_path):
+    # 4.7.2 Change Personal Information keeps the order history
+    accounts, orders, receipts = open_managers(str(tmp_path))
+    customer = Account('customer@example.com')
+    accounts.add_account(customer)
+    order = Order(customer, None)
+    orders.add_order(order)
+    receipts.add_receipt(Receipt(order))
+    accounts.change_personal_information(customer, 'John', 'Doe', 'renamed@example.com', '10 valid drive')
+    for manager in (accounts, orders, receipts):
+        manager.close()
+
+    accounts, orders, receipts = open_managers(str(tmp_path))
+    customer = accounts.find_account('renamed@example.com')
+    assert len(orders.view_all_orders(customer)) == 1, 'Expected the order kept with the renamed customer'
+    assert len(receipts.get_all_receipts(customer)) == 1, 'Expected the receipt kept with the renamed customer'
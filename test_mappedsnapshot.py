@@ -0,0 +1,34 @@
+from account import Account
+from accountmanager import AccountManager
+from mappedsnapshot import MappedSnapshot, write_mapped_snapshot
+from order import Order
+from ordermanager import OrderManager
+from receipt import Receipt
+from receiptmanager import ReceiptManager
+
+
+def test_mapped_snapshot_reads_accounts_orders_and_receipts(tmp_path):
+    accounts = AccountManager()
+    orders = OrderManager()
+    receipts = ReceiptManager()
+    staff = Account('staff@example.com')
+    accounts.add_account(staff)
+    for i in range(100):
+        customer = Account('customer%d@example.com' % i)
+        customer.is_banned = i == 7
+        accounts.add_account(customer)
+        order = Order(customer, staff)
+        order.total_cost = i
+        orders.add_order(order)
+        receipts.add_receipt(Receipt(order))
+
+    path = str(tmp_path / 'state.snapshot')
+    write_mapped_snapshot(path, accounts, orders, receipts)
+    snapshot = MappedSnapshot(path)
+
+    assert snapshot.find_account('Customer42@example.com').email_address == 'customer42@example.com', 'Expected account to be found'
+    assert snapshot.verify_email_does_not_exist_in_system('nobody@example.com') == True, 'Expected missing account'
+    assert snapshot.is_account_banned(Account('customer7@example.com')) == True, 'Expected banned account'
+    assert snapshot.view_all_orders(Account('customer42@example.com'))[0].total_cost == 42, 'Expected the customer order'
+    assert snapshot.get_all_receipts(Account('customer42@example.com'))[0].order.received_by.email_address == 'staff@example.com', 'Expected the customer receipt'
+    snapshot.close()
@@ -0,0 +1,122 @@
+import threading
+from datetime import datetime
+
+from account import Account
+from order import Order
+from ordermanager import OrderManager
+
+
+def make_orders(manager, customer, staff, days):
+    orders = []
+    for day in days:
+        order = Order(customer, staff)
+        order.order_date = datetime(2020, 12, day)
+        manager.add_order(order)
+        orders.append(order)
+    return orders
+
+
+def test_view_customer_orders_sorted_by_date():
+    # 4.7.3.1 Order Information
+    manager = OrderManager()
+    customer = Account('customer@example.com')
+    staff = Account('staff@example.com')
+    orders = make_orders(manager, customer, staff, [3, 1, 2])
+    make_orders(manager, Account('other@example.com'), staff, [1])
+
+    all_orders = manager.view_all_orders(customer)
+
+    assert list(all_orders) == [orders[1], orders[2], orders[0]], 'Expected orders oldest first'
+    assert len(manager.view_orders_received_by(staff)) == 4, 'Expected every order taken by staff'
+
+
+def test_view_customer_orders_in_date_range():
+    # 4.7.3.1 Order Information
+    manager = OrderManager()
+    customer = Account('customer@example.com')
+    orders = make_orders(manager, customer, None, [1, 2, 3, 4])
+
+    all_orders = manager.view_all_orders(customer, datetime(2020, 12, 2), datetime(2020, 12, 4))
+
+    assert list(all_orders) == orders[1:3], 'Expected only orders inside the range'
+
+
+def test_view_customer_orders_not_shifted_by_later_orders():
+    # 4.7.3.1 Order Information
+    manager = OrderManager()
+    customer = Account('customer@example.com')
+    orders = make_orders(manager, customer, None, [2, 3])
+    all_orders = manager.view_all_orders(customer, datetime(2020, 12, 2), datetime(2020, 12, 4))
+
+    make_orders(manager, customer, None, [1, 5])
+
+    assert all_orders[0] == orders[0], 'Expected earlier orders not to shift the view'
+    assert list(all_orders) == orders, 'Expected only orders inside the range'
+    assert all_orders[-1] == orders[1] and all_orders[:1] == orders[:1], 'Expected indexing inside the range'
+
+def test_view_customer_orders_slices_inside_range():
+    # 4.7.3.1 Order Information
+    manager = OrderManager()
+    customer = Account('customer@example.com')
+    orders = make_orders(manager, customer, None, [1, 2, 3, 4, 5, 6])
+    all_orders = manager.view_all_orders(customer, datetime(2020, 12, 2), datetime(2020, 12, 6))
+
+    assert all_orders[:2] == orders[1:3] and all_orders[1:] == orders[2:5], 'Expected slices inside the range'
+    assert all_orders[::-2] == orders[1:5][::-2] and all_orders[10:] == [], 'Expected steps and empty slices'
+
+def test_view_customer_orders_by_page():
+    # 4.7.3.1 Order Information
+    manager = OrderManager()
+    customer = Account('customer@example.com')
+    orders = make_orders(manager, customer, None, range(1, 6))
+
+    first_page, cursor = manager.view_orders_page(customer, limit=2)
+    second_page, cursor = manager.view_orders_page(customer, cursor, limit=2)
+    last_page, cursor = manager.view_orders_page(customer, cursor, limit=2)
+
+    assert first_page + second_page + last_page == orders, 'Expected pages to cover every order once'
+    assert cursor == None, 'Expected no cursor after the last page'
+
+
+def test_sales_totals_by_day_and_payment_method():
+    # 4.6.3 Complete Sale Transaction Details
+    manager = OrderManager()
+    customer = Account('customer@example.com')
+    staff = Account('staff@example.com')
+    for day, total, payment_method in [(1, 10, 'visa'), (2, 30, 'cash'), (2, 20, 'visa'), (3, 5, 'visa')]:
+        order = Order(customer, staff)
+        order.order_date = datetime(2020, 12, day, 18, 30)
+        order.total_cost = total
+        order.tax_cost = total / 10
+        order.payment_method = payment_method
+        manager.add_order(order)
+
+    window = manager.sales_totals(datetime(2020, 12, 2), datetime(2020, 12, 3))
+    visa = manager.sales_totals(payment_method='visa')
+
+    assert window.count == 2 and window.total_cost.sum == 50, 'Expected totals for the second day'
+    assert window.total_cost.min == 20 and window.total_cost.max == 30, 'Expected min and max for the second day'
+    assert visa.count == 3 and visa.total_cost.sum == 35, 'Expected totals for visa payments'
+    assert manager.sales_totals(received_by=staff).count == 4, 'Expected totals for the staff member'
+
+
+def test_concurrent_add_order_keeps_index_sorted():
+    manager = OrderManager()
+    customer = Account('customer@example.com')
+
+    def add_orders(offset):
+        for i in range(500):
+            order = Order(customer, None)
+            order.order_date = datetime(2020, 12, 1 + (offset + i) % 28)
+            manager.add_order(order)
+    threads = [threading.Thread(target=add_orders, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    index = manager.orders
+    assert index.keys == sorted(index.keys), 'Expected keys kept sorted'
+    assert [key[1] for key in index.keys] == [order.order_date for order in index.orders], \
+        'Expected every key lined up with its order'
+    assert manager.committed_sequence == 2000 and index.version % 2 == 0, 'Expected every order committed'
@@ -0,0 +1,67 @@
+import threading
+
+from account import Account
+from accountmanager import AccountManager
+from order import Order
+from receipt import Receipt
+from receiptmanager import ReceiptManager
+
+
+def add_receipt(manager, customer, staff, content=None):
+    order = Order(customer, staff)
+    order.total_cost = 10
+    receipt = Receipt(order)
+    receipt.content = content
+    manager.add_receipt(receipt)
+    return receipt
+
+
+def test_receipts_indexed_by_customer_and_staff():
+    # 4.9.1 Receipt View Access
+    manager = ReceiptManager()
+    customer = Account('customer@example.com')
+    staff = Account('staff@example.com')
+    first = add_receipt(manager, customer, staff, 'First')
+    add_receipt(manager, Account('other@example.com'), staff)
+
+    assert [info.receipt_id for info in manager.get_all_receipts(customer)] == [first.receipt_id], \
+        'Expected only the customer receipts'
+    assert len(manager.get_all_receipts(staff)) == 2, 'Expected every receipt taken by staff'
+    assert manager.get_receipt_information(first).content == 'First', 'Expected stored content'
+    assert manager.get_receipt_information(Receipt(Order(customer, staff))) == None, 'Expected unknown receipt'
+
+
+def test_receipt_content_rendered_lazily_and_cached():
+    # 4.6.1.2 Receipt Database Storage
+    accounts = AccountManager()
+    customer = Account('customer@example.com')
+    accounts.add_account(customer)
+    manager = ReceiptManager(account_manager=accounts, max_cached=1)
+    lazy = add_receipt(manager, customer, Account('staff@example.com'))
+    other = add_receipt(manager, customer, Account('staff@example.com'), 'Other')
+
+    assert manager.contents[lazy.receipt_id] == None, 'Expected no content stored'
+    content = manager.get_receipt_content(lazy.receipt_id)
+    assert 'Total: 10' in content and 'create-account' not in content, 'Expected receipt rendered from the order'
+    assert list(manager.hot) == [lazy.receipt_id], 'Expected rendered content cached'
+
+    manager.get_receipt_content(other.receipt_id)
+    assert list(manager.hot) == [other.receipt_id], 'Expected cache bounded by max_cached'
+
+
+def test_concurrent_add_receipt_gives_unique_ids():
+    manager = ReceiptManager()
+    receipts = [Receipt(Order(Account('customer%d@example.com' % i), None)) for i in range(2000)]
+
+    def add_receipts(offset):
+        for receipt in receipts[offset::4]:
+            manager.add_receipt(receipt)
+    threads = [threading.Thread(target=add_receipts, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(receipt.receipt_id for receipt in receipts) == list(range(2000)), 'Expected unique receipt ids'
+    assert all(manager.orders[receipt.receipt_id] is receipt.order for receipt in receipts), \
+        'Expected every id to point at its order'
@@ -0,0 +1,67 @@
+from datetime import date, datetime
+
+import pytest
+
+from account import KITCHEN_MANAGER, Account
+from accountmanager import AccountManager
+from order import Order
+from ordermanager import OrderManager
+from receipt import Receipt
+from receiptmanager import ReceiptManager
+from reportsnapshot import ReportSnapshot
+from sortedkeys import SortedKeyList
+
+
+def test_frozen_sorted_keys_are_not_changed():
+    keys = SortedKeyList(['b', 'd'])
+    frozen = keys.freeze()
+    keys.add('c')
+    keys.remove('b')
+
+    assert list(frozen) == ['b', 'd'], 'Expected frozen keys unchanged'
+    assert list(keys) == ['c', 'd'], 'Expected live keys changed'
+
+
+def test_report_snapshot_is_consistent():
+    # 4.8.1 Account view access while accounts keep changing
+    accounts = AccountManager()
+    orders = OrderManager()
+    receipts = ReceiptManager()
+    customer = Account('customer@example.com')
+    customer.first_name = 'John'
+    accounts.add_account(customer)
+    order = Order(customer, None)
+    order.order_date = datetime(2020, 12, 1)
+    orders.add_order(order)
+    receipts.add_receipt(Receipt(order))
+
+    with ReportSnapshot(accounts, orders, receipts) as report:
+        accounts.add_account(Account('new@example.com'))
+        accounts.ban_account(customer, True)
+        accounts.change_personal_information(customer, 'Jane', 'Doe', 'renamed@example.com', '10 valid drive')
+        orders.add_order(Order(customer, None))
+        receipts.add_receipt(Receipt(Order(customer, None)))
+
+        snapshot = list(report.accounts.view_all_accounts(KITCHEN_MANAGER))
+        assert [account.email_address for account in snapshot] == ['customer@example.com'], \
+            'Expected accounts as they were when the report started'
+        assert snapshot[0].first_name == 'John' and not snapshot[0].is_banned, 'Expected old account details'
+        assert list(report.orders.view_all_orders(customer)) == [order], 'Expected later orders hidden'
+        assert len(list(report.receipts.get_all_receipts(customer))) == 1, 'Expected later receipts hidden'
+
+    assert accounts.snapshots == [], 'Expected snapshot closed'
+    assert len(accounts.view_all_accounts(KITCHEN_MANAGER)) == 2, 'Expected live view to see every change'
+
+
+def test_failed_order_insert_does_not_stall_snapshot_reads():
+    orders = OrderManager()
+    first = Order(Account('customer@example.com'), None)
+    first.order_date = date(2020, 12, 1)
+    orders.add_order(first)
+    mixed = Order(Account('customer@example.com'), None)
+    mixed.order_date = datetime(2020, 12, 2)
+    with pytest.raises(TypeError):
+        orders.add_order(mixed)
+
+    with ReportSnapshot(AccountManager(), orders) as report:
+        assert list(report.orders.all_orders()) == [first], 'Expected reads to carry on after the failed insert'
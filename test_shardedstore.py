@@ -0,0 +1,133 @@
+from datetime import datetime
+
+import pytest
+
+from account import KITCHEN_MANAGER, Account
+from accountexceptions import AccountIncorrectPasswordException
+from emailoutbox import EmailOutbox, MemoryTransport
+from order import Order
+from passwordhasher import PasswordHasher
+from receipt import Receipt
+from shardedstore import AccountRef, OrderRef, Shard, ShardedStore
+
+
+@pytest.fixture
+def store():
+    store = ShardedStore(shards=3, password_hasher=PasswordHasher(iterations=1000))
+    yield store
+    store.close()
+
+
+def register(store, email):
+    account = Account(email)
+    account.password = 'Password1'
+    assert store.account_manager.add_account(account) == True, 'Expected account created'
+    store.account_manager.send_email_verification_email(account)
+    assert store.account_manager.unlock_account(account.activation_code) == True, 'Expected account activated'
+    return account
+
+
+def test_sharded_accounts(store):
+    # 4.1 Registration and 4.3 Login across shards
+    accounts = [register(store, 'customer%d@example.com' % i) for i in range(12)]
+    manager = store.account_manager
+
+    assert manager.add_account(Account('CUSTOMER0@example.com')) == False, 'Expected duplicate refused'
+    assert manager.login('customer5@example.com', 'Password1') == True, 'Expected login on the owning shard'
+    with pytest.raises(AccountIncorrectPasswordException):
+        manager.login('customer5@example.com', 'Wrong1')
+
+    assert manager.ban_account(accounts[3], True) == True, 'Expected ban'
+    assert manager.is_account_banned(accounts[3]) == True, 'Expected ban kept by the shard'
+
+    page, cursor = manager.view_accounts_page(KITCHEN_MANAGER, limit=5)
+    emails = [account.email_address for account in page]
+    assert emails == sorted('customer%d@example.com' % i for i in range(12))[:5], 'Expected pages merged by email'
+    rest, cursor = manager.view_accounts_page(KITCHEN_MANAGER, cursor, limit=20)
+    assert len(rest) == 7 and cursor == None, 'Expected remaining accounts on the next page'
+
+
+def test_sharded_orders_and_receipts(store):
+    # 4.7.3.1 Order Information and 4.9.1 Receipt View Access
+    customers = [register(store, 'customer%d@example.com' % i) for i in range(6)]
+    staff = Account('staff@example.com')
+    for day, customer in enumerate(customers, 1):
+        order = Order(customer, staff)
+        order.order_date = datetime(2020, 12, day)
+        order.total_cost = 10
+        store.order_manager.add_order(order)
+        receipt = Receipt(order)
+        store.receipt_manager.add_receipt(receipt)
+
+    assert len(store.order_manager.view_all_orders(customers[2])) == 1, 'Expected orders kept with the customer'
+    received = store.order_manager.view_orders_received_by(staff)
+    assert [order.order_date.day for order in received] == [1, 2, 3, 4, 5, 6], 'Expected staff orders merged by date'
+    assert store.order_manager.sales_totals().total_cost.sum == 60, 'Expected totals summed across shards'
+    assert len(store.receipt_manager.get_all_receipts(staff)) == 6, 'Expected staff receipts from every shard'
+    assert store.receipt_manager.get_receipt_information(receipt) != None, 'Expected receipt found on its shard'
+
+
+def test_change_email_to_another_shard(store):
+    # 4.7.2 Change Personal Information across shards
+    customer = register(store, 'customer0@example.com')
+    new_email = next('moved%d@example.com' % i for i in range(100)
+                     if store.home('moved%d@example.com' % i) != store.home(customer.email_address))
+    order = Order(customer, None)
+    order.total_cost = 10
+    store.order_manager.add_order(order)
+    store.receipt_manager.add_receipt(Receipt(order))
+    manager = store.account_manager
+
+    assert manager.change_personal_information(customer, 'first', 'last', new_email, '10 valid drive') == True, \
+        'Expected a new email on another shard accepted'
+    assert manager.find_account('customer0@example.com') == None, 'Expected the old email released'
+    assert manager.find_account(new_email) != None, 'Expected the account found by its new email'
+    assert manager.login(new_email, 'Password1') == True, 'Expected the password hash kept'
+    assert len(store.order_manager.view_all_orders(customer)) == 1, 'Expected the orders kept with the account'
+    assert len(store.receipt_manager.get_all_receipts(customer)) == 1, 'Expected the receipts kept with the account'
+    assert manager.add_account(Account(new_email.upper())) == False, 'Expected the new email taken'
+    assert register(store, 'customer0@example.com') != None, 'Expected the old email free again'
+
+
+def test_shard_mail_delivered_by_store_outbox():
+    # 4.1.3.1 Password verification link sent from a shard
+    transport = MemoryTransport()
+    store = ShardedStore(shards=2, password_hasher=PasswordHasher(iterations=1000), outbox=EmailOutbox(transport))
+    try:
+        account = Account('mail@example.com')
+        account.password = 'Password1'
+        store.account_manager.add_account(account)
+        message = store.account_manager.send_email_verification_email(account)
+        store.outbox.flush()
+    finally:
+        store.close()
+
+    assert [sent.recipient for sent in transport.sent] == ['mail@example.com'], 'Expected the mail delivered'
+    assert transport.sent[0].contains_correct_link() and account.activation_code in message.link, \
+        'Expected the activation link in the delivered mail'
+
+
+def test_store_created_after_threads_started():
+    hasher = PasswordHasher(iterations=1000)
+    hasher.executor.submit(hasher.hash, 'Password1').result()
+    store = ShardedStore(shards=2, password_hasher=hasher)
+    try:
+        register(store, 'threads@example.com')
+        assert store.account_manager.login('threads@example.com', 'Password1') == True, 'Expected a working shard'
+    finally:
+        store.close()
+        hasher.shutdown()
+
+
+def test_shard_lookups_keep_no_stand_ins():
+    shard = Shard()
+    for i in range(100):
+        account = AccountRef('unknown%d@example.com' % i)
+        assert shard.call('account_manager', 'get_account', [account], {}) == False, 'Expected unknown account'
+        assert shard.call('order_manager', 'view_all_orders', [account], {}) == [], 'Expected no orders'
+    assert shard._resolve_account.guests == {}, 'Expected lookups to keep no stand-in accounts'
+
+    order = Order(Account('guest@example.com'), None)
+    shard.call('order_manager', 'add_order', [OrderRef(order)], {})
+    assert len(shard.call('order_manager', 'view_all_orders', [AccountRef('guest@example.com')], {})) == 1, \
+        'Expected a stored guest order found again'
@@ -0,0 +1,95 @@
+from account import Account
+from accountmanager import AccountManager
+from emailoutbox import EmailOutbox, MemoryTransport
+from passwordhasher import PasswordHasher
+from tokenstore import TokenStore
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_is_redeemed_once():
+    # 4.1.3.4 Account activation
+    store = TokenStore(ttl=60, clock=FakeClock())
+    code = store.issue('account')
+
+    assert store.redeem(code) == 'account', 'Expected the token to be redeemed'
+    assert store.redeem(code) == None, 'Expected the token to be consumed'
+
+
+def test_token_expires_and_is_swept():
+    # 4.1.3.3 Account activation - Invalid link
+    clock = FakeClock()
+    store = TokenStore(ttl=60, clock=clock)
+    expired = store.issue('old')
+
+    clock.now += 61
+    assert store.redeem(expired) == None, 'Expected the token to be expired'
+
+    store.issue('other')
+    clock.now += 30
+    store.issue('new')
+    assert len(store) == 2, 'Expected only live tokens to be kept'
+
+    clock.now += 62
+    store.issue('newest')
+    assert len(store) == 1, 'Expected expired tokens to be swept'
+
+
+def test_token_store_is_bounded():
+    # 4.1.3.4 Account activation
+    clock = FakeClock()
+    store = TokenStore(ttl=60, max_tokens=3, clock=clock)
+    codes = []
+    for i in range(5):
+        codes.append(store.issue(i))
+        clock.now += 2
+
+    assert len(store) == 3, 'Expected the store to stay within its bound'
+    assert store.redeem(codes[0]) == None, 'Expected the oldest token to be evicted'
+    assert store.redeem(codes[4]) == 4, 'Expected the newest token to be kept'
+
+
+def test_reset_password_with_emailed_code():
+    # 4.2 Password Reset
+    transport = MemoryTransport()
+    manager = AccountManager(PasswordHasher(iterations=1000), EmailOutbox(transport))
+    account = Account('more@example.com')
+    account.password = 'Password354'
+    account.is_locked = False
+    manager.add_account(account)
+
+    manager.send_password_reset_email(account.email_address)
+    manager.outbox.flush()
+    code = transport.sent[0].link.split('code=')[1]
+
+    assert manager.reset_password(code, 'newPassword454') == True, 'Expected the password to be reset'
+    assert manager.reset_password(code, 'otherPassword1') == False, 'Expected the code to be used up'
+    assert manager.login(account.email_address, 'newPassword454') == True, 'Expected login with the new password'
+
+
+def test_verification_email_reissues_expired_code():
+    # 4.1.3.3 Account activation - Invalid link
+    clock = FakeClock()
+    manager = AccountManager(PasswordHasher(iterations=1000), EmailOutbox(MemoryTransport()))
+    manager.activation_codes = TokenStore(ttl=60, clock=clock)
+    account = Account('expired@example.com')
+    account.password = 'Password354'
+    manager.add_account(account)
+
+    manager.send_email_verification_email(account)
+    expired = account.activation_code
+    manager.send_email_verification_email(account)
+    assert account.activation_code == expired, 'Expected a live code to be sent again'
+
+    clock.now += 61
+    manager.send_email_verification_email(account)
+    assert account.activation_code != expired, 'Expected the expired code to be replaced'
+    assert manager.unlock_account(expired) == False, 'Expected the expired code to be refused'
+    assert manager.unlock_account(account.activation_code) == True, 'Expected the new code to unlock the account'
@@ -0,0 +1,87 @@
+import heapq
+import secrets
+import time
+
+
+# short codes that map to a value and expire after a ttl; expiry is a
+# timing wheel of coarse buckets, so issuing and redeeming stay O(1) and
+# each expired token is visited once when its bucket comes due
+class TokenStore:
+
+    def __init__(self, ttl, resolution=1.0, max_tokens=None, clock=time.monotonic):
+        self.ttl = ttl
+        self.resolution = resolution
+        self.max_tokens = max_tokens
+        self.clock = clock
+        # code -> (value, expires_at)
+        self.tokens = {}
+        # bucket tick -> codes expiring in it, with a heap of the ticks in use
+        self.buckets = {}
+        self.ticks = []
+        self.issued_count = 0
+        self.redeemed_count = 0
+        self.expired_count = 0
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __contains__(self, code):
+        return self.peek(code) != None
+
+    def issue(self, value, code=None, ttl=None):
+        now = self.clock()
+        self.expire(now)
+        if self.max_tokens != None:
+            while len(self.tokens) >= self.max_tokens and self.ticks:
+                # over the bound, the tokens closest to expiry go first
+                self._expire_bucket(self.ticks[0])
+
+        if code == None:
+            code = secrets.token_urlsafe(16)
+        expires_at = now + (self.ttl if ttl == None else ttl)
+        self.tokens[code] = (value, expires_at)
+        tick = int(expires_at // self.resolution)
+        bucket = self.buckets.get(tick)
+        if bucket == None:
+            bucket = self.buckets[tick] = []
+            heapq.heappush(self.ticks, tick)
+        bucket.append(code)
+        self.issued_count += 1
+        return code
+
+    def peek(self, code):
+        entry = self.tokens.get(code)
+        if entry == None or entry[1] <= self.clock():
+            return None
+        return entry[0]
+
+    # returns the value and consumes the token, or None if it is unknown or expired
+    def redeem(self, code):
+        entry = self.tokens.pop(code, None)
+        if entry == None:
+            return None
+        if entry[1] <= self.clock():
+            self.expired_count += 1
+            return None
+        self.redeemed_count += 1
+        return entry[0]
+
+    def revoke(self, code):
+        return self.tokens.pop(code, None) != None
+
+    def expire(self, now=None):
+        if now == None:
+            now = self.clock()
+        current_tick = int(now // self.resolution)
+        # a bucket is only swept once every token in it is past its expiry
+        while self.ticks and self.ticks[0] < current_tick:
+            self._expire_bucket(self.ticks[0])
+
+    def _expire_bucket(self, tick):
+        heapq.heappop(self.ticks)
+        for code in self.buckets.pop(tick):
+            entry = self.tokens.get(code)
+            # skip codes that were redeemed, or re-issued into a later bucket
+            if entry != None and int(entry[1] // self.resolution) == tick:
+                del self.tokens[code]
+                self.expired_count += 1
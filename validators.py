@@ -0,0 +1,26 @@
+import re
+
+# compiled once at import, shared by every AccountManager
+EMAIL_PATTERN = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}')
+UPPER_CASE_PATTERN = re.compile(r'[A-Z]')
+DIGIT_PATTERN = re.compile(r'[0-9]')
+
+# per-row results of AccountManager.verify_accounts_batch
+VALID = 'valid'
+MISSING_INFORMATION = 'missing_information'
+INVALID_EMAIL = 'invalid_email'
+INVALID_PASSWORD = 'invalid_password'
+EMAIL_EXISTS = 'email_exists'
+INVALID_ADDRESS = 'invalid_address'
+
+
+# 4.1.1.1 Email validation
+def is_valid_email(email_address):
+    return type(email_address) is str and EMAIL_PATTERN.fullmatch(email_address) is not None
+
+
+# 4.1.1.3 Password validation
+def is_valid_password(password):
+    return (type(password) is str
+            and UPPER_CASE_PATTERN.search(password) is not None
+            and DIGIT_PATTERN.search(password) is not None)